@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Admission control and load shedding for chat requests.
+
+At most `max_concurrent` requests run; up to `max_queue` more wait for a
+slot, each for at most `max_wait_ms`. Anything beyond that is rejected
+right away with 429 and a Retry-After estimated from recent service
+times. An admitted request is served at a level chosen from how long it
+queued, relative to `queue_budget_ms`:
+
+    0 full       search, re-rank, MMR, LLM generation
+    1 skip_llm   full search, local template instead of the LLM
+    2 template   first-pass search only (no re-rank, no MMR), local template
+    3 cached     precomputed answer for the request's category, no search
+
+so a burst costs quality for a while instead of latency for everyone.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from metrics import REGISTRY
+
+LEVELS = ['full', 'skip_llm', 'template', 'cached']
+
+ADMISSIONS = REGISTRY.counter('nextstep_chat_admissions_total', 'Chat requests by admission outcome and service level',
+                              ('level',))
+QUEUE_SECONDS = REGISTRY.histogram('nextstep_chat_queue_seconds', 'Time chat requests waited for a slot')
+
+
+class Saturated(Exception):
+    """No slot and no room to wait; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """One admitted request's slot, released exactly once.
+
+    A streamed response releases it when its body finishes. A response
+    whose body never starts (client gone, error before streaming) releases
+    it from a background task or, as a last resort, when the slot is
+    garbage collected, so a lost slot can't leave the server rejecting
+    everything.
+    """
+
+    def __init__(self, controller: "AdmissionController"):
+        self.controller = controller
+        self.started = time.perf_counter()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.controller.release(time.perf_counter() - self.started)
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass  # event loop already closed at shutdown
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded wait queue and a degradation ladder."""
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32,
+                 queue_budget_ms: float = 250.0, max_wait_ms: float = 2000.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_budget_ms = queue_budget_ms
+        self.max_wait = max_wait_ms / 1000.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._active = 0
+        self._waiting = 0
+        self._service_s = 1.0  # EWMA of admitted request time
+        self._lock = threading.Lock()
+
+    def level_for(self, queue_ms: float) -> int:
+        """Service level for a request that queued for queue_ms."""
+        if self.queue_budget_ms <= 0 or queue_ms <= self.queue_budget_ms:
+            return 0
+        return min(int(queue_ms // self.queue_budget_ms), len(LEVELS) - 1)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained."""
+        backlog = (self._active + self._waiting) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(backlog * self._service_s))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the queue time in ms or raises Saturated."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+        start = loop.time()
+        if self._active + self._waiting >= self.max_concurrent + self.max_queue:
+            ADMISSIONS.inc(level='rejected_queue_full')
+            raise Saturated(self.retry_after())
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            ADMISSIONS.inc(level='rejected_timeout')
+            raise Saturated(self.retry_after())
+        finally:
+            self._waiting -= 1
+        self._active += 1
+        queued = loop.time() - start
+        QUEUE_SECONDS.observe(queued)
+        return queued * 1000.0
+
+    def _release_slot(self):
+        self._active -= 1
+        self._semaphore.release()
+
+    def release(self, service_seconds: Optional[float] = None):
+        """Free a slot; service_seconds updates the Retry-After estimate.
+
+        Safe to call from a worker thread (streamed responses finish in
+        Starlette's threadpool): the slot is handed back on the event loop.
+        """
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._release_slot()
+        else:
+            self._loop.call_soon_threadsafe(self._release_slot)
+        if service_seconds is not None:
+            with self._lock:
+                self._service_s = 0.8 * self._service_s + 0.2 * service_seconds
+
+    def record_level(self, level: int):
+        ADMISSIONS.inc(level=LEVELS[level])
+
+    def gauges(self) -> Dict[str, float]:
+        """Collector for /metrics."""
+        return {
+            'nextstep_chat_active': self._active,
+            'nextstep_chat_waiting': self._waiting,
+            'nextstep_chat_max_concurrent': self.max_concurrent,
+            'nextstep_chat_service_seconds_ewma': self._service_s,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'queue_budget_ms': self.queue_budget_ms,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'active': self._active,
+            'waiting': self._waiting,
+            'service_s_ewma': self._service_s,
+        }
@@ -1,16 +1,35 @@
 #!/usr/bin/env python3
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import uvicorn
+import hashlib
+import hmac
+import json
 import os
+import threading
+import time
 from datetime import datetime
 
+import metrics
+from language_detection import detect_language
 from nextstep_assistant import NextStepAssistant
+from profiling import profiler, install_signal_handler
+from suggest import SuggestIndex
+from categories import CATEGORIES, SUGGESTION_PILLS
+from precompute import PrecomputedAnswers
+from request_log import RequestLog, log_path, read_log, warm_up
+from admission import AdmissionController, AdmissionSlot, Saturated, LEVELS
+from query_parser import parse_query
+from sessions import SessionStore
+from reembed_resources import RollingReembedJob
+from index_snapshot import IndexWatcher
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -31,10 +50,121 @@ app.add_middleware(
 # Global assistant instance
 assistant = NextStepAssistant()
 
+# Optionally keep every resource embedded with this worker's model version
+reembed_job = None
+if os.getenv('NEXTSTEP_ROLLING_REEMBED', '0') == '1':
+    reembed_job = RollingReembedJob(
+        assistant.pipeline, assistant.db,
+        interval=float(os.getenv('NEXTSTEP_REEMBED_INTERVAL', '300'))
+    )
+
+# Rebuild the index when the database changes under it (NEXTSTEP_INDEX_CHECK_INTERVAL=0 to disable)
+index_watch = None
+INDEX_CHECK_INTERVAL = float(os.getenv('NEXTSTEP_INDEX_CHECK_INTERVAL', '300'))
+if INDEX_CHECK_INTERVAL > 0:
+    index_watch = IndexWatcher(assistant, interval=INDEX_CHECK_INTERVAL)
+
+def component_gauges() -> Dict[str, float]:
+    """Batcher and re-ranker counters for /metrics."""
+    gauges = {}
+    if assistant.batcher is not None:
+        batching = assistant.batcher.stats()
+        gauges['nextstep_embed_batches_total'] = batching['batches']
+        gauges['nextstep_embed_batch_items_total'] = batching['items']
+        gauges['nextstep_embed_avg_batch_size'] = batching['avg_batch_size']
+        gauges['nextstep_embed_avg_queue_wait_ms'] = batching['avg_queue_wait_ms']
+    if assistant.reranker is not None:
+        rerank = assistant.reranker.stats()
+        gauges['nextstep_rerank_calls_total'] = rerank['calls']
+        for reason, count in rerank['skipped'].items():
+            gauges[f'nextstep_rerank_skipped_total{{reason="{reason}"}}'] = count
+    return gauges
+
+# `kill -USR1 <pid>` profiles just that worker (see profiling.py)
+if os.getenv('NEXTSTEP_PROFILE_SIGNAL', '0') == '1':
+    install_signal_handler()
+
+metrics.REGISTRY.register_collector(metrics.lru_cache_gauges('language_detection', detect_language))
+metrics.REGISTRY.register_collector(component_gauges)
+
+# Paths with their own request metrics; everything else is counted as 'other'
+TIMED_PATHS = {"/", "/health", "/chat", "/chat/stream", "/search/batch", "/suggest", "/categories", "/stats", "/metrics"}
+
+# Per-request stage timings: Server-Timing header plus /metrics histograms
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    timer = metrics.start_request()
+    response = await call_next(request)
+    response.headers['Server-Timing'] = timer.server_timing()
+    path = request.url.path if request.url.path in TIMED_PATHS else 'other'
+    elapsed = time.perf_counter() - timer.started
+    metrics.REQUEST_SECONDS.observe(elapsed, path=path, status=response.status_code)
+    metrics.REQUESTS.inc(path=path, status=response.status_code)
+    entry = getattr(request.state, 'log_entry', None)
+    if request_log is not None and entry is not None:
+        request_log.write(path, status=response.status_code, total_ms=elapsed * 1000.0,
+                          stages=timer.stage_ms(), **entry)
+    return response
+
+# Typeahead over resource names, services, categories and popular queries
+suggester = SuggestIndex(min_query_count=int(os.getenv('NEXTSTEP_SUGGEST_MIN_COUNT', '3')))
+SUGGEST_REFRESH = float(os.getenv('NEXTSTEP_SUGGEST_REFRESH', '300'))
+
+# Append-only log of chat traffic, replayed at startup to warm caches
+request_log = RequestLog(log_path(), max_mb=float(os.getenv('NEXTSTEP_REQUEST_LOG_MAX_MB', '100'))) \
+    if log_path() else None
+
+# Answers for the category buttons and popular queries, served from memory
+precomputed = None
+if os.getenv('NEXTSTEP_PRECOMPUTE', '1') == '1':
+    precomputed = PrecomputedAnswers(
+        assistant, CATEGORIES, SUGGESTION_PILLS,
+        top_queries=lambda n: [(query, None) for query in suggester.popular_queries(n)],
+        top_n=int(os.getenv('NEXTSTEP_PRECOMPUTE_TOP_N', '20')),
+        interval=float(os.getenv('NEXTSTEP_PRECOMPUTE_INTERVAL', '600'))
+    )
+
+# Bounded concurrency and queueing for /chat with load shedding (NEXTSTEP_ADMISSION=0 to disable)
+admission = None
+if os.getenv('NEXTSTEP_ADMISSION', '1') == '1':
+    admission = AdmissionController(
+        max_concurrent=int(os.getenv('NEXTSTEP_CHAT_MAX_CONCURRENT', '8')),
+        max_queue=int(os.getenv('NEXTSTEP_CHAT_MAX_QUEUE', '32')),
+        queue_budget_ms=float(os.getenv('NEXTSTEP_CHAT_QUEUE_BUDGET_MS', '250')),
+        max_wait_ms=float(os.getenv('NEXTSTEP_CHAT_MAX_WAIT_MS', '2000'))
+    )
+    metrics.REGISTRY.register_collector(admission.gauges)
+
+# Multi-turn conversations keyed by session_id (NEXTSTEP_SESSIONS=0 to disable)
+sessions = None
+if os.getenv('NEXTSTEP_SESSIONS', '1') == '1':
+    sessions = SessionStore(
+        max_sessions=int(os.getenv('NEXTSTEP_SESSION_MAX', '2000')),
+        ttl=float(os.getenv('NEXTSTEP_SESSION_TTL', '1800')),
+        max_turns=int(os.getenv('NEXTSTEP_SESSION_TURNS', '3'))
+    )
+    metrics.REGISTRY.register_collector(sessions.gauges)
+
+BATCH_MAX_QUERIES = int(os.getenv('NEXTSTEP_BATCH_MAX_QUERIES', '1000'))
+
+suggest_refresh_lock = threading.Lock()
+
+def refresh_suggestions():
+    """Rebuild the suggestion index from the current resources (one rebuild at a time)."""
+    if not suggest_refresh_lock.acquire(blocking=False):
+        return
+    try:
+        suggester.build(assistant.db.get_all_resources(), CATEGORIES)
+    except Exception as e:
+        print(f"⚠️  Could not rebuild suggestions: {e}")
+    finally:
+        suggest_refresh_lock.release()
+
 # Pydantic models
 class ChatRequest(BaseModel):
     message: str
     category: Optional[str] = None
+    session_id: Optional[str] = None
 
 class ChatResponseResource(BaseModel):
     name: str
@@ -48,8 +178,28 @@ class ChatResponse(BaseModel):
     response: str
     resources_found: int
     top_resources: List[ChatResponseResource]
+    usage: Optional[Dict[str, Any]] = None
+    query_filters: Optional[Dict[str, Any]] = None
+    service_level: Optional[str] = None
+    session_id: Optional[str] = None
+    follow_up: bool = False
     timestamp: str
 
+class ProfileRequest(BaseModel):
+    seconds: Optional[float] = None
+    requests: Optional[int] = None
+    interval_ms: float = 5.0
+    memory: bool = True
+
+class BatchQuery(BaseModel):
+    query: str
+    category: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchQuery]
+    top_k: int = 5
+    stream: bool = False
+
 class HealthCheck(BaseModel):
     status: str
     version: str
@@ -75,50 +225,226 @@ async def health_check():
         timestamp=datetime.utcnow().isoformat()
     )
 
+def category_answer(request: ChatRequest) -> Optional[Dict[str, Any]]:
+    """Precomputed answer for the request's explicit or parsed category."""
+    if precomputed is None:
+        return None
+    category = request.category or parse_query(request.message).filters.category
+    answer = precomputed.for_category(category)
+    # Stored under the category name; echo what the user asked
+    return {**answer, 'query': request.message} if answer else None
+
+# X-Forwarded-For is only honored from these proxy addresses (comma separated)
+TRUSTED_PROXIES = {p.strip() for p in os.getenv('NEXTSTEP_TRUSTED_PROXIES', '').split(',') if p.strip()}
+# Keys client ids; set it so ids in the request log stay comparable across restarts and workers
+CLIENT_KEY_SECRET = (os.getenv('NEXTSTEP_CLIENT_KEY_SECRET') or os.urandom(32).hex()).encode()
+
+def client_address(http_request: Request) -> str:
+    """Sender address: the peer, or the nearest untrusted X-Forwarded-For hop behind a trusted proxy."""
+    address = http_request.client.host if http_request.client else ''
+    if address in TRUSTED_PROXIES:
+        hops = [hop.strip() for hop in http_request.headers.get('x-forwarded-for', '').split(',') if hop.strip()]
+        for hop in reversed(hops):
+            address = hop
+            if hop not in TRUSTED_PROXIES:
+                break
+    return address
+
+def client_key(http_request: Request) -> str:
+    """Keyed hash of the sender address, so logged ids can't be reversed to IPs without the secret."""
+    return hmac.new(CLIENT_KEY_SECRET, client_address(http_request).encode(), hashlib.sha256).hexdigest()[:16]
+
+def open_session(request: ChatRequest):
+    """The request's session (a new one for unknown or expired ids), or None when disabled."""
+    return sessions.get_or_create(request.session_id) if sessions else None
+
+def answer_without_search(request: ChatRequest, session) -> Optional[Dict[str, Any]]:
+    """Precomputed answer for a conversation's first turn."""
+    if precomputed is None or (session is not None and session.turns):
+        return None
+    return precomputed.get(request.message, request.category)
+
+def record_turn(session, request: ChatRequest, result: Dict[str, Any]):
+    """Note a turn answered without a search so follow-ups still get its summary."""
+    if session is not None:
+        with session.lock:
+            session.add_turn(request.message, [r.get('name', '') for r in result.get('top_resources', [])])
+
+async def admit(http_request: Request) -> float:
+    """Wait for a chat slot; 429 with Retry-After when saturated."""
+    try:
+        return await admission.acquire()
+    except Saturated as e:
+        http_request.state.log_entry['level'] = 'rejected'
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
-    """Main chat endpoint for the healthcare assistant."""
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    """Main chat endpoint for the healthcare assistant.
+    
+    Precomputed answers are served without admission; everything else
+    waits for a slot and may be degraded if it queued too long. Pass the
+    returned session_id back to continue the conversation.
+    """
+    client = client_key(http_request)
+    suggester.record_query(request.message, client)
+    session = open_session(request)
+    result = answer_without_search(request, session)
+    if result is not None:
+        record_turn(session, request, result)
+    http_request.state.log_entry = {'query': request.message, 'category': request.category,
+                                    'client': client, 'precomputed': result is not None}
+    level = None
+    if result is None:
+        queue_ms = await admit(http_request) if admission else 0.0
+        started = time.perf_counter()
+        try:
+            level = admission.level_for(queue_ms) if admission else 0
+            if level == 3:
+                result = category_answer(request)
+                if result is None:
+                    level = 2
+                else:
+                    record_turn(session, request, result)
+            if admission:
+                admission.record_level(level)
+            http_request.state.log_entry['level'] = LEVELS[level]
+            if result is None:
+                # Search and generation block, so keep them off the event loop
+                result = await run_in_threadpool(assistant.chat, request.message, request.category, level, session)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+        finally:
+            profiler.request_finished()
+            if admission:
+                admission.release(time.perf_counter() - started)
+    
     try:
-        result = assistant.chat(request.message, request.category)
-        
-        # Format resources for API response
-        formatted_resources = []
-        for resource in result.get('top_resources', []):
-            formatted_resources.append(ChatResponseResource(
-                name=resource.get('name', 'Unknown'),
-                category=resource.get('category', 'Unknown'),
-                address=resource.get('address'),
-                phone=resource.get('phone'),
-                score=resource.get('score', 0.0)
-            ))
-        
-        return ChatResponse(
-            query=result.get('query', request.message),
-            response=result.get('response', ''),
-            resources_found=result.get('resources_found', 0),
-            top_resources=formatted_resources,
-            timestamp=datetime.utcnow().isoformat()
-        )
+        with metrics.span('serialize'):
+            # Format resources for API response
+            formatted_resources = []
+            for resource in result.get('top_resources', []):
+                formatted_resources.append(ChatResponseResource(
+                    name=resource.get('name', 'Unknown'),
+                    category=resource.get('category', 'Unknown'),
+                    address=resource.get('address'),
+                    phone=resource.get('phone'),
+                    score=resource.get('score', 0.0)
+                ))
+            
+            return ChatResponse(
+                query=result.get('query', request.message),
+                response=result.get('response', ''),
+                resources_found=result.get('resources_found', 0),
+                top_resources=formatted_resources,
+                usage=result.get('usage') or None,
+                query_filters=result.get('query_filters'),
+                service_level=LEVELS[level] if level else None,
+                session_id=session.id if session else None,
+                follow_up=result.get('follow_up', False),
+                timestamp=datetime.utcnow().isoformat()
+            )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    """Stream the assistant response as plain text while it is generated.
+    
+    The session id is returned in the X-Session-Id header.
+    """
+    session = open_session(request)
+    headers = {"X-Session-Id": session.id} if session else None
+    cached = answer_without_search(request, session)
+    # Logged when streaming starts, so generation time is not in its stages
+    http_request.state.log_entry = {'query': request.message, 'category': request.category,
+                                    'precomputed': cached is not None}
+    if cached is not None:
+        record_turn(session, request, cached)
+        return PlainTextResponse(cached['response'], media_type="text/plain; charset=utf-8", headers=headers)
+    if admission is None:
+        # Starlette iterates sync generators in its threadpool
+        return StreamingResponse(
+            assistant.stream_chat(request.message, request.category, session=session),
+            media_type="text/plain; charset=utf-8", headers=headers
+        )
+    
+    queue_ms = await admit(http_request)
+    slot = AdmissionSlot(admission)
+    try:
+        level = admission.level_for(queue_ms)
+        if level == 3:
+            cached = category_answer(request)
+            if cached is None:
+                level = 2
+        admission.record_level(level)
+        http_request.state.log_entry['level'] = LEVELS[level]
+    except Exception:
+        slot.release()
+        raise
+    if cached is not None:
+        slot.release()
+        record_turn(session, request, cached)
+        return PlainTextResponse(cached['response'], media_type="text/plain; charset=utf-8", headers=headers)
+    
+    def body():
+        try:
+            yield from assistant.stream_chat(request.message, request.category, level, session)
+        finally:
+            slot.release()
+    
+    # The generator's finally only runs once iteration starts; the task and
+    # the slot's own cleanup cover responses that are never streamed
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8", headers=headers,
+                             background=BackgroundTask(slot.release))
+
+@app.delete("/chat/session/{session_id}")
+async def end_session(session_id: str):
+    """Forget a conversation (the frontend's Clear button)."""
+    return {"deleted": bool(sessions and sessions.delete(session_id))}
+
+@app.post("/search/batch")
+async def search_batch_endpoint(request: BatchSearchRequest, http_request: Request):
+    """Ranked resources for many queries at once, without LLM generation.
+    
+    With stream=true results are sent as NDJSON, one line per query in
+    request order, as each block of queries is scored.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUERIES} queries per batch")
+    queries = [q.query for q in request.queries]
+    categories = [q.category for q in request.queries]
+    top_k = max(1, min(request.top_k, 50))
+    http_request.state.log_entry = {'query': None, 'category': None, 'batch_size': len(queries)}
+    
+    if request.stream:
+        lines = (json.dumps(result, ensure_ascii=False) + "\n"
+                 for result in assistant.iter_search_batch(queries, top_k, categories, block_size=64))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    try:
+        results = await run_in_threadpool(assistant.search_batch, queries, top_k, categories)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+    return {"count": len(results), "results": results}
+
 @app.get("/categories")
 async def get_categories():
     """Get available resource categories."""
-    categories = [
-        {"id": "food", "name": "Food Assistance", "icon": "🍽️"},
-        {"id": "mental_health", "name": "Mental Health", "icon": "🧠"},
-        {"id": "healthcare", "name": "Healthcare", "icon": "🏥"},
-        {"id": "housing", "name": "Housing", "icon": "🏠"},
-        {"id": "substance_abuse", "name": "Substance Abuse", "icon": "💊"},
-        {"id": "dental", "name": "Dental Care", "icon": "🦷"},
-        {"id": "vision", "name": "Vision Care", "icon": "👁️"},
-        {"id": "transportation", "name": "Transportation", "icon": "🚌"},
-        {"id": "education", "name": "Education", "icon": "📚"},
-        {"id": "telecommunications", "name": "Phone Services", "icon": "📱"},
-        {"id": "interpersonal_violence", "name": "Domestic Violence", "icon": "🛡️"}
-    ]
-    return {"categories": categories}
+    return {"categories": CATEGORIES}
+
+@app.get("/suggest")
+async def suggest_endpoint(q: str = "", limit: int = 8):
+    """Typeahead completions for a partial query (names, services, categories, popular queries)."""
+    if suggester.built_at is None:
+        await run_in_threadpool(refresh_suggestions)
+    elif time.time() - suggester.built_at > SUGGEST_REFRESH:
+        # Serve the current index while a fresh one is built
+        threading.Thread(target=refresh_suggestions, daemon=True).start()
+    with metrics.span('suggest'):
+        suggestions = suggester.suggest(q, limit=max(1, min(limit, 20)))
+    return {"query": q, "suggestions": suggestions}
 
 @app.get("/stats")
 async def get_stats():
@@ -136,11 +462,69 @@ async def get_stats():
             "total_resources": len(all_resources),
             "categories": len(category_counts),
             "category_breakdown": category_counts,
+            "embedding_batching": assistant.batcher.stats() if assistant.batcher else None,
+            "embedding_version": assistant.pipeline.version,
+            "reranker": assistant.reranker.stats() if assistant.reranker else None,
+            "db_cache": assistant.db.cache_stats(),
+            "rolling_reembed": reembed_job.stats() if reembed_job else None,
+            "precomputed": precomputed.stats() if precomputed else None,
+            "admission": admission.stats() if admission else None,
+            "sessions": sessions.stats() if sessions else None,
             "last_updated": datetime.utcnow().isoformat()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Stage latency histograms, request counters and cache hit ratios (Prometheus text format)."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def require_admin(token: Optional[str]):
+    """Admin endpoints exist only when NEXTSTEP_ADMIN_TOKEN is set."""
+    expected = os.getenv('NEXTSTEP_ADMIN_TOKEN')
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest((token or '').encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/admin/profile")
+async def start_profile(request: ProfileRequest, x_admin_token: Optional[str] = Header(None)):
+    """Profile this worker for a time window or the next N /chat requests."""
+    require_admin(x_admin_token)
+    try:
+        profiler.start(seconds=request.seconds, requests=request.requests,
+                       interval_ms=request.interval_ms, memory=request.memory)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.status()
+
+@app.get("/admin/profile")
+async def get_profile(x_admin_token: Optional[str] = Header(None)):
+    """Profile status, plus the top allocation sites once it has finished."""
+    require_admin(x_admin_token)
+    status = profiler.status()
+    if profiler.result is not None:
+        status['result'] = {k: v for k, v in profiler.result.items() if k != 'collapsed'}
+    return status
+
+@app.get("/admin/profile/collapsed", response_class=PlainTextResponse)
+async def get_profile_collapsed(x_admin_token: Optional[str] = Header(None)):
+    """Last profile as collapsed stacks for flamegraph.pl or speedscope."""
+    require_admin(x_admin_token)
+    if profiler.result is None:
+        raise HTTPException(status_code=404, detail="No finished profile in this worker")
+    return PlainTextResponse(profiler.result['collapsed'] + "\n")
+
+@app.delete("/admin/profile")
+async def stop_profile(x_admin_token: Optional[str] = Header(None)):
+    """End the running profile early."""
+    require_admin(x_admin_token)
+    await run_in_threadpool(profiler.stop)
+    return profiler.status()
+
 # Mount static files with absolute path resolution
 try:
     frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
@@ -149,9 +533,33 @@ try:
 except Exception as e:
     print(f"Warning: Could not mount static files: {e}")
 
+@app.on_event("startup")
+async def startup_event():
+    if request_log is not None and os.getenv('NEXTSTEP_WARMUP', '1') == '1':
+        entries = read_log(request_log.path, limit=int(os.getenv('NEXTSTEP_WARMUP_MAX', '5000')))
+        if entries:
+            report = await run_in_threadpool(warm_up, assistant, entries, suggester)
+            paged = f", {report['page_cache_mb']:.0f} MB of index paged in" if 'page_cache_mb' in report else ""
+            print(f"🔥 Warmed up from {report['entries']} logged requests in {report['seconds']:.1f}s: "
+                  f"{report.get('embedded', 0)} query embeddings{paged}")
+    if reembed_job is not None:
+        reembed_job.start()
+    if index_watch is not None:
+        index_watch.start()
+    if precomputed is not None:
+        precomputed.start()
+
 # Cleanup on shutdown
 @app.on_event("shutdown")
 async def shutdown_event():
+    if reembed_job is not None:
+        reembed_job.stop()
+    if index_watch is not None:
+        index_watch.stop()
+    if precomputed is not None:
+        precomputed.stop()
+    if request_log is not None:
+        request_log.close()
     assistant.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Bulk resource lookup for case management lists.
+
+Reads client needs from a text file (one query per line) or a CSV with a
+`query` column and an optional `category` column, and writes ranked
+resources per query as NDJSON, without LLM generation:
+
+    python batch_search.py needs.csv --top-k 3 --output matches.ndjson
+
+Queries are embedded and scored block by block (one encode call and one
+matrix-matrix product per block), like POST /search/batch.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import List, Optional, Tuple
+
+
+def read_queries(path: str) -> Tuple[List[str], List[Optional[str]]]:
+    """Queries and category filters from a .csv (query[, category]) or plain text file."""
+    queries, categories = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            for row in csv.DictReader(f):
+                query = (row.get('query') or '').strip()
+                if query:
+                    queries.append(query)
+                    categories.append((row.get('category') or '').strip() or None)
+        else:
+            for line in f:
+                if line.strip():
+                    queries.append(line.strip())
+                    categories.append(None)
+    return queries, categories
+
+
+def main():
+    from nextstep_assistant import NextStepAssistant
+
+    parser = argparse.ArgumentParser(description="Search many client needs at once (NDJSON output)")
+    parser.add_argument("input", help="Text file with one query per line, or CSV with query[,category] columns")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--category", help="Category filter for queries without one")
+    parser.add_argument("--block-size", type=int, default=256, help="Queries per encode call")
+    parser.add_argument("--output", help="Write NDJSON here instead of stdout")
+    args = parser.parse_args()
+
+    queries, categories = read_queries(args.input)
+    categories = [c or args.category for c in categories]
+    if not queries:
+        print(f"❌ No queries in {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    assistant = NextStepAssistant(use_openai=False)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        for result in assistant.iter_search_batch(queries, args.top_k, categories, block_size=args.block_size):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            out.close()
+        assistant.close()
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(queries)} queries in {elapsed:.2f}s ({len(queries) / elapsed:.0f} queries/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
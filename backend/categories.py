@@ -0,0 +1,23 @@
+"""Resource categories shown as buttons in the frontend."""
+
+CATEGORIES = [
+    {"id": "food", "name": "Food Assistance", "icon": "🍽️"},
+    {"id": "mental_health", "name": "Mental Health", "icon": "🧠"},
+    {"id": "healthcare", "name": "Healthcare", "icon": "🏥"},
+    {"id": "housing", "name": "Housing", "icon": "🏠"},
+    {"id": "substance_abuse", "name": "Substance Abuse", "icon": "💊"},
+    {"id": "dental", "name": "Dental Care", "icon": "🦷"},
+    {"id": "vision", "name": "Vision Care", "icon": "👁️"},
+    {"id": "transportation", "name": "Transportation", "icon": "🚌"},
+    {"id": "education", "name": "Education", "icon": "📚"},
+    {"id": "telecommunications", "name": "Phone Services", "icon": "📱"},
+    {"id": "interpersonal_violence", "name": "Domestic Violence", "icon": "🛡️"}
+]
+
+# Texts the frontend's suggestion pills send (frontend/index.html data-text)
+SUGGESTION_PILLS = [
+    "I require mental health counseling services",
+    "I need assistance with food security and nutrition programs",
+    "I require emergency housing services",
+    "I need affordable dental care services",
+]
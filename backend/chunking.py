@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Chunking scheme for resource embeddings.
+
+Each chunk type turns some resource fields into one short text. Coded
+values (food_pantry, age_18_plus, ...) are humanized so they match the
+words people actually type. Search weights chunk types when picking each
+resource's best chunk.
+
+NEXTSTEP_CHUNK_TYPES     comma list of chunk types to embed (default: all)
+NEXTSTEP_CHUNK_WEIGHTS   overrides, e.g. "hours=0.7,location=0.8"
+"""
+
+import os
+from typing import List, Dict, Any, Callable, Optional
+
+from translation import translate_code
+
+UNKNOWN_VALUES = {'', 'unknown', 'none', 'nan', 'varies', 'cost', 'eligibility',
+                  'accessibility', 'appointment_required'}
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# Weight applied to a chunk's cosine score before the per-resource max
+DEFAULT_CHUNK_WEIGHTS: Dict[str, float] = {
+    'description': 1.0,
+    'services': 1.0,
+    'requirements': 0.9,
+    'access': 0.95,
+    'hours': 0.85,
+    'location': 0.85,
+}
+
+
+def humanize_list(values: List[str]) -> str:
+    return ", ".join(translate_code(v) for v in values if v and v.strip().lower() not in UNKNOWN_VALUES)
+
+
+def known(value: Any) -> bool:
+    return bool(value) and str(value).strip().lower() not in UNKNOWN_VALUES
+
+
+def description_chunk(resource: Dict[str, Any]) -> Optional[str]:
+    text = f"Name: {resource['name']}\nCategory: {resource['category']}\n"
+    if resource.get('notes'):
+        text += f"Notes: {resource['notes']}"
+    return text
+
+
+def requirements_chunk(resource: Dict[str, Any]) -> Optional[str]:
+    values = humanize_list(resource.get('requirements') or [])
+    if not values and 'none' in (resource.get('requirements') or []):
+        values = translate_code('none')
+    return f"Requirements: {values}" if values else None
+
+
+def services_chunk(resource: Dict[str, Any]) -> Optional[str]:
+    values = humanize_list(resource.get('services') or [])
+    return f"Services: {values}" if values else None
+
+
+def access_chunk(resource: Dict[str, Any]) -> Optional[str]:
+    """Cost, eligibility, appointment and accessibility in one sentence list."""
+    parts = []
+    if known(resource.get('cost')):
+        parts.append(f"Cost: {humanize_list(resource['cost'].split(','))}")
+    if known(resource.get('eligibility')):
+        parts.append(f"Eligibility: {humanize_list(resource['eligibility'].split(','))}")
+    appointment = str(resource.get('appointment_required') or '').strip().lower()
+    if appointment in ('yes', 'true', 'required'):
+        parts.append("Appointment required")
+    elif appointment in ('no', 'false', 'walk_in'):
+        parts.append("Walk-in, no appointment needed")
+    if known(resource.get('accessibility')):
+        parts.append(humanize_list(resource['accessibility'].split(',')).capitalize())
+    if not parts:
+        return None
+    return f"{resource['name']}. " + ". ".join(parts)
+
+
+def hours_chunk(resource: Dict[str, Any]) -> Optional[str]:
+    hours = resource.get('hours_structured') or {}
+    open_days = [(day, hours[day]) for day in WEEKDAYS
+                 if day in hours and str(hours[day]).strip().lower() != 'closed']
+    if not open_days:
+        return None
+    text = "Hours: " + "; ".join(f"Open {day.title()} {time}" for day, time in open_days)
+    weekend = [day.title() for day, _ in open_days if day in ('saturday', 'sunday')]
+    if weekend:
+        text += f". Open on weekends ({' and '.join(weekend)})"
+    return text
+
+
+def location_chunk(resource: Dict[str, Any]) -> Optional[str]:
+    if not known(resource.get('address')):
+        return None
+    return f"{resource['name']} is located at {resource['address']}"
+
+
+CHUNK_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {
+    'description': description_chunk,
+    'requirements': requirements_chunk,
+    'services': services_chunk,
+    'access': access_chunk,
+    'hours': hours_chunk,
+    'location': location_chunk,
+}
+
+
+def configured_chunk_types() -> List[str]:
+    """Chunk types to embed, from NEXTSTEP_CHUNK_TYPES (default: all)."""
+    value = os.getenv('NEXTSTEP_CHUNK_TYPES')
+    if not value:
+        return list(CHUNK_BUILDERS)
+    types = [t.strip() for t in value.split(',') if t.strip()]
+    unknown = set(types) - set(CHUNK_BUILDERS)
+    if unknown:
+        raise ValueError(f"Unknown chunk types {sorted(unknown)}, expected {list(CHUNK_BUILDERS)}")
+    return types
+
+
+def configured_chunk_weights() -> Dict[str, float]:
+    """Chunk type weights, with NEXTSTEP_CHUNK_WEIGHTS overrides applied."""
+    weights = dict(DEFAULT_CHUNK_WEIGHTS)
+    for item in os.getenv('NEXTSTEP_CHUNK_WEIGHTS', '').split(','):
+        if '=' in item:
+            name, value = item.split('=', 1)
+            weights[name.strip()] = float(value)
+    return weights
+
+
+def build_chunks(resource: Dict[str, Any], chunk_types: List[str]) -> List[Dict[str, Any]]:
+    """Build the text chunks for one resource."""
+    chunks = []
+    for chunk_type in chunk_types:
+        text = CHUNK_BUILDERS[chunk_type](resource)
+        if text:
+            chunks.append({'content_type': chunk_type, 'text': text})
+    return chunks
@@ -1,19 +1,248 @@
-from astrapy import DataAPIClient
-from typing import List, Dict, Any
+try:
+    from astrapy import DataAPIClient
+except ImportError:
+    DataAPIClient = None
+from typing import List, Dict, Any, Optional, Callable
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from datetime import datetime
 import uuid
+from abc import ABC, abstractmethod
+
+from metrics import record_cache
 
 load_dotenv()
 
-class DatabaseInterface:
+
+def resource_document(resource: Dict[str, Any], resource_id: str) -> Dict[str, Any]:
+    """Stored form of a resource."""
+    return {
+        '_id': resource_id,
+        'name': resource['name'],
+        'category': resource['category'],
+        'address': resource.get('address'),
+        'coordinates': resource.get('coordinates'),
+        'phone': resource.get('phone'),
+        'hours_structured': resource.get('hours_structured', {}),
+        'hours_text': resource.get('hours_text'),
+        'services': resource.get('services', []),
+        'requirements': resource.get('requirements', []),
+        'cost': resource.get('cost'),
+        'eligibility': resource.get('eligibility'),
+        'accessibility': resource.get('accessibility'),
+        'appointment_required': resource.get('appointment_required'),
+        'website': resource.get('website'),
+        'languages': resource.get('languages', []),
+        'notes': resource.get('notes'),
+        'verified_at': resource.get('verified_at'),
+        'status': resource.get('status', 'pending'),
+        'created_at': datetime.utcnow().isoformat(),
+        'updated_at': datetime.utcnow().isoformat()
+    }
+
+
+def embedding_document(embedding: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored form of an embedding record."""
+    return {
+        '_id': str(uuid.uuid4()),
+        'resource_id': embedding['resource_id'],
+        'content_type': embedding['content_type'],
+        'language': embedding['language'],
+        'embedding': embedding['embedding'],
+        'model': embedding.get('model'),
+        'dimension': embedding.get('dimension', len(embedding['embedding'])),
+        'embedding_version': embedding.get('embedding_version'),
+        'normalized': embedding.get('normalized', False),
+        'translated': embedding.get('translated', False),
+        'text_chunk': embedding['text_chunk'],
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+
+class ReadCache:
+    """Read-through cache with stale-while-revalidate.
+
+    Within `ttl` seconds an entry is served as is. For the next
+    `stale_ttl` seconds it is still served, while one background thread
+    per key reloads it. Older or missing entries load synchronously; if
+    that load fails, any cached value is served instead of the error, so
+    reads survive short outages of the backing store. invalidate() bumps a
+    generation counter; a load that started before it is returned to its
+    caller but not stored, so it can't bring back pre-invalidation data.
+    """
+
+    def __init__(self, name: str, ttl: float = 300.0, stale_ttl: float = 3600.0):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[str, tuple] = {}
+        self._refreshing = set()
+        # Bumped by invalidate(): per key, and for everything at once
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._counts = {'hit': 0, 'stale': 0, 'miss': 0, 'error_fallback': 0, 'refresh_failed': 0}
+
+    def _count(self, result: str):
+        with self._lock:
+            self._counts[result] += 1
+        record_cache(self.name, result)
+
+    def get(self, key: str, load: Callable[[], Any]) -> Any:
+        """Cached value for key, calling load() when it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+        age = time.monotonic() - entry[1] if entry else None
+        if entry and age < self.ttl:
+            self._count('hit')
+            return entry[0]
+        if entry and age < self.ttl + self.stale_ttl:
+            self._count('stale')
+            self._refresh(key, load)
+            return entry[0]
+
+        self._count('miss')
+        generation = self._generation(key)
+        try:
+            value = load()
+        except Exception as e:
+            if entry is None:
+                raise
+            self._count('error_fallback')
+            print(f"⚠️  {self.name}: reload failed ({e}), serving data {age:.0f}s old")
+            return entry[0]
+        self.put(key, value, generation)
+        return value
+
+    def _generation(self, key: str) -> tuple:
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def put(self, key: str, value: Any, generation: Optional[tuple] = None):
+        """Store a value; skipped when loaded under an older `generation`."""
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(key, 0)):
+                return
+            self._entries[key] = (value, time.monotonic())
+
+    def _refresh(self, key: str, load: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        generation = self._generation(key)
+
+        def run():
+            try:
+                self.put(key, load(), generation)
+            except Exception as e:
+                self._count('refresh_failed')
+                print(f"⚠️  {self.name}: background refresh of {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"{self.name}-refresh", daemon=True).start()
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._entries)
+        lookups = counts['hit'] + counts['stale'] + counts['miss']
+        return {
+            'ttl_s': self.ttl,
+            'stale_ttl_s': self.stale_ttl,
+            'entries': entries,
+            **counts,
+            'hit_ratio': (counts['hit'] + counts['stale']) / lookups if lookups else 0.0,
+        }
+
+
+class StorageBackend(ABC):
+    """Operations every storage backend provides.
+
+    Filters are Data API style documents: {'field': value} equality and
+    {'field': {'$in': [...]}}.
+    """
+
+    @abstractmethod
+    def insert_resource(self, resource: Dict[str, Any]) -> str:
+        """Insert a new resource and return its ID."""
+
+    @abstractmethod
+    def insert_embedding(self, embedding: Dict[str, Any]):
+        """Insert a new embedding."""
+
+    def insert_embeddings(self, embeddings: List[Dict[str, Any]]):
+        """Insert several embeddings; backends override this with a bulk write."""
+        for embedding in embeddings:
+            self.insert_embedding(embedding)
+
+    @abstractmethod
+    def get_all_embeddings(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Get embedding documents, optionally filtered (e.g. by model)."""
+
+    @abstractmethod
+    def delete_embeddings(self, filters: Dict[str, Any]) -> int:
+        """Delete embedding documents matching filters; returns the count deleted."""
+
+    @abstractmethod
+    def search_similar(self, query_embedding: List[float], limit: int = 5,
+                       filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Search for similar resources."""
+
+    @abstractmethod
+    def get_all_resources(self) -> List[Dict[str, Any]]:
+        """Get all resources from the database."""
+
+    def get_resource(self, resource_id: str) -> Optional[Dict[str, Any]]:
+        """Get one resource by ID; backends override this with a keyed lookup."""
+        for resource in self.get_all_resources():
+            if resource.get('_id') == resource_id:
+                return resource
+        return None
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Read cache counters, for backends that cache."""
+        return None
+
+    def close(self):
+        """Release the backend's connections."""
+
+
+class DatabaseInterface(StorageBackend):
     def __init__(self):
-        """Initialize database interface using astrapy REST API."""
+        """Initialize database interface using astrapy REST API.
+        
+        Resource reads go through a stale-while-revalidate cache
+        (NEXTSTEP_DB_CACHE_TTL seconds fresh, then NEXTSTEP_DB_CACHE_STALE
+        seconds served while refreshing; a TTL of 0 disables it).
+        """
+        if DataAPIClient is None:
+            raise ImportError("astrapy is required for the Astra DB backend")
         # Use astrapy REST API
         self.client = DataAPIClient(os.getenv('ASTRA_API_TOKEN'))
         self.db = self.client.get_database(os.getenv('ASTRA_API_ENDPOINT'))
         
+        self.cache = None
+        ttl = float(os.getenv('NEXTSTEP_DB_CACHE_TTL', '300'))
+        if ttl > 0:
+            self.cache = ReadCache('astra_resources', ttl=ttl,
+                                   stale_ttl=float(os.getenv('NEXTSTEP_DB_CACHE_STALE', '3600')))
+        
         # Create collections if they don't exist
         self.create_collections()
     
@@ -38,27 +267,10 @@ class DatabaseInterface:
         # Get resources collection
         collection = self.db.get_collection('resources')
         
-        # Prepare resource document
-        resource_doc = {
-            '_id': resource_id,
-            'name': resource['name'],
-            'category': resource['category'],
-            'address': resource.get('address'),
-            'coordinates': resource.get('coordinates'),
-            'phone': resource.get('phone'),
-            'hours_structured': resource.get('hours_structured', {}),
-            'hours_text': resource.get('hours_text'),
-            'requirements': resource.get('requirements', []),
-            'languages': resource.get('languages', []),
-            'notes': resource.get('notes'),
-            'verified_at': resource.get('verified_at'),
-            'status': resource.get('status', 'pending'),
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
-        }
-        
         # Insert resource
-        collection.insert_one(resource_doc)
+        collection.insert_one(resource_document(resource, resource_id))
+        if self.cache is not None:
+            self.cache.invalidate('all')
         
         return resource_id
     
@@ -67,19 +279,26 @@ class DatabaseInterface:
         # Get embeddings collection
         collection = self.db.get_collection('embeddings')
         
-        # Prepare embedding document
-        embedding_doc = {
-            '_id': str(uuid.uuid4()),
-            'resource_id': embedding['resource_id'],
-            'content_type': embedding['content_type'],
-            'language': embedding['language'],
-            'embedding': embedding['embedding'],
-            'text_chunk': embedding['text_chunk'],
-            'created_at': datetime.utcnow().isoformat()
-        }
-        
         # Insert embedding
-        collection.insert_one(embedding_doc)
+        collection.insert_one(embedding_document(embedding))
+    
+    def insert_embeddings(self, embeddings: List[Dict[str, Any]]):
+        """Insert several embeddings with one insert_many call."""
+        if embeddings:
+            self.db.get_collection('embeddings').insert_many([embedding_document(e) for e in embeddings])
+    
+    def get_all_embeddings(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Get embedding documents, optionally filtered (e.g. by model)."""
+        collection = self.db.get_collection('embeddings')
+        return list(collection.find(filters or {}))
+    
+    def delete_embeddings(self, filters: Dict[str, Any]) -> int:
+        """Delete embedding documents matching filters; returns the count deleted."""
+        if not filters:
+            raise ValueError("Refusing to delete embeddings without a filter")
+        collection = self.db.get_collection('embeddings')
+        result = collection.delete_many(filters)
+        return result.deleted_count
     
     def search_similar(self, query_embedding: List[float], 
                       limit: int = 5,
@@ -104,21 +323,52 @@ class DatabaseInterface:
             'similarity': 1.0  # Placeholder for similarity score
         } for r in results]
     
+    def _fetch_resources(self) -> List[Dict[str, Any]]:
+        collection = self.db.get_collection('resources')
+        return list(collection.find({}))
+    
     def get_all_resources(self) -> List[Dict[str, Any]]:
         """Get all resources from the database."""
-        collection = self.db.get_collection('resources')
-        results = collection.find({})
-        return list(results)
+        if self.cache is None:
+            return self._fetch_resources()
+        return list(self.cache.get('all', self._fetch_resources))
+    
+    def get_resource(self, resource_id: str) -> Optional[Dict[str, Any]]:
+        """Get one resource by ID."""
+        def fetch():
+            return self.db.get_collection('resources').find_one({'_id': resource_id})
+        if self.cache is None:
+            return fetch()
+        return self.cache.get(f"id:{resource_id}", fetch)
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hit/miss counts of the resource read cache."""
+        return self.cache.stats() if self.cache is not None else None
     
     def close(self):
         """Close the database connection."""
         pass  # astrapy doesn't need explicit closing
 
+
+def create_database(backend: Optional[str] = None) -> StorageBackend:
+    """Create the storage backend selected by NEXTSTEP_DB_BACKEND.
+
+    'astra' (default) uses Astra DB via ASTRA_API_TOKEN/ASTRA_API_ENDPOINT;
+    'local' uses the SQLite file at NEXTSTEP_LOCAL_DB_PATH.
+    """
+    backend = (backend or os.getenv('NEXTSTEP_DB_BACKEND', 'astra')).lower()
+    if backend == 'astra':
+        return DatabaseInterface()
+    if backend == 'local':
+        from local_db import LocalDatabase
+        return LocalDatabase()
+    raise ValueError(f"Unknown database backend '{backend}', expected 'astra' or 'local'")
+
 # Example usage
 if __name__ == "__main__":
-    print("Testing DataStax Astra DB connection...")
+    print("Testing database connection...")
     try:
-        db = DatabaseInterface()
+        db = create_database()
         print("✅ Database connection successful!")
         
         # Test getting all resources
@@ -138,9 +388,9 @@ if __name__ == "__main__":
         resource_id = db.insert_resource(sample_resource)
         print(f"✅ Sample resource inserted with ID: {resource_id}")
         
-        # Test search
+        # Test search (metadata-only filter, so any vector length works)
         results = db.search_similar(
-            [0.1] * 768,  # Dummy embedding
+            [0.1] * 384,  # Dummy embedding
             filters={'category': 'healthcare'}
         )
         print(f"✅ Search test completed, found {len(results)} results")
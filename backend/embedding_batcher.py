@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Dict, Any, Callable, Optional
+
+import numpy as np
+
+from metrics import record_cache
+
+# Upper bounds of the achieved-batch-size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+
+
+class EmbeddingBatcher:
+    """Micro-batches concurrent query embeddings into single encode calls.
+
+    Callers enqueue text and block on a Future; a worker thread collects
+    requests until `max_batch_size` items are waiting or `max_wait_ms` has
+    passed since the first one arrived, encodes them in one call and
+    resolves every Future with its own row.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._queue_wait_total = 0.0
+        self._encode_time_total = 0.0
+        self._histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS + [float('inf')]}
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Enqueue text for embedding and return a Future for its vector."""
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = 30.0) -> np.ndarray:
+        """Embed a single text through the batcher."""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self) -> List[tuple]:
+        """Block for the first request, then gather more until full or timed out."""
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # re-post shutdown after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+
+            started = time.perf_counter()
+            # Identical queries in one burst are encoded once
+            unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+            try:
+                vectors = self.encode_batch(unique_texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            rows = {text: vectors[i] for i, text in enumerate(unique_texts)}
+            for text, future, _ in batch:
+                future.set_result(rows[text])
+
+            self._record(batch, started, time.perf_counter() - started)
+
+    def _record(self, batch: List[tuple], started: float, encode_time: float):
+        size = len(batch)
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._max_batch = max(self._max_batch, size)
+            self._queue_wait_total += sum(started - enqueued for _, _, enqueued in batch)
+            self._encode_time_total += encode_time
+            for bucket in self._histogram:
+                if size <= bucket:
+                    self._histogram[bucket] += 1
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        """Achieved batch sizes and timing for monitoring."""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': self._items / self._batches if self._batches else 0.0,
+                'largest_batch': self._max_batch,
+                'avg_queue_wait_ms': 1000.0 * self._queue_wait_total / self._items if self._items else 0.0,
+                'avg_encode_ms': 1000.0 * self._encode_time_total / self._batches if self._batches else 0.0,
+                'batch_size_histogram': {
+                    ('+Inf' if bucket == float('inf') else str(bucket)): count
+                    for bucket, count in self._histogram.items()
+                }
+            }
+
+    def close(self):
+        """Stop the worker after pending requests are served."""
+        self._queue.put(None)
+        self._worker.join(timeout=5.0)
+
+
+class EmbeddingCache:
+    """LRU cache of query embeddings for one embedding version."""
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return " ".join(text.split())
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+        record_cache('query_embedding', 'hit' if vector is not None else 'miss')
+        return vector
+
+    def put(self, text: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[self.key(text)] = vector
+            self._entries.move_to_end(self.key(text))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, text: str) -> bool:
+        return self.key(text) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
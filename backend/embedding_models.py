@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import os
+from typing import Dict, Any, Optional
+
+# Supported multilingual sentence-transformers models.
+# Short aliases can be used anywhere a model name is accepted.
+EMBEDDING_MODELS: Dict[str, Dict[str, Any]] = {
+    'mpnet': {
+        'name': 'paraphrase-multilingual-mpnet-base-v2',
+        'dimension': 768,
+        'description': 'Default; best quality, ~278M parameters'
+    },
+    'minilm': {
+        'name': 'paraphrase-multilingual-MiniLM-L12-v2',
+        'dimension': 384,
+        'description': 'Distilled; ~118M parameters, roughly 3x faster on CPU'
+    },
+    'distiluse': {
+        'name': 'distiluse-base-multilingual-cased-v2',
+        'dimension': 512,
+        'description': 'Distilled multilingual USE; ~135M parameters'
+    },
+}
+
+DEFAULT_EMBEDDING_MODEL = 'mpnet'
+
+
+def resolve_model_name(model: str = None) -> str:
+    """Map an alias (or NEXTSTEP_EMBEDDING_MODEL) to a full model name."""
+    model = model or os.getenv('NEXTSTEP_EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+    if model in EMBEDDING_MODELS:
+        return EMBEDDING_MODELS[model]['name']
+    return model
+
+
+def known_dimension(model_name: str) -> int:
+    """Embedding dimension of a registered model, or 0 if unknown."""
+    for info in EMBEDDING_MODELS.values():
+        if info['name'] == model_name:
+            return info['dimension']
+    return 0
+
+
+# Embeddings written before model ids were recorded all came from mpnet
+LEGACY_MODEL = EMBEDDING_MODELS['mpnet']['name']
+
+
+def embedding_version(model_name: str, dimension: int) -> str:
+    """Version key for vectors that can be scored against each other."""
+    return f"{model_name}@{dimension}"
+
+
+def doc_version(doc: Dict[str, Any]) -> Optional[str]:
+    """Version of a stored embedding document, or None if it is inconsistent."""
+    embedding = doc.get('embedding')
+    dimension = len(embedding) if embedding is not None else 0
+    if dimension == 0:
+        return None
+    if doc.get('dimension') and doc['dimension'] != dimension:
+        return None
+    model = doc.get('model')
+    if not model:
+        if dimension != EMBEDDING_MODELS['mpnet']['dimension']:
+            return None
+        model = LEGACY_MODEL
+    return embedding_version(model, dimension)
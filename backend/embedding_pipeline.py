@@ -1,95 +1,178 @@
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
-import torch
+from typing import List, Dict, Any, Optional
+import os
 import numpy as np
-from langdetect import detect
 from datetime import datetime
 
+from embedding_models import resolve_model_name, embedding_version
+from language_detection import detect_language
+from translation import MarianTranslator, translated_chunks, translation_languages
+from chunking import build_chunks, configured_chunk_types
+
+try:
+    import torch
+    from sentence_transformers import SentenceTransformer
+    HAS_TORCH = True
+except ImportError:
+    HAS_TORCH = False
+
 class EmbeddingPipeline:
-    def __init__(self, model_name: str = "paraphrase-multilingual-mpnet-base-v2"):
-        self.model = SentenceTransformer(model_name)
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model.to(self.device)
+    def __init__(self, model_name: Optional[str] = None, backend: Optional[str] = None):
+        """Load the embedding model.
+        
+        model_name is a sentence-transformers model or an alias from
+        embedding_models.EMBEDDING_MODELS ('mpnet', 'minilm', ...), defaulting
+        to NEXTSTEP_EMBEDDING_MODEL and then mpnet.
+        
+        backend is 'torch' (default) or 'onnx', from NEXTSTEP_EMBEDDING_BACKEND
+        when not given. The ONNX backend reads its export from NEXTSTEP_ONNX_DIR
+        and honours NEXTSTEP_ONNX_QUANTIZED and NEXTSTEP_ONNX_THREADS;
+        NEXTSTEP_MAX_SEQ_LENGTH caps token length for both backends.
+        Stored vectors are unit-normalized unless NEXTSTEP_NORMALIZE_EMBEDDINGS=0.
+        Resources also get translated chunks for NEXTSTEP_TRANSLATION_LANGUAGES
+        (default es,vi); notes are machine-translated only with
+        NEXTSTEP_TRANSLATE_NOTES=1.
+        """
+        model_name = resolve_model_name(model_name)
+        self.model_name = model_name
+        self.backend = (backend or os.getenv('NEXTSTEP_EMBEDDING_BACKEND', 'torch')).lower()
+        self.normalize = os.getenv('NEXTSTEP_NORMALIZE_EMBEDDINGS', '1') == '1'
+        self.chunk_types = configured_chunk_types()
+        self.translation_languages = translation_languages()
+        self.translator = MarianTranslator() if os.getenv('NEXTSTEP_TRANSLATE_NOTES', '0') == '1' else None
+        max_seq_length = int(os.getenv('NEXTSTEP_MAX_SEQ_LENGTH', '0')) or None
+        
+        if self.backend == 'onnx':
+            from onnx_backend import OnnxEncoder, default_onnx_dir
+            self.model = None
+            self.device = "cpu"
+            self.onnx_encoder = OnnxEncoder(
+                os.getenv('NEXTSTEP_ONNX_DIR') or default_onnx_dir(model_name),
+                quantized=os.getenv('NEXTSTEP_ONNX_QUANTIZED', '0') == '1',
+                num_threads=int(os.getenv('NEXTSTEP_ONNX_THREADS', '0')) or None,
+                max_seq_length=max_seq_length
+            )
+            self.model_name = self.onnx_encoder.model_name
+            self.dimension = self.onnx_encoder.dimension
+        elif self.backend == 'torch':
+            if not HAS_TORCH:
+                raise ImportError("torch and sentence-transformers are required for the torch backend")
+            self.onnx_encoder = None
+            self.model = SentenceTransformer(model_name)
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.model.to(self.device)
+            if max_seq_length:
+                self.model.max_seq_length = min(max_seq_length, self.model.max_seq_length)
+            self.dimension = self.model.get_sentence_embedding_dimension()
+        else:
+            raise ValueError(f"Unknown embedding backend '{self.backend}', expected 'torch' or 'onnx'")
+        
+        self.version = embedding_version(self.model_name, self.dimension)
         
     def prepare_text_chunks(self, resource: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Prepare text chunks from a resource for embedding generation."""
-        chunks = []
+        """Prepare text chunks from a resource for embedding generation.
         
-        # Basic information chunk
-        basic_info = f"Name: {resource['name']}\nCategory: {resource['category']}\n"
-        if resource.get('notes'):
-            basic_info += f"Notes: {resource['notes']}"
-            
-        chunks.append({
-            'content_type': 'description',
-            'text': basic_info,
-            'language': 'en'  # Default language
-        })
+        Chunk types come from chunking.CHUNK_BUILDERS (description, services,
+        requirements, access, hours, location), limited by NEXTSTEP_CHUNK_TYPES.
+        """
+        chunks = build_chunks(resource, self.chunk_types)
         
-        # Requirements chunk
-        if resource.get('requirements'):
-            req_text = "Requirements: " + ", ".join(resource['requirements'])
-            chunks.append({
-                'content_type': 'requirements',
-                'text': req_text,
-                'language': 'en'
-            })
-            
-        # Services chunk (if available)
-        if resource.get('services'):
-            services_text = "Services: " + ", ".join(resource['services'])
-            chunks.append({
-                'content_type': 'services',
-                'text': services_text,
-                'language': 'en'
-            })
+        for chunk in chunks:
+            if chunk['content_type'] == 'description':
+                # Detect on the field values, not the English labels
+                chunk['language'] = self.detect_language(f"{resource['name']} {resource.get('notes') or ''}")
+            else:
+                chunk['language'] = self.detect_language(chunk['text'])
             
         return chunks
     
     def detect_language(self, text: str) -> str:
-        """Detect the language of the input text."""
-        try:
-            return detect(text)
-        except:
-            return 'en'  # Default to English if detection fails
+        """Detect the language of the input text (fast, deterministic, cached)."""
+        return detect_language(text)
     
     def generate_embeddings(self, text: str) -> np.ndarray:
         """Generate embeddings for a given text."""
+        if self.onnx_encoder is not None:
+            return self.onnx_encoder.encode([text])[0]
         with torch.no_grad():
             embedding = self.model.encode(text, convert_to_numpy=True)
         return embedding
     
+    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Generate embeddings for several texts in one encode call."""
+        if self.onnx_encoder is not None:
+            return self.onnx_encoder.encode(texts, batch_size=batch_size)
+        with torch.no_grad():
+            embeddings = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return embeddings
+    
+    def build_embedding_record(self, chunk: Dict[str, Any], embedding: np.ndarray) -> Dict[str, Any]:
+        """Create an embedding record (resource_id will be set by caller)."""
+        if self.normalize:
+            norm = np.linalg.norm(embedding)
+            if norm > 0:
+                embedding = embedding / norm
+        return {
+            'content_type': chunk['content_type'],
+            'language': chunk['language'],
+            'embedding': embedding.tolist(),
+            'model': self.model_name,
+            'dimension': self.dimension,
+            'embedding_version': self.version,
+            'normalized': self.normalize,
+            'translated': chunk.get('translated', False),
+            'text_chunk': chunk['text'],
+            'created_at': datetime.utcnow().isoformat()
+        }
+    
     def process_resource(self, resource: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Process a single resource and generate embeddings for all its chunks."""
-        chunks = self.prepare_text_chunks(resource)
-        embeddings = []
+        return self.process_resources_batch([resource])[0]
+    
+    def process_resources_batch(self, resources: List[Dict[str, Any]], batch_size: int = 64,
+                                translate: Optional[bool] = None) -> List[List[Dict[str, Any]]]:
+        """Generate embeddings for many resources with one batched encode.
         
-        for chunk in chunks:
-            # Detect language if not already specified
-            if 'language' not in chunk:
-                chunk['language'] = self.detect_language(chunk['text'])
-            
-            # Generate embedding
-            embedding = self.generate_embeddings(chunk['text'])
-            
-            # Create embedding record (resource_id will be set by caller)
-            embedding_record = {
-                'content_type': chunk['content_type'],
-                'language': chunk['language'],
-                'embedding': embedding.tolist(),
-                'text_chunk': chunk['text'],
-                'created_at': datetime.utcnow().isoformat()
-            }
-            
-            embeddings.append(embedding_record)
-            
-        return embeddings
+        Includes translated chunks unless translate=False or no translation
+        languages are configured. Returns one list of embedding records per
+        input resource.
+        """
+        chunks_per_resource = [self.prepare_text_chunks(resource) for resource in resources]
+        
+        if translate is None:
+            translate = bool(self.translation_languages)
+        if translate:
+            extra = translated_chunks(resources, self.translation_languages, self.translator)
+            for chunks, translated in zip(chunks_per_resource, extra):
+                chunks.extend(translated)
+        
+        return self.embed_chunks(chunks_per_resource, batch_size)
+    
+    def embed_chunks(self, chunks_per_resource: List[List[Dict[str, Any]]],
+                     batch_size: int = 64) -> List[List[Dict[str, Any]]]:
+        """Embed prepared chunks of many resources in one encode call."""
+        for chunks in chunks_per_resource:
+            for chunk in chunks:
+                # Detect language if not already specified
+                if 'language' not in chunk:
+                    chunk['language'] = self.detect_language(chunk['text'])
+        
+        texts = [chunk['text'] for chunks in chunks_per_resource for chunk in chunks]
+        if not texts:
+            return [[] for _ in chunks_per_resource]
+        vectors = self.generate_embeddings_batch(texts, batch_size=batch_size)
+        
+        results = []
+        offset = 0
+        for chunks in chunks_per_resource:
+            results.append([self.build_embedding_record(chunk, vectors[offset + i])
+                            for i, chunk in enumerate(chunks)])
+            offset += len(chunks)
+        return results
     
     def batch_process_resources(self, resources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Process multiple resources in batch."""
         all_embeddings = []
-        for resource in resources:
-            embeddings = self.process_resource(resource)
+        for embeddings in self.process_resources_batch(resources):
             all_embeddings.extend(embeddings)
         return all_embeddings
 
@@ -2,15 +2,17 @@
 
 import numpy as np
 from typing import List, Dict, Any
-from db_interface import DatabaseInterface
+from db_interface import StorageBackend, create_database
 from embedding_pipeline import EmbeddingPipeline
+from search_index import SearchIndex
+from chunking import configured_chunk_weights
 
 class ImprovedSearch:
     """Enhanced search with actual semantic similarity."""
     
-    def __init__(self):
-        self.db = DatabaseInterface()
-        self.pipeline = EmbeddingPipeline()
+    def __init__(self, db: StorageBackend = None, pipeline: EmbeddingPipeline = None):
+        self.db = db or create_database()
+        self.pipeline = pipeline or EmbeddingPipeline()
     
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors."""
@@ -33,63 +35,32 @@ class ImprovedSearch:
         # Generate query embedding
         query_embedding = self.pipeline.generate_embeddings(query)
         
-        # Get all resources and embeddings
-        all_resources = self.db.get_all_resources()
+        # Score only vectors from the pipeline's model and dimension
+        index = SearchIndex.build(
+            self.db.get_all_resources(),
+            self.db.get_all_embeddings(),
+            self.pipeline.version,
+            chunk_weights=configured_chunk_weights()
+        )
         
-        # Get embeddings collection
-        embeddings_collection = self.db.db.get_collection('embeddings')
-        all_embeddings = list(embeddings_collection.find({}))
-        
-        # Calculate similarities
-        resource_scores = {}
-        
-        for embedding_doc in all_embeddings:
-            resource_id = embedding_doc.get('resource_id')
-            stored_embedding = embedding_doc.get('embedding', [])
-            
-            if len(stored_embedding) > 0 and resource_id:
-                # Calculate similarity
-                similarity = self.cosine_similarity(query_embedding.tolist(), stored_embedding)
-                
-                # Keep highest similarity score per resource
-                if resource_id not in resource_scores or similarity > resource_scores[resource_id]:
-                    resource_scores[resource_id] = similarity
-        
-        # Get resource details and apply filters
         scored_resources = []
-        resource_lookup = {r.get('_id'): r for r in all_resources}
-        
-        for resource_id, score in resource_scores.items():
-            if resource_id in resource_lookup:
-                resource = resource_lookup[resource_id]
-                
-                # Apply category filter
-                if category_filter and resource.get('category') != category_filter:
-                    continue
-                
-                # Only include active resources
-                if resource.get('status') != 'active':
-                    continue
-                
-                scored_resources.append({
-                    'resource_id': resource_id,
-                    'name': resource.get('name', ''),
-                    'category': resource.get('category', ''),
-                    'address': resource.get('address', ''),
-                    'phone': resource.get('phone', ''),
-                    'services': resource.get('services', []),
-                    'requirements': resource.get('requirements', []),
-                    'cost': resource.get('cost', ''),
-                    'hours_structured': resource.get('hours_structured', {}),
-                    'website': resource.get('website', ''),
-                    'notes': resource.get('notes', ''),
-                    'score': score
-                })
-        
-        # Sort by similarity score (highest first)
-        scored_resources.sort(key=lambda x: x['score'], reverse=True)
+        for resource, score in index.search(query_embedding, top_k, category_filter):
+            scored_resources.append({
+                'resource_id': resource.get('_id'),
+                'name': resource.get('name', ''),
+                'category': resource.get('category', ''),
+                'address': resource.get('address', ''),
+                'phone': resource.get('phone', ''),
+                'services': resource.get('services', []),
+                'requirements': resource.get('requirements', []),
+                'cost': resource.get('cost', ''),
+                'hours_structured': resource.get('hours_structured', {}),
+                'website': resource.get('website', ''),
+                'notes': resource.get('notes', ''),
+                'score': score
+            })
         
-        return scored_resources[:top_k]
+        return scored_resources
     
     def test_semantic_search(self):
         """Test the improved semantic search."""
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+On-disk SearchIndex snapshots, so workers start from a file map instead
+of scanning the database.
+
+One directory per embedding version under NEXTSTEP_SNAPSHOT_DIR
+(default backend/data/index):
+
+    manifest.json          format, embedding version, build time, source
+                           checksum, counts, category list
+    matrix.npy             unit-normalized float32 chunk vectors (mmap'd)
+    chunk_offsets.npy      first chunk row of each resource
+    chunk_content_types.npy, chunk_languages.npy
+    category_codes.npy     per-resource index into the manifest categories
+    resources.json         active resource documents in index order
+
+The loader writes a snapshot after load_resources; `python
+index_snapshot.py` rebuilds one from the database (e.g. after
+reembed_resources.py). A snapshot of another format or embedding version,
+older than NEXTSTEP_SNAPSHOT_MAX_AGE seconds, or incomplete is ignored
+and the caller falls back to the database. While serving, IndexWatcher
+compares the snapshot's source checksum with the database every
+NEXTSTEP_INDEX_CHECK_INTERVAL seconds and rebuilds the index on mismatch.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from search_index import SearchIndex
+
+SNAPSHOT_FORMAT = 1
+ARRAYS = ['matrix', 'chunk_offsets', 'chunk_content_types', 'chunk_languages', 'category_codes']
+
+
+def snapshot_root() -> str:
+    return os.getenv('NEXTSTEP_SNAPSHOT_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'index')
+
+
+def snapshot_path(version: str, root: Optional[str] = None) -> str:
+    """Directory of the snapshot for an embedding version."""
+    safe = "".join(c if c.isalnum() or c in '-_.@' else '_' for c in version)
+    return os.path.join(root or snapshot_root(), safe)
+
+
+def source_checksum(resources: List[Dict[str, Any]], embedding_docs: List[Dict[str, Any]]) -> str:
+    """Fingerprint of the stored documents an index was built from."""
+    digest = hashlib.sha256()
+    for r in sorted(resources, key=lambda r: str(r.get('_id'))):
+        digest.update(f"{r.get('_id')}|{r.get('status')}|{r.get('updated_at')}\n".encode())
+    for doc_id in sorted(str(doc.get('_id')) for doc in embedding_docs):
+        digest.update(f"{doc_id}\n".encode())
+    return digest.hexdigest()
+
+
+def write_snapshot(index: SearchIndex, checksum: str, root: Optional[str] = None) -> str:
+    """Write index to its version directory, replacing any previous snapshot."""
+    path = snapshot_path(index.version, root)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    categories = sorted(set(index.categories.tolist()))
+    arrays = {
+        'matrix': np.ascontiguousarray(index.matrix, dtype=np.float32),
+        'chunk_offsets': index.chunk_offsets.astype(np.int64),
+        'chunk_content_types': index.chunk_content_types.astype(str),
+        'chunk_languages': index.chunk_languages.astype(str),
+        'category_codes': np.searchsorted(categories, index.categories).astype(np.int32)
+        if len(index.categories) else np.zeros(0, dtype=np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), array)
+    with open(os.path.join(tmp, 'resources.json'), 'w') as f:
+        json.dump(index.resources, f, ensure_ascii=False, default=str)
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'embedding_version': index.version,
+        'built_at': datetime.utcnow().isoformat(),
+        'built_ts': time.time(),
+        'source_checksum': checksum,
+        'resources': len(index.resources),
+        'chunks': int(index.matrix.shape[0]),
+        'categories': categories,
+        'rejected': index.rejected,
+        'uncovered': index.uncovered,
+    }
+    # The manifest goes last: a directory without one is incomplete
+    with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def read_manifest(version: str, root: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(snapshot_path(version, root), 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def snapshot_problem(manifest: Optional[Dict[str, Any]], version: str,
+                     max_age: Optional[float] = None) -> Optional[str]:
+    """Why a snapshot can't be used, or None when it can."""
+    if manifest is None:
+        return "missing"
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        return f"format {manifest.get('format')} != {SNAPSHOT_FORMAT}"
+    if manifest.get('embedding_version') != version:
+        return f"built for {manifest.get('embedding_version')}"
+    if max_age is None:
+        max_age = float(os.getenv('NEXTSTEP_SNAPSHOT_MAX_AGE', '86400'))
+    age = time.time() - manifest.get('built_ts', 0)
+    if max_age > 0 and age > max_age:
+        return f"{age:.0f}s old (max {max_age:.0f}s)"
+    return None
+
+
+def load_snapshot(version: str, root: Optional[str] = None, max_age: Optional[float] = None,
+                  chunk_weights: Optional[Dict[str, float]] = None) -> Optional[SearchIndex]:
+    """Map a fresh snapshot for version into a SearchIndex, or None if unusable."""
+    manifest = read_manifest(version, root)
+    problem = snapshot_problem(manifest, version, max_age)
+    if problem:
+        if problem != "missing":
+            print(f"⚠️  Ignoring index snapshot for {version}: {problem}")
+        return None
+
+    path = snapshot_path(version, root)
+    try:
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"),
+                                mmap_mode='r' if name == 'matrix' else None)
+                  for name in ARRAYS}
+        with open(os.path.join(path, 'resources.json')) as f:
+            resources = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring index snapshot for {version}: {e}")
+        return None
+    if len(resources) != manifest['resources'] or arrays['matrix'].shape[0] != manifest['chunks']:
+        print(f"⚠️  Ignoring index snapshot for {version}: counts don't match the manifest")
+        return None
+
+    index = SearchIndex(
+        version=version,
+        matrix=arrays['matrix'],
+        chunk_offsets=arrays['chunk_offsets'],
+        resources=resources,
+        chunk_content_types=arrays['chunk_content_types'],
+        chunk_languages=arrays['chunk_languages'],
+        rejected=manifest.get('rejected'),
+        uncovered=manifest.get('uncovered', 0),
+        chunk_weights=chunk_weights,
+        categories=np.array(manifest['categories'])[arrays['category_codes']]
+        if len(resources) else None
+    )
+    index.source_checksum = manifest.get('source_checksum')
+    index.built_at = manifest.get('built_ts')
+    return index
+
+
+def snapshot_expired(index: SearchIndex, max_age: Optional[float] = None) -> bool:
+    """Whether a loaded snapshot has outlived NEXTSTEP_SNAPSHOT_MAX_AGE."""
+    if max_age is None:
+        max_age = float(os.getenv('NEXTSTEP_SNAPSHOT_MAX_AGE', '86400'))
+    return max_age > 0 and index.built_at is not None and time.time() - index.built_at > max_age
+
+
+class IndexWatcher:
+    """Background check that rebuilds an assistant's index when the database changes."""
+
+    def __init__(self, assistant, interval: float = 300.0):
+        self.assistant = assistant
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.assistant.refresh_index()
+            except Exception as e:
+                print(f"❌ Index check failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="index-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+
+
+def build_and_write(db, version: str, root: Optional[str] = None) -> str:
+    """Build the index for version from the database and snapshot it."""
+    resources = db.get_all_resources()
+    embeddings = db.get_all_embeddings()
+    index = SearchIndex.build(resources, embeddings, version)
+    return write_snapshot(index, source_checksum(resources, embeddings), root)
+
+
+def main():
+    from db_interface import create_database
+    from embedding_pipeline import EmbeddingPipeline
+
+    parser = argparse.ArgumentParser(description="Write or check the on-disk search index snapshot")
+    parser.add_argument("--dir", help="Snapshot root (default NEXTSTEP_SNAPSHOT_DIR or backend/data/index)")
+    parser.add_argument("--check", action="store_true",
+                        help="Compare the snapshot's source checksum with the database instead of writing")
+    args = parser.parse_args()
+
+    version = EmbeddingPipeline().version
+    db = create_database()
+    try:
+        if args.check:
+            manifest = read_manifest(version, args.dir)
+            problem = snapshot_problem(manifest, version)
+            if problem:
+                print(f"❌ Snapshot for {version} unusable: {problem}")
+                return
+            checksum = source_checksum(db.get_all_resources(), db.get_all_embeddings())
+            if checksum == manifest['source_checksum']:
+                print(f"✅ Snapshot for {version} matches the database (built {manifest['built_at']})")
+            else:
+                print(f"⚠️  Snapshot for {version} is out of date; run without --check to rebuild")
+            return
+        path = build_and_write(db, version, args.dir)
+        print(f"💾 Index snapshot for {version} written to {path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import re
+from functools import lru_cache
+from typing import Dict, Set
+
+DEFAULT_LANGUAGE = 'en'
+
+LANGUAGE_NAMES = {
+    'en': 'English',
+    'es': 'Spanish',
+    'vi': 'Vietnamese',
+    'zh': 'Chinese',
+    'ar': 'Arabic',
+}
+
+# Letters that only occur in Vietnamese among the languages we serve
+_VIETNAMESE_CHARS = set("ăắằẳẵặâấầẩẫậđêếềểễệôốồổỗộơớờởỡợưứừửữựảạẻẽẹỉịỏọủụỳỷỹỵ")
+_SPANISH_CHARS = set("ñ¿¡")
+_CJK = re.compile(r'[一-鿿]')
+_ARABIC = re.compile(r'[؀-ۿ]')
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Frequent function words and domain words per language
+STOPWORDS: Dict[str, Set[str]] = {
+    'en': {
+        'the', 'and', 'for', 'with', 'need', 'where', 'can', 'get', 'help', 'my', 'is',
+        'are', 'to', 'of', 'in', 'near', 'me', 'free', 'food', 'what', 'how', 'find',
+        'clinic', 'a', 'i', 'do', 'you', 'have', 'that', 'this', 'open', 'about',
+    },
+    'es': {
+        'el', 'la', 'los', 'las', 'de', 'del', 'y', 'para', 'con', 'necesito', 'donde',
+        'dónde', 'puedo', 'ayuda', 'mi', 'es', 'un', 'una', 'en', 'que', 'qué', 'por',
+        'comida', 'gratis', 'clínica', 'clinica', 'médico', 'medico', 'cerca', 'tengo',
+        'quiero', 'hay', 'familia', 'salud', 'como', 'cómo', 'busco', 'se', 'al',
+    },
+    'vi': {
+        # Unaccented forms that are also English words ('day', 'can', 'phi', ...) are
+        # left out, so unaccented English is never scored as Vietnamese
+        'tôi', 'cần', 'giúp', 'giup', 'của', 'cua', 'và', 'cho',
+        'ở', 'đâu', 'dau', 'không', 'khong', 'có', 'được', 'duoc', 'miễn', 'phí',
+        'mien', 'thức', 'ăn', 'bác', 'sĩ', 'phòng', 'khám', 'nha', 'khoa', 'tìm',
+        'là', 'một', 'gần', 'đây', 'với', 'voi',
+    },
+}
+
+
+@lru_cache(maxsize=8192)
+def _detect(text: str) -> str:
+    if _CJK.search(text):
+        return 'zh'
+    if _ARABIC.search(text):
+        return 'ar'
+
+    letters = set(text)
+    if letters & _VIETNAMESE_CHARS:
+        return 'vi'
+    if letters & _SPANISH_CHARS:
+        return 'es'
+
+    words = _WORD.findall(text)
+    if not words:
+        return DEFAULT_LANGUAGE
+
+    # Score by stopword hits; ties (incl. no hits) go to the default
+    scores = {lang: sum(1 for w in words if w in vocab) for lang, vocab in STOPWORDS.items()}
+    best = max(scores, key=lambda lang: (scores[lang], lang == DEFAULT_LANGUAGE))
+    if scores[best] == 0 or scores[best] == scores[DEFAULT_LANGUAGE]:
+        return DEFAULT_LANGUAGE
+    return best
+
+
+def detect_language(text: str) -> str:
+    """Detect the language of a short text in microseconds.
+
+    Deterministic: script and language-specific letters first, then
+    stopword counts. Short or ambiguous text falls back to English.
+    Results are cached per normalized text.
+    """
+    if not text:
+        return DEFAULT_LANGUAGE
+    return _detect(" ".join(text.lower().split())[:500])
+
+
+# Hit ratio of the per-text cache, for monitoring
+detect_language.cache_info = _detect.cache_info
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from prompt_builder import estimate_tokens, estimate_message_tokens
+
+try:
+    import openai
+    HAS_OPENAI = True
+except ImportError:
+    HAS_OPENAI = False
+
+try:
+    from llama_cpp import Llama
+    HAS_LLAMA_CPP = True
+except ImportError:
+    HAS_LLAMA_CPP = False
+
+
+class GeneratorBusy(Exception):
+    """Raised when no generation slot frees up within the queue timeout."""
+
+
+class ResponseGenerator(ABC):
+    """Base class for LLM response generators.
+
+    Subclasses implement `_stream`; the base class wraps it with a bounded
+    semaphore so only `max_concurrency` generations run at once and the
+    remaining CPU stays available for embedding and search.
+    """
+
+    name = "base"
+
+    def __init__(self, max_concurrency: int = 2, queue_timeout: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @contextmanager
+    def _slot(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise GeneratorBusy(f"{self.name}: no generation slot within {self.queue_timeout}s")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    @abstractmethod
+    def _stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                temperature: float, usage: Dict[str, Any]) -> Iterator[str]:
+        """Yield tokens from the backend, filling `usage` if it reports counts."""
+
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int = 600,
+               temperature: float = 0.8, usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Yield response tokens as they are produced.
+
+        If a `usage` dict is passed it is filled with prompt/completion token
+        counts once the stream finishes, estimated when the backend does not
+        report them.
+        """
+        usage = usage if usage is not None else {}
+        produced = []
+        with self._slot():
+            for token in self._stream(messages, max_tokens, temperature, usage):
+                produced.append(token)
+                yield token
+
+        if 'prompt_tokens' not in usage or 'completion_tokens' not in usage:
+            usage['prompt_tokens'] = usage.get('prompt_tokens') or estimate_message_tokens(messages)
+            usage['completion_tokens'] = usage.get('completion_tokens') or estimate_tokens("".join(produced))
+            usage['estimated'] = True
+        usage.setdefault('estimated', False)
+        usage['backend'] = self.name
+
+    def generate(self, messages: List[Dict[str, str]], max_tokens: int = 600,
+                 temperature: float = 0.8) -> str:
+        """Generate a complete response."""
+        return self.generate_with_usage(messages, max_tokens, temperature)[0]
+
+    def generate_with_usage(self, messages: List[Dict[str, str]], max_tokens: int = 600,
+                            temperature: float = 0.8) -> Tuple[str, Dict[str, Any]]:
+        """Generate a complete response and its token usage."""
+        usage = {}
+        text = "".join(self.stream(messages, max_tokens, temperature, usage))
+        return text, usage
+
+
+class OpenAIGenerator(ResponseGenerator):
+    """Chat completions via the OpenAI API or any OpenAI-compatible server."""
+
+    name = "openai"
+    # Ask for a final usage chunk; not every compatible server supports it
+    include_usage = True
+
+    def __init__(self, model: str = "gpt-3.5-turbo", base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        if not HAS_OPENAI:
+            raise ImportError("openai package is required for OpenAIGenerator")
+        self.model = model
+        self.client = openai.OpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'),
+                                    base_url=base_url)
+
+    def _stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                temperature: float, usage: Dict[str, Any]) -> Iterator[str]:
+        extra = {'stream_options': {'include_usage': True}} if self.include_usage else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **extra
+        )
+        for chunk in response:
+            if getattr(chunk, 'usage', None):
+                usage['prompt_tokens'] = chunk.usage.prompt_tokens
+                usage['completion_tokens'] = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class LocalServerGenerator(OpenAIGenerator):
+    """Local OpenAI-compatible server (llama.cpp server, Ollama, vLLM CPU)."""
+
+    name = "local_server"
+    include_usage = False
+
+    def __init__(self, model: Optional[str] = None, base_url: Optional[str] = None, **kwargs):
+        super().__init__(
+            model=model or os.getenv('NEXTSTEP_LOCAL_LLM_MODEL', 'qwen2.5:1.5b-instruct'),
+            base_url=base_url or os.getenv('NEXTSTEP_LOCAL_LLM_URL', 'http://localhost:11434/v1'),
+            api_key=os.getenv('NEXTSTEP_LOCAL_LLM_KEY', 'local'),
+            **kwargs
+        )
+
+
+class LlamaCppGenerator(ResponseGenerator):
+    """In-process quantized GGUF model via llama-cpp-python.
+
+    Models are loaded once per path and shared by every generator instance.
+    """
+
+    name = "llama_cpp"
+    _models: Dict[str, "Llama"] = {}
+    _load_lock = threading.Lock()
+
+    def __init__(self, model_path: Optional[str] = None, n_ctx: int = 4096,
+                 n_threads: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        if not HAS_LLAMA_CPP:
+            raise ImportError("llama-cpp-python is required for LlamaCppGenerator")
+        self.model_path = model_path or os.getenv('NEXTSTEP_LOCAL_LLM_PATH')
+        if not self.model_path:
+            raise ValueError("Set NEXTSTEP_LOCAL_LLM_PATH to a GGUF model file")
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads or int(os.getenv('NEXTSTEP_LOCAL_LLM_THREADS', '0')) or None
+
+    @property
+    def model(self) -> "Llama":
+        model = self._models.get(self.model_path)
+        if model is None:
+            with self._load_lock:
+                model = self._models.get(self.model_path)
+                if model is None:
+                    print(f"🧠 Loading local LLM from {self.model_path}...")
+                    model = Llama(model_path=self.model_path, n_ctx=self.n_ctx,
+                                  n_threads=self.n_threads, verbose=False)
+                    self._models[self.model_path] = model
+        return model
+
+    def _stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                temperature: float, usage: Dict[str, Any]) -> Iterator[str]:
+        # Prompt count from the model's own tokenizer plus chat-template overhead
+        usage['prompt_tokens'] = sum(
+            len(self.model.tokenize(m['content'].encode('utf-8'), add_bos=False)) + 4
+            for m in messages)
+        completion_tokens = 0
+        response = self.model.create_chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        for chunk in response:
+            content = chunk['choices'][0]['delta'].get('content')
+            if content:
+                completion_tokens += 1  # llama.cpp streams one token per chunk
+                yield content
+        usage['completion_tokens'] = completion_tokens
+
+
+GENERATORS = {
+    'openai': OpenAIGenerator,
+    'local_server': LocalServerGenerator,
+    'llama_cpp': LlamaCppGenerator,
+}
+
+
+def create_generator(backend: Optional[str] = None) -> Optional[ResponseGenerator]:
+    """Create the generator selected by NEXTSTEP_LLM_BACKEND.
+
+    Returns None for the 'template' backend, meaning responses come from
+    `NextStepAssistant.generate_response_local`.
+    """
+    backend = (backend or os.getenv('NEXTSTEP_LLM_BACKEND', 'openai')).lower()
+    if backend == 'template':
+        return None
+    if backend not in GENERATORS:
+        raise ValueError(f"Unknown LLM backend '{backend}', expected one of "
+                         f"{sorted(GENERATORS) + ['template']}")
+    if backend == 'openai' and not os.getenv('OPENAI_API_KEY'):
+        return None
+
+    return GENERATORS[backend](
+        max_concurrency=int(os.getenv('NEXTSTEP_LLM_MAX_CONCURRENCY', '2')),
+        queue_timeout=float(os.getenv('NEXTSTEP_LLM_QUEUE_TIMEOUT', '10'))
+    )
@@ -2,13 +2,16 @@ import pandas as pd
 import json
 from datetime import datetime
 from typing import Dict, Any, List
-from db_interface import DatabaseInterface
+from db_interface import create_database
 from embedding_pipeline import EmbeddingPipeline
 
 class ResourceCSVLoader:
-    def __init__(self):
-        self.pipeline = EmbeddingPipeline()
-        self.db = DatabaseInterface()
+    def __init__(self, connect: bool = True):
+        """Create the loader; connect=False only parses CSVs (no model or database)."""
+        self.pipeline = EmbeddingPipeline() if connect else None
+        self.db = create_database() if connect else None
+        # Resources embedded per encode call during load_resources
+        self.batch_size = 32
         
     def parse_coordinates(self, coord_str: str) -> Dict[str, float]:
         """Parse coordinate string into lat/lng dict."""
@@ -78,6 +81,16 @@ class ResourceCSVLoader:
         
         return resource
     
+    def read_resources(self, csv_path: str = "resources.csv") -> List[Dict[str, Any]]:
+        """Parse the CSV into cleaned resource dicts without touching the database."""
+        df = pd.read_csv(csv_path, header=None)
+        resources = []
+        for _, row in df.iterrows():
+            resource = self.clean_resource_data(row)
+            if resource is not None and resource.get("name"):
+                resources.append(resource)
+        return resources
+    
     def load_resources(self, csv_path: str = "resources.csv") -> Dict[str, int]:
         """Load resources from CSV file."""
         print(f"🚀 Starting resource loading from {csv_path}...")
@@ -93,6 +106,25 @@ class ResourceCSVLoader:
         success_count = 0
         failed_count = 0
         skipped_count = 0
+        pending = []
+        
+        def flush():
+            """Embed pending resources with one batched encode."""
+            nonlocal success_count, failed_count
+            if not pending:
+                return
+            try:
+                batch_embeddings = self.pipeline.process_resources_batch([r for _, r in pending])
+                for (resource_id, resource_data), embeddings in zip(pending, batch_embeddings):
+                    for embedding in embeddings:
+                        embedding['resource_id'] = resource_id
+                    self.db.insert_embeddings(embeddings)
+                    success_count += 1
+                    print(f"✅ {resource_data['name']} ({resource_data['category']})")
+            except Exception as e:
+                failed_count += len(pending)
+                print(f"❌ Failed to embed batch of {len(pending)} resources: {e}")
+            pending.clear()
         
         for index, row in df.iterrows():
             try:
@@ -109,22 +141,26 @@ class ResourceCSVLoader:
                     print(f"⏭️  Skipped row {index + 1} (no name)")
                     continue
                 
-                # Insert resource into database
+                # Insert resource into database; embeddings are generated in batches
                 resource_id = self.db.insert_resource(resource_data)
-                
-                # Generate and store embeddings
-                embeddings = self.pipeline.process_resource(resource_data)
-                for embedding in embeddings:
-                    embedding['resource_id'] = resource_id
-                    self.db.insert_embedding(embedding)
-                
-                success_count += 1
-                print(f"✅ {resource_data['name']} ({resource_data['category']})")
+                pending.append((resource_id, resource_data))
+                if len(pending) >= self.batch_size:
+                    flush()
                 
             except Exception as e:
                 failed_count += 1
                 resource_name = str(row.iloc[0]) if not pd.isna(row.iloc[0]) else f"Row {index + 1}"
                 print(f"❌ Failed to process {resource_name}: {e}")
+        flush()
+        
+        # Workers start from this snapshot instead of scanning the database
+        if success_count:
+            try:
+                from index_snapshot import build_and_write
+                path = build_and_write(self.db, self.pipeline.version)
+                print(f"💾 Index snapshot written to {path}")
+            except Exception as e:
+                print(f"⚠️  Could not write index snapshot: {e}")
         
         # Report results
         print(f"\n📈 Loading completed:")
@@ -184,7 +220,8 @@ class ResourceCSVLoader:
     
     def close(self):
         """Close database connection."""
-        self.db.close()
+        if self.db is not None:
+            self.db.close()
 
 def main():
     """Main function to load resources."""
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from db_interface import StorageBackend, resource_document, embedding_document
+
+# Embedding fields stored as columns, so filters on them run in SQL
+EMBEDDING_COLUMNS = {'_id': 'id', 'resource_id': 'resource_id', 'model': 'model',
+                     'dimension': 'dimension', 'language': 'language',
+                     'content_type': 'content_type', 'translated': 'translated'}
+
+
+def default_db_path() -> str:
+    return os.getenv('NEXTSTEP_LOCAL_DB_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'nextstep.db')
+
+
+def matches(doc: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Evaluate a Data API style filter against a document."""
+    for key, condition in filters.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if '$in' in condition and value not in condition['$in']:
+                return False
+            if '$ne' in condition and value == condition['$ne']:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def where_clause(filters: Optional[Dict[str, Any]], columns: Dict[str, str]) -> Tuple[str, list, Dict[str, Any]]:
+    """Split filters into SQL on indexed columns and a remainder checked in Python."""
+    clauses, params, rest = [], [], {}
+    for key, condition in (filters or {}).items():
+        column = columns.get(key)
+        if column is None:
+            rest[key] = condition
+        elif isinstance(condition, dict) and set(condition) == {'$in'}:
+            values = list(condition['$in'])
+            if not values:
+                clauses.append("0")
+            else:
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        elif isinstance(condition, dict):
+            rest[key] = condition
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(condition)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params, rest
+
+
+class LocalDatabase(StorageBackend):
+    """Single-file SQLite storage with the same operations as Astra DB.
+
+    Documents are stored as JSON next to a few indexed columns; embedding
+    vectors are float32 blobs and come back as numpy arrays, so loading the
+    index needs no list-to-array conversion and no network round trip.
+    `path=':memory:'` keeps everything in process (benchmarks, tests).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_db_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ':memory:':
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.create_collections()
+
+    def create_collections(self):
+        """Create tables and indexes if they don't exist."""
+        with self._lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS resources (
+                    id TEXT PRIMARY KEY, category TEXT, status TEXT, doc TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    id TEXT PRIMARY KEY, resource_id TEXT, model TEXT, dimension INTEGER,
+                    language TEXT, content_type TEXT, translated INTEGER,
+                    doc TEXT NOT NULL, vector BLOB NOT NULL);
+                CREATE INDEX IF NOT EXISTS embeddings_resource ON embeddings (resource_id);
+                CREATE INDEX IF NOT EXISTS embeddings_model ON embeddings (model, dimension);
+            """)
+
+    def insert_resource(self, resource: Dict[str, Any]) -> str:
+        """Insert a new resource and return its ID."""
+        resource_id = str(uuid.uuid4())
+        doc = resource_document(resource, resource_id)
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO resources VALUES (?, ?, ?, ?)",
+                              (resource_id, doc['category'], doc['status'], json.dumps(doc)))
+        return resource_id
+
+    def _embedding_row(self, embedding: Dict[str, Any]) -> tuple:
+        doc = embedding_document(embedding)
+        vector = np.asarray(doc.pop('embedding'), dtype=np.float32)
+        return (doc['_id'], doc['resource_id'], doc['model'], doc['dimension'], doc['language'],
+                doc['content_type'], int(bool(doc['translated'])), json.dumps(doc), vector.tobytes())
+
+    def insert_embedding(self, embedding: Dict[str, Any]):
+        """Insert a new embedding."""
+        self.insert_embeddings([embedding])
+
+    def insert_embeddings(self, embeddings: List[Dict[str, Any]]):
+        """Insert several embeddings in one transaction."""
+        rows = [self._embedding_row(e) for e in embeddings]
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT INTO embeddings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def get_all_embeddings(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Get embedding documents, optionally filtered (e.g. by model)."""
+        where, params, rest = where_clause(filters, EMBEDDING_COLUMNS)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT doc, vector FROM embeddings{where}", params).fetchall()
+        docs = []
+        for doc_json, vector in rows:
+            doc = json.loads(doc_json)
+            if rest and not matches(doc, rest):
+                continue
+            doc['embedding'] = np.frombuffer(vector, dtype=np.float32)
+            docs.append(doc)
+        return docs
+
+    def delete_embeddings(self, filters: Dict[str, Any]) -> int:
+        """Delete embedding documents matching filters; returns the count deleted."""
+        if not filters:
+            raise ValueError("Refusing to delete embeddings without a filter")
+        where, params, rest = where_clause(filters, EMBEDDING_COLUMNS)
+        if rest:
+            ids = [doc['_id'] for doc in self.get_all_embeddings(filters)]
+            if not ids:
+                return 0
+            where, params, _ = where_clause({'_id': {'$in': ids}}, EMBEDDING_COLUMNS)
+        with self._lock, self.conn:
+            return self.conn.execute(f"DELETE FROM embeddings{where}", params).rowcount
+
+    def search_similar(self, query_embedding: List[float],
+                       limit: int = 5,
+                       filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Rank active resources by their best chunk cosine with the query."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        resource_filter = {'status': 'active'}
+        if filters and 'category' in filters:
+            resource_filter['category'] = filters['category']
+        resources = {r['_id']: r for r in self.get_all_resources() if matches(r, resource_filter)}
+
+        docs = [d for d in self.get_all_embeddings({'dimension': len(query)}) if d['resource_id'] in resources]
+        if not docs:
+            return []
+        matrix = np.stack([d['embedding'] for d in docs])
+        scores = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+        best: Dict[str, float] = {}
+        for doc, score in zip(docs, scores.tolist()):
+            if score > best.get(doc['resource_id'], -np.inf):
+                best[doc['resource_id']] = score
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:limit]
+        return [{
+            'resource_id': rid,
+            'name': resources[rid].get('name'),
+            'category': resources[rid].get('category'),
+            'status': resources[rid].get('status'),
+            'similarity': score
+        } for rid, score in ranked]
+
+    def get_all_resources(self) -> List[Dict[str, Any]]:
+        """Get all resources from the database."""
+        with self._lock:
+            rows = self.conn.execute("SELECT doc FROM resources").fetchall()
+        return [json.loads(doc) for (doc,) in rows]
+
+    def get_resource(self, resource_id: str) -> Optional[Dict[str, Any]]:
+        """Get one resource by ID."""
+        with self._lock:
+            row = self.conn.execute("SELECT doc FROM resources WHERE id = ?", (resource_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+In-process metrics with Prometheus text exposition.
+
+`span("embed")` times a stage: the duration goes into the
+nextstep_stage_seconds histogram and, when a request is being served,
+into that request's RequestTimer for its Server-Timing header. The
+current timer travels in a ContextVar, so stages deep in the search code
+need no extra parameters. Recording is a perf_counter pair and one lock,
+cheap enough to leave on in production.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+# Seconds; tuned for stages between ~1 ms and a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.label_names)
+        with self._lock:
+            # [count per bucket..., +Inf count, sum]
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    labels = _labels(self.label_names + ('le',), key + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                base = _labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{base} {series[-1]}")
+                lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics plus callbacks that report gauges from other components."""
+
+    def __init__(self):
+        self.metrics: List[Any] = []
+        self.collectors: List[Callable[[], Dict[str, float]]] = []
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect: Callable[[], Dict[str, float]]):
+        """Add a callback returning {'metric_name{labels}': value} gauges."""
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            try:
+                gauges = collect()
+            except Exception:
+                continue
+            for name, value in gauges.items():
+                if value is not None:
+                    lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('nextstep_stage_seconds', 'Time spent per request stage', ('stage',))
+REQUEST_SECONDS = REGISTRY.histogram('nextstep_http_request_seconds', 'HTTP request latency', ('path', 'status'))
+REQUESTS = REGISTRY.counter('nextstep_http_requests_total', 'HTTP requests served', ('path', 'status'))
+CACHE_REQUESTS = REGISTRY.counter('nextstep_cache_requests_total', 'Cache lookups', ('cache', 'result'))
+
+
+class RequestTimer:
+    """Stage durations of one request, rendered as a Server-Timing header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages.append((stage, seconds))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def stage_ms(self) -> Dict[str, float]:
+        """Milliseconds per stage, summed over repeats."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for stage, seconds in self.stages:
+                totals[stage] = totals.get(stage, 0.0) + seconds * 1000.0
+        return totals
+
+    def server_timing(self) -> str:
+        parts = [f"{stage};dur={ms:.1f}" for stage, ms in self.stage_ms().items()]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar('nextstep_request_timer', default=None)
+
+
+def start_request() -> RequestTimer:
+    """Begin timing a request in the current context."""
+    timer = RequestTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_cache(cache: str, result: str):
+    """Count a cache lookup; result is e.g. 'hit', 'stale' or 'miss'."""
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+
+
+def lru_cache_gauges(name: str, cached_function) -> Callable[[], Dict[str, float]]:
+    """Collector exposing a functools.lru_cache's hit ratio."""
+    def collect() -> Dict[str, float]:
+        info = cached_function.cache_info()
+        total = info.hits + info.misses
+        return {
+            f'nextstep_cache_hits{{cache="{name}"}}': info.hits,
+            f'nextstep_cache_misses{{cache="{name}"}}': info.misses,
+            f'nextstep_cache_hit_ratio{{cache="{name}"}}': info.hits / total if total else 0.0,
+            f'nextstep_cache_size{{cache="{name}"}}': info.currsize,
+        }
+    return collect
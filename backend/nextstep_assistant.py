@@ -2,21 +2,29 @@
 
 import json
 import numpy as np
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from dataclasses import dataclass, asdict
 from datetime import datetime
 import os
+import threading
+import time
+from contextlib import nullcontext
 from dotenv import load_dotenv
 
-from db_interface import DatabaseInterface
+from db_interface import StorageBackend, create_database
 from embedding_pipeline import EmbeddingPipeline
-
-# You can use OpenAI, Anthropic, or local models
-try:
-    import openai
-    HAS_OPENAI = True
-except ImportError:
-    HAS_OPENAI = False
+from embedding_batcher import EmbeddingBatcher, EmbeddingCache
+from search_index import SearchIndex
+from index_snapshot import load_snapshot, snapshot_expired, source_checksum
+from chunking import configured_chunk_weights
+from llm_backends import ResponseGenerator, GeneratorBusy, create_generator
+from prompt_builder import PromptBuilder
+from language_detection import detect_language
+from metrics import span
+from query_parser import ParsedQuery, parse_query
+from reranker import CrossEncoderReranker
+from response_templates import get_templates
+from sessions import Session, SESSION_TURNS
 
 load_dotenv()
 
@@ -38,14 +46,71 @@ class SearchResult:
 class NextStepAssistant:
     """RAG-powered healthcare assistant for Houston resources."""
     
-    def __init__(self, use_openai: bool = True):
-        """Initialize the assistant with database and LLM connections."""
-        self.db = DatabaseInterface()
-        self.pipeline = EmbeddingPipeline()
-        self.use_openai = use_openai and HAS_OPENAI
-        
-        if self.use_openai and os.getenv('OPENAI_API_KEY'):
-            openai.api_key = os.getenv('OPENAI_API_KEY')
+    def __init__(self, use_openai: bool = True,
+                 generator: Optional[ResponseGenerator] = None,
+                 db: Optional[StorageBackend] = None,
+                 pipeline: Optional[EmbeddingPipeline] = None):
+        """Initialize the assistant with database and LLM connections.
+        
+        The LLM backend comes from NEXTSTEP_LLM_BACKEND (openai, local_server,
+        llama_cpp or template) unless a generator is passed in; with
+        use_openai=False only the local templates are used. An existing
+        database or pipeline can be passed in instead of creating new ones.
+        """
+        self.db = db or create_database()
+        self.pipeline = pipeline or EmbeddingPipeline()
+        
+        # Concurrent queries share encode calls (NEXTSTEP_EMBED_BATCHING=0 to disable)
+        self.batcher = None
+        if os.getenv('NEXTSTEP_EMBED_BATCHING', '1') == '1':
+            self.batcher = EmbeddingBatcher(
+                self.pipeline.generate_embeddings_batch,
+                max_batch_size=int(os.getenv('NEXTSTEP_EMBED_BATCH_SIZE', '16')),
+                max_wait_ms=float(os.getenv('NEXTSTEP_EMBED_MAX_WAIT_MS', '5'))
+            )
+        
+        # Repeated queries skip the encoder (NEXTSTEP_QUERY_CACHE_SIZE=0 to disable)
+        cache_size = int(os.getenv('NEXTSTEP_QUERY_CACHE_SIZE', '2048'))
+        self.query_cache = EmbeddingCache(cache_size) if cache_size > 0 else None
+        
+        if generator is None and use_openai:
+            try:
+                generator = create_generator()
+            except (ImportError, ValueError) as e:
+                print(f"⚠️  LLM backend unavailable, using local templates: {e}")
+        self.generator = generator
+        self.prompt_builder = PromptBuilder(format_hours=self.format_hours)
+        self.language_boost = float(os.getenv('NEXTSTEP_LANGUAGE_BOOST', '0.05'))
+        # Apply category/cost/eligibility/day/ZIP filters parsed from the query text
+        self.query_filters = os.getenv('NEXTSTEP_QUERY_FILTERS', '1') == '1'
+        
+        # Optional cross-encoder second stage over the top candidates (NEXTSTEP_RERANK=1)
+        self.reranker = None
+        self.rerank_candidates = int(os.getenv('NEXTSTEP_RERANK_CANDIDATES', '20'))
+        # Maximal marginal relevance over categories and locations (1.0 disables)
+        self.mmr_lambda = float(os.getenv('NEXTSTEP_MMR_LAMBDA', '0.7'))
+        self.mmr_candidates = int(os.getenv('NEXTSTEP_MMR_CANDIDATES', '50'))
+        # Conversation sessions: candidates kept for follow-ups, weight of the previous query
+        # in a follow-up's embedding, similarity that makes a turn a follow-up, summary size
+        self.session_candidates = int(os.getenv('NEXTSTEP_SESSION_CANDIDATES', '100'))
+        self.session_carry = float(os.getenv('NEXTSTEP_SESSION_CARRY', '0.5'))
+        self.session_similarity = float(os.getenv('NEXTSTEP_SESSION_SIMILARITY', '0.5'))
+        self.session_summary_chars = int(os.getenv('NEXTSTEP_SESSION_SUMMARY_CHARS', '400'))
+        if os.getenv('NEXTSTEP_RERANK', '0') == '1':
+            try:
+                self.reranker = CrossEncoderReranker()
+            except Exception as e:
+                print(f"⚠️  Re-ranker unavailable, using first-pass ranking only: {e}")
+        
+        # Start from the on-disk index snapshot when a fresh one exists (NEXTSTEP_INDEX_SNAPSHOT=0 to disable)
+        # The current index is kept until refresh_index sees the database change
+        self.index = None
+        self._index_lock = threading.Lock()
+        if os.getenv('NEXTSTEP_INDEX_SNAPSHOT', '1') == '1':
+            self.index = load_snapshot(self.pipeline.version, chunk_weights=configured_chunk_weights())
+            if self.index is not None:
+                print(f"📦 Index snapshot loaded: {len(self.index)} resources, "
+                      f"{self.index.matrix.shape[0]} vectors ({self.pipeline.version})")
     
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors."""
@@ -60,71 +125,250 @@ class NextStepAssistant:
             return 0.0
         
         return np.dot(vec1, vec2) / (norm1 * norm2)
-        
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query, from the cache or micro-batched with concurrent requests."""
+        if self.query_cache is not None:
+            vector = self.query_cache.get(query)
+            if vector is not None:
+                return vector
+        if self.batcher is not None:
+            vector = self.batcher.embed(query)
+        else:
+            vector = self.pipeline.generate_embeddings(query)
+        if self.query_cache is not None:
+            self.query_cache.put(query, vector)
+        return vector
+    
+    def warm_query_cache(self, queries: List[str], batch_size: int = 64) -> int:
+        """Embed queries not yet cached in batches; returns how many were added."""
+        if self.query_cache is None:
+            return 0
+        missing = list(dict.fromkeys(q for q in queries if q.strip() and q not in self.query_cache))
+        missing = missing[:self.query_cache.max_size]
+        for start in range(0, len(missing), batch_size):
+            block = missing[start:start + batch_size]
+            for query, vector in zip(block, self.pipeline.generate_embeddings_batch(block)):
+                self.query_cache.put(query, vector)
+        return len(missing)
+        
+    def build_index(self) -> SearchIndex:
+        """The vector index for the pipeline's embedding version.
+        
+        Starts from the snapshot loaded at startup, otherwise builds from
+        the database once and reuses the result. refresh_index replaces it
+        when the database changes; past NEXTSTEP_SNAPSHOT_MAX_AGE it is
+        rebuilt on the next request regardless.
+        """
+        index = self.index
+        if index is not None and not snapshot_expired(index):
+            return index
+        with self._index_lock:
+            # Another request may have rebuilt it while this one waited
+            if self.index is not None and self.index is not index:
+                return self.index
+            if index is not None:
+                print("⚠️  Index expired, reading the database")
+            self.index = self.index_from_database()
+            return self.index
+    
+    def index_from_database(self, resources: Optional[List[Dict[str, Any]]] = None,
+                            embeddings: Optional[List[Dict[str, Any]]] = None) -> SearchIndex:
+        """Build an index from stored documents (fetched when not passed in)."""
+        with span('fetch'):
+            resources = self.db.get_all_resources() if resources is None else resources
+            embeddings = self.db.get_all_embeddings() if embeddings is None else embeddings
+        with span('index'):
+            index = SearchIndex.build(resources, embeddings, self.pipeline.version,
+                                      chunk_weights=configured_chunk_weights())
+        index.source_checksum = source_checksum(resources, embeddings)
+        index.built_at = time.time()
+        return index
+    
+    def refresh_index(self, resources: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """Rebuild the index if the database no longer matches it; True when rebuilt.
+        
+        Compares the source checksum of the stored resources and embedding
+        documents with the one the index (or its snapshot) was built from,
+        so inserts, status changes and re-embedded vectors show up without
+        waiting for the snapshot to expire.
+        """
+        index = self.index
+        if index is None:
+            return False
+        resources = self.db.get_all_resources() if resources is None else resources
+        embeddings = self.db.get_all_embeddings()
+        if source_checksum(resources, embeddings) == index.source_checksum:
+            return False
+        rebuilt = self.index_from_database(resources, embeddings)
+        with self._index_lock:
+            self.index = rebuilt
+        print(f"🔄 Database changed, index rebuilt: {len(rebuilt)} resources")
+        return True
+    
+    def to_search_result(self, resource: Dict[str, Any], score: float) -> SearchResult:
+        """Convert a stored resource document into a SearchResult."""
+        return SearchResult(
+            name=resource.get('name', ''),
+            category=resource.get('category', ''),
+            address=resource.get('address', ''),
+            phone=resource.get('phone', ''),
+            services=resource.get('services', []),
+            requirements=resource.get('requirements', []),
+            cost=resource.get('cost', ''),
+            hours=resource.get('hours_structured', {}),
+            website=resource.get('website', ''),
+            notes=resource.get('notes', ''),
+            score=score
+        )
+    
     def search_resources(self, query: str, top_k: int = 5, 
-                        category_filter: str = None) -> List[SearchResult]:
-        """Search for relevant resources using semantic similarity."""
+                        category_filter: str = None,
+                        language: Optional[str] = None,
+                        parsed: Optional[ParsedQuery] = None,
+                        first_pass_only: bool = False,
+                        session: Optional[Session] = None) -> List[SearchResult]:
+        """Search for relevant resources using semantic similarity.
+        
+        Filters parsed from the query narrow the candidates before scoring;
+        filters that would leave nothing are dropped and recorded in
+        parsed.relaxed. Chunks in the query's language get a small score boost.
+        With a re-ranker the top candidates are re-scored by the cross-encoder
+        within whatever remains of its latency budget. Finally MMR keeps
+        near-duplicate resources from the same area out of the top_k.
+        first_pass_only skips re-ranking and MMR (used under load).
+        
+        With a session, a follow-up turn only re-scores the session's cached
+        candidates with its embedding blended into the previous one; any
+        other turn searches everything and caches its first-pass candidates.
+        """
+        started = time.perf_counter()
+        if parsed is None and self.query_filters:
+            with span('parse'):
+                parsed = parse_query(query)
         
         # Generate query embedding
-        query_embedding = self.pipeline.generate_embeddings(query)
-        
-        # Get all resources and embeddings
-        all_resources = self.db.get_all_resources()
-        
-        # Get embeddings collection
-        embeddings_collection = self.db.db.get_collection('embeddings')
-        all_embeddings = list(embeddings_collection.find({}))
-        
-        # Calculate similarities
-        resource_scores = {}
-        
-        for embedding_doc in all_embeddings:
-            resource_id = embedding_doc.get('resource_id')
-            stored_embedding = embedding_doc.get('embedding', [])
+        with span('embed'):
+            query_embedding = self.embed_query(query)
+        language = language or (parsed.language if parsed else detect_language(query))
+        
+        # Only vectors from the same model and dimension as the query are scored
+        index = self.build_index()
+        rerank = self.reranker is not None and not first_pass_only
+        mmr = self.mmr_lambda < 1.0 and not first_pass_only
+        category = category_filter or (parsed.filters.category if parsed else None)
+        follow_up = session is not None and session.is_follow_up(query, query_embedding, category,
+                                                                 self.session_similarity)
+        
+        first_pass_k = top_k
+        if rerank:
+            first_pass_k = max(first_pass_k, self.rerank_candidates)
+        if mmr:
+            first_pass_k = max(first_pass_k, self.mmr_candidates)
+        rerank_query = query
+        with span('score'):
+            candidates, relaxed = index.candidate_mask(parsed.filters if parsed else None, category_filter)
+            if parsed:
+                parsed.relaxed = relaxed
+            if follow_up:
+                narrowed = candidates & self.session_mask(index, session)
+                if narrowed.any():
+                    candidates = narrowed
+                    query_embedding = self.blend_query(index, query_embedding, session.query_vector)
+                    if session.turns:
+                        rerank_query = f"{session.turns[-1]['query']} {query}"
+                else:
+                    # No cached candidate passes this turn's filters: search everything
+                    follow_up = False
+            pool_k = first_pass_k
+            if session is not None and not follow_up:
+                pool_k = max(pool_k, self.session_candidates)
+            pool = index.search(query_embedding, pool_k, category_filter,
+                                language=language, language_boost=self.language_boost,
+                                candidates=candidates)
+            results = pool[:first_pass_k]
+        if session is not None:
+            SESSION_TURNS.inc(kind='follow_up' if follow_up else 'search')
+            session.follow_up = follow_up
+            session.query_vector = index.normalize_query(query_embedding)
+            if not follow_up:
+                session.candidate_ids = [resource.get('_id') for resource, _ in pool]
+                session.category = category
+        if rerank:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with span('rerank'):
+                results, _ = self.reranker.rerank(rerank_query, results, first_pass_k,
+                                                  budget_ms=self.reranker.budget_ms - elapsed_ms,
+                                                  min_candidates=top_k)
+        if mmr:
+            with span('mmr'):
+                results = self.diversify(index, results, top_k, parsed)
+        results = results[:top_k]
+        return [self.to_search_result(resource, score) for resource, score in results]
+    
+    def blend_query(self, index: SearchIndex, query_vector: np.ndarray,
+                    previous: np.ndarray) -> np.ndarray:
+        """A follow-up's embedding with the conversation so far mixed in."""
+        blended = index.normalize_query(query_vector) + self.session_carry * index.normalize_query(previous)
+        return index.normalize_query(blended)
+    
+    def session_mask(self, index: SearchIndex, session: Session) -> np.ndarray:
+        """Mask of the session's cached candidates still in the index."""
+        mask = np.zeros(len(index), dtype=bool)
+        positions = [index.positions.get(resource_id) for resource_id in session.candidate_ids]
+        mask[[p for p in positions if p is not None]] = True
+        return mask
+    
+    def diversify(self, index: SearchIndex, results: List[Tuple[Dict[str, Any], float]],
+                  top_k: int, parsed: Optional[ParsedQuery]) -> List[Tuple[Dict[str, Any], float]]:
+        """MMR over first-pass results."""
+        # A ZIP in the query asks for nearby results, so don't spread them out
+        near = bool(parsed and parsed.filters.zip_code and 'zip_code' not in parsed.relaxed)
+        return index.diversify(results, top_k, self.mmr_lambda, use_location=not near)
+    
+    def iter_search_batch(self, queries: List[str], top_k: int = 5,
+                          category_filters: Optional[List[Optional[str]]] = None,
+                          block_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Search many queries without generation, yielding one result per query in order.
+        
+        Each block of queries is embedded in one batched encode and scored
+        with one matrix-matrix product. Parsed filters, the language boost
+        and MMR apply as in search_resources; the cross-encoder does not.
+        """
+        category_filters = category_filters or [None] * len(queries)
+        block_size = block_size or max(len(queries), 1)
+        index = self.build_index()
+        first_pass_k = max(top_k, self.mmr_candidates) if self.mmr_lambda < 1.0 else top_k
+        
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            with span('parse'):
+                parsed = [parse_query(q) if self.query_filters else None for q in block]
+            languages = [p.language if p else detect_language(q) for p, q in zip(parsed, block)]
+            with span('embed'):
+                vectors = self.pipeline.generate_embeddings_batch(block)
+            with span('score'):
+                scores = index.resource_scores_batch(vectors, languages, self.language_boost)
             
-            if len(stored_embedding) > 0 and resource_id:
-                # Calculate similarity
-                similarity = self.cosine_similarity(query_embedding.tolist(), stored_embedding)
-                
-                # Keep highest similarity score per resource
-                if resource_id not in resource_scores or similarity > resource_scores[resource_id]:
-                    resource_scores[resource_id] = similarity
-        
-        # Get resource details and apply filters
-        search_results = []
-        resource_lookup = {r.get('_id'): r for r in all_resources}
-        
-        for resource_id, score in resource_scores.items():
-            if resource_id in resource_lookup:
-                resource = resource_lookup[resource_id]
-                
-                # Apply category filter
-                if category_filter and resource.get('category') != category_filter:
-                    continue
-                
-                # Only include active resources
-                if resource.get('status') != 'active':
-                    continue
-                
-                search_result = SearchResult(
-                    name=resource.get('name', ''),
-                    category=resource.get('category', ''),
-                    address=resource.get('address', ''),
-                    phone=resource.get('phone', ''),
-                    services=resource.get('services', []),
-                    requirements=resource.get('requirements', []),
-                    cost=resource.get('cost', ''),
-                    hours=resource.get('hours_structured', {}),
-                    website=resource.get('website', ''),
-                    notes=resource.get('notes', ''),
-                    score=score
-                )
-                search_results.append(search_result)
-        
-        # Sort by similarity score (highest first)
-        search_results.sort(key=lambda x: x.score, reverse=True)
-        
-        return search_results[:top_k]
+            for j, (query, p) in enumerate(zip(block, parsed)):
+                category = category_filters[start + j]
+                candidates, relaxed = index.candidate_mask(p.filters if p else None, category)
+                if p:
+                    p.relaxed = relaxed
+                results = index.top_k(scores[:, j], first_pass_k, candidates)
+                if self.mmr_lambda < 1.0:
+                    results = self.diversify(index, results, top_k, p)
+                yield {
+                    'query': query,
+                    'category': category,
+                    'results': [asdict(self.to_search_result(r, score)) for r, score in results[:top_k]],
+                    'query_filters': p.to_dict() if p else None,
+                }
+    
+    def search_batch(self, queries: List[str], top_k: int = 5,
+                     category_filters: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """Search many queries at once; see iter_search_batch."""
+        return list(self.iter_search_batch(queries, top_k, category_filters))
     
     def format_hours(self, hours: Dict[str, str]) -> str:
         """Format hours dictionary into readable text."""
@@ -138,155 +382,153 @@ class NextStepAssistant:
         
         return "; ".join(formatted) if formatted else "Hours not specified"
     
-    def generate_response_openai(self, query: str, resources: List[SearchResult]) -> str:
-        """Generate response using OpenAI GPT."""
-        
-        # Prepare context from search results
-        context = "Available resources:\n\n"
-        for i, resource in enumerate(resources, 1):
-            context += f"{i}. **{resource.name}** ({resource.category})\n"
-            context += f"   📍 Address: {resource.address}\n"
-            context += f"   📞 Phone: {resource.phone}\n"
-            
-            if resource.services:
-                context += f"   🔧 Services: {', '.join(resource.services)}\n"
-            
-            if resource.requirements:
-                context += f"   📋 Requirements: {', '.join(resource.requirements)}\n"
-            
-            if resource.cost:
-                context += f"   💰 Cost: {resource.cost}\n"
-            
-            if resource.hours:
-                context += f"   🕐 Hours: {self.format_hours(resource.hours)}\n"
-            
-            if resource.website:
-                context += f"   🌐 Website: {resource.website}\n"
-            
-            if resource.notes:
-                context += f"   📝 Notes: {resource.notes}\n"
-            
-            context += f"   🎯 Relevance: {resource.score:.1%}\n\n"
+    def build_prompt_messages(self, query: str, resources: List[SearchResult],
+                              context: Optional[str] = None) -> List[Dict[str, str]]:
+        """Build the token-budgeted chat messages sent to the LLM backend."""
+        messages, report = self.prompt_builder.build(query, resources, language=detect_language(query),
+                                                     context=context)
+        if report['fields_dropped']:
+            print(f"✂️  Prompt budget: dropped {report['fields_dropped']} low-priority fields "
+                  f"(~{report['prompt_tokens_estimate']}/{report['max_prompt_tokens']} tokens)")
+        return messages
+    
+    def generate_response_llm(self, query: str, resources: List[SearchResult],
+                              context: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Generate response using the configured LLM backend.
+        
+        Returns the response text and its token usage (empty when the local
+        template fallback was used). context summarizes earlier turns.
+        """
+        messages = self.build_prompt_messages(query, resources, context)
         
-        # Create prompt
-        prompt = f"""You are a caring, empathetic social worker helping someone in Houston who asked: "{query}"
-
-I want you to respond as if you're sitting across from this person, offering genuine support and practical help. Be warm, understanding, and encouraging while providing clear, actionable guidance.
-
-Based on these resources, please:
-
-1. **Start with empathy** - Acknowledge their situation with warmth and understanding
-2. **Provide hope** - Let them know help is available and they've taken a good step by reaching out
-3. **Give specific recommendations** - Clearly list the best resources with all the important details
-4. **Offer practical next steps** - Tell them exactly what to do next (call, visit, bring documents, etc.)
-5. **Be encouraging** - End with reassurance and remind them you're here to help
-
-{context}
-
-Respond in a conversational, caring tone as if you're a social worker who genuinely wants to help this person succeed. Include all the contact information and practical details they need, but present it in a warm, human way.
-
-Remember: This person may be scared, overwhelmed, or vulnerable. Your response should make them feel heard, supported, and hopeful."""
-
         try:
-            response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a compassionate social worker in Houston, Texas. You provide empathetic, practical help to people seeking healthcare and social services. Your responses should be warm, caring, and professionally supportive while being informative and actionable."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=900,
+            text, usage = self.generator.generate_with_usage(
+                messages,
+                max_tokens=self.prompt_builder.max_completion_tokens,
                 temperature=0.8
             )
-            return response.choices[0].message.content
+            self.log_usage(usage)
+            return text, usage
             
+        except GeneratorBusy as e:
+            print(f"⏳ {e}, using local templates")
+            return self.generate_response_local(query, resources), {}
+        except Exception as e:
+            print(f"LLM backend error ({self.generator.name}): {e}")
+            return self.generate_response_local(query, resources), {}
+    
+    def log_usage(self, usage: Dict[str, Any]):
+        """Report per-request token usage."""
+        print(f"🧾 Tokens ({usage.get('backend')}): prompt={usage.get('prompt_tokens')} "
+              f"completion={usage.get('completion_tokens')}"
+              f"{' (estimated)' if usage.get('estimated') else ''}")
+    
+    def stream_response(self, query: str, resources: List[SearchResult],
+                        context: Optional[str] = None) -> Iterator[str]:
+        """Stream response tokens, falling back to the local template."""
+        if self.generator is None:
+            yield self.generate_response_local(query, resources)
+            return
+        
+        messages = self.build_prompt_messages(query, resources, context)
+        usage = {}
+        streamed = False
+        try:
+            for token in self.generator.stream(messages, self.prompt_builder.max_completion_tokens,
+                                               temperature=0.8, usage=usage):
+                streamed = True
+                yield token
+            self.log_usage(usage)
         except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return self.generate_response_local(query, resources)
+            print(f"LLM backend error ({self.generator.name}): {e}")
+            if not streamed:
+                yield self.generate_response_local(query, resources)
     
-    def generate_response_local(self, query: str, resources: List[SearchResult]) -> str:
-        """Generate response using local templates (fallback) with social worker tone."""
+    def generate_response_local(self, query: str, resources: List[SearchResult],
+                                language: Optional[str] = None) -> str:
+        """Generate response using local templates (fallback) with social worker tone.
         
-        if not resources:
-            return f"""I hear you asking about "{query}" and I want you to know that you're not alone in this. It takes courage to reach out for help, and I'm proud of you for taking this step.
-
-While I don't have specific resources that match exactly what you're looking for right now, there are still wonderful people ready to help you:
-
-**🤝 Immediate Support:**
-- **Call 211** - Just dial 2-1-1 and speak with a caring counselor who can connect you with resources in your area
-- **Harris Health System** - Call (713) 634-1110 for healthcare services with sliding scale fees
-- **United Way** - Visit 211texas.org for a comprehensive database of local resources
-
-Sometimes finding the right help takes a few tries, and that's completely normal. Don't give up - the right support is out there for you.
-
-Is there a more specific type of service you're looking for? I'd love to help you narrow down the search so we can find exactly what you need. You deserve support, and we're going to find it together. 💙"""
-
-        # Create empathetic opening based on query type
-        empathy_responses = {
-            'mental health': "I can see you're reaching out for mental health support, and that takes real strength. Mental health is just as important as physical health, and seeking help shows wisdom and self-care.",
-            'food': "I understand that food security is a basic need, and it's completely understandable to seek help when things are tight. There's no shame in needing assistance - we all need support sometimes.",
-            'housing': "Housing challenges can feel overwhelming, but you're taking the right step by looking for help. Safe, stable housing is a fundamental need, and there are people ready to support you.",
-            'dental': "Dental pain and oral health concerns can really impact your quality of life. I'm glad you're seeking care - your health matters, and you deserve to feel comfortable and pain-free.",
-            'substance': "Reaching out for help with substance use shows incredible courage and strength. Recovery is a journey, and there are compassionate professionals ready to walk alongside you.",
-            'healthcare': "Healthcare can feel complicated and expensive, but everyone deserves access to quality care. Let me help you find some options that might work for your situation."
-        }
+        Templates follow the query language (English, Spanish or Vietnamese).
+        """
+        t = get_templates(language or detect_language(query))
         
-        # Choose appropriate empathy response
-        empathy = "I'm so glad you reached out for help today. That takes courage, and you should be proud of yourself for taking this important step."
-        for key, response in empathy_responses.items():
-            if key in query.lower():
-                empathy = response
+        if not resources:
+            return t['no_results'].format(query=query)
+        
+        # Choose appropriate empathy response based on query type
+        empathy = t['empathy_default']
+        query_lower = query.lower()
+        for keywords, message in t['empathy']:
+            if any(keyword in query_lower for keyword in keywords):
+                empathy = message
                 break
         
-        response = f"{empathy}\n\n**Here are some excellent resources I found for you:**\n\n"
+        response = f"{empathy}\n\n{t['intro']}\n\n"
         
         for i, resource in enumerate(resources[:3], 1):  # Top 3 results
-            response += f"**{i}. {resource.name}** ✨ {resource.score:.0%} match\n"
-            response += f"   📍 **Location:** {resource.address}\n"
-            response += f"   📞 **Phone:** {resource.phone}\n"
+            response += f"**{i}. {resource.name}** ✨ {resource.score:.0%} {t['match']}\n"
+            response += f"   📍 **{t['location']}:** {resource.address}\n"
+            response += f"   📞 **{t['phone']}:** {resource.phone}\n"
             
             if resource.requirements:
-                response += f"   📋 **What to bring:** {', '.join(resource.requirements)}\n"
+                response += f"   📋 **{t['bring']}:** {', '.join(resource.requirements)}\n"
             
             if resource.cost:
-                response += f"   💰 **Cost:** {resource.cost}\n"
+                response += f"   💰 **{t['cost']}:** {resource.cost}\n"
             
             if resource.hours:
-                response += f"   🕐 **Hours:** {self.format_hours(resource.hours)}\n"
+                response += f"   🕐 **{t['hours']}:** {self.format_hours(resource.hours)}\n"
             
             if resource.services:
                 services_list = ', '.join(resource.services[:3])
                 if len(resource.services) > 3:
-                    services_list += f" and {len(resource.services) - 3} more services"
-                response += f"   🔧 **Services:** {services_list}\n"
+                    services_list += t['more_services'].format(count=len(resource.services) - 3)
+                response += f"   🔧 **{t['services']}:** {services_list}\n"
             
             response += "\n"
         
         # Add encouraging next steps
-        response += "**💡 My recommendations:**\n"
-        response += "• I'd suggest calling ahead to confirm they're accepting new clients and to ask about any requirements\n"
-        response += "• Don't hesitate to mention if you have insurance, Medicaid, or need sliding scale fees\n"
-        response += "• If the first place doesn't work out, try the next one - persistence often pays off\n\n"
+        response += f"{t['recommendations_title']}\n"
+        response += "".join(f"• {tip}\n" for tip in t['recommendations']) + "\n"
         
-        response += "You're taking all the right steps to get the help you need. Remember, asking for help is a sign of strength, not weakness. I'm here if you need to search for anything else - we're in this together! 🤗"
+        response += t['closing']
         
         return response
     
-    def chat(self, query: str, category_filter: str = None) -> Dict[str, Any]:
-        """Main chat interface - combines search and generation."""
+    def chat(self, query: str, category_filter: str = None, level: int = 0,
+             session: Optional[Session] = None) -> Dict[str, Any]:
+        """Main chat interface - combines search and generation.
         
-        print(f"🔍 Processing query: '{query}'")
+        level sheds work under load: 1 answers from local templates instead
+        of the LLM, 2 also skips re-ranking and MMR. With a session,
+        follow-ups refine the previous search and the LLM gets a summary of
+        the earlier turns.
+        """
         
-        # Search for relevant resources
-        resources = self.search_resources(query, top_k=5, category_filter=category_filter)
+        print(f"🔍 Processing query: '{query}'")
         
-        # Generate response
-        if self.use_openai and os.getenv('OPENAI_API_KEY'):
-            response_text = self.generate_response_openai(query, resources)
-        else:
-            response_text = self.generate_response_local(query, resources)
+        with session.lock if session is not None else nullcontext():
+            # Search for relevant resources
+            parsed = None
+            if self.query_filters:
+                with span('parse'):
+                    parsed = parse_query(query)
+            resources = self.search_resources(query, top_k=5, category_filter=category_filter, parsed=parsed,
+                                              first_pass_only=level >= 2, session=session)
+            context = session.summary(self.session_summary_chars) if session is not None else None
+            
+            # Generate response
+            usage = {}
+            with span('generate'):
+                if self.generator is not None and level == 0:
+                    response_text, usage = self.generate_response_llm(query, resources, context)
+                else:
+                    response_text = self.generate_response_local(query, resources)
+            if session is not None:
+                session.add_turn(query, [r.name for r in resources])
         
         # Return structured response
-        return {
+        result = {
             'query': query,
             'response': response_text,
             'resources_found': len(resources),
@@ -300,17 +542,45 @@ Is there a more specific type of service you're looking for? I'd love to help yo
                 }
                 for r in resources[:3]
             ],
+            'usage': usage,
+            'query_filters': parsed.to_dict() if parsed else None,
             'timestamp': datetime.utcnow().isoformat()
         }
+        if session is not None:
+            result['session_id'] = session.id
+            result['follow_up'] = session.follow_up
+        return result
+    
+    def stream_chat(self, query: str, category_filter: str = None, level: int = 0,
+                    session: Optional[Session] = None) -> Iterator[str]:
+        """Chat interface that streams the response as it is generated (levels and session as in chat)."""
+        
+        print(f"🔍 Processing streaming query: '{query}'")
+        
+        with session.lock if session is not None else nullcontext():
+            resources = self.search_resources(query, top_k=5, category_filter=category_filter,
+                                              first_pass_only=level >= 2, session=session)
+            context = None
+            if session is not None:
+                context = session.summary(self.session_summary_chars)
+                session.add_turn(query, [r.name for r in resources])
+        
+        with span('generate'):
+            if level > 0:
+                yield self.generate_response_local(query, resources)
+                return
+            for token in self.stream_response(query, resources, context):
+                yield token
     
     def interactive_mode(self):
         """Run in interactive chat mode."""
         print("🏥 NextStep Healthcare Assistant")
         print("=" * 50)
         print("Ask me about healthcare and social services in Houston!")
-        print("Type 'quit' to exit, 'help' for examples")
+        print("Type 'quit' to exit, 'help' for examples, 'new' to start over")
         print()
         
+        session = Session("interactive")
         while True:
             try:
                 query = input("You: ").strip()
@@ -329,11 +599,16 @@ Is there a more specific type of service you're looking for? I'd love to help yo
                     print()
                     continue
                 
+                if query.lower() == 'new':
+                    session = Session("interactive")
+                    print("🆕 New conversation\n")
+                    continue
+                
                 if not query:
                     continue
                 
-                # Get response
-                result = self.chat(query)
+                # Get response; follow-ups refine the previous answer
+                result = self.chat(query, session=session)
                 
                 print(f"\nNextStep: {result['response']}")
                 print()
@@ -347,6 +622,8 @@ Is there a more specific type of service you're looking for? I'd love to help yo
     
     def close(self):
         """Close database connections."""
+        if self.batcher is not None:
+            self.batcher.close()
         self.db.close()
 
 def main():
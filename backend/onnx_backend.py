@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime inference backend for EmbeddingPipeline.
+
+Export, verify and benchmark from the backend directory:
+
+    python onnx_backend.py export --quantize
+    python onnx_backend.py verify
+    python onnx_backend.py benchmark --threads 4
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+
+DEFAULT_MODEL = "paraphrase-multilingual-mpnet-base-v2"
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+METADATA_FILE = "nextstep_onnx.json"
+
+SAMPLE_TEXTS = [
+    "I need mental health counseling",
+    "Where can I get free food in Houston?",
+    "Necesito ayuda con comida para mi familia",
+    "Tôi cần tìm phòng khám nha khoa miễn phí",
+    "Emergency shelter for tonight",
+    "Name: Braes Interfaith Ministries\nCategory: food\nNotes: Food pantry open Monday, Wednesday and Friday",
+    "Requirements: photo_id, proof_of_address",
+    "Services: food_pantry, hot_meals, clothing",
+]
+
+
+# Pooling modes _pool implements
+SUPPORTED_POOLING = ('mean', 'cls')
+
+
+def default_onnx_dir(model_name: str) -> str:
+    """Default export location for a model, next to the backend code."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "models",
+                        model_name.replace('/', '_') + "-onnx")
+
+
+def export_onnx(model_name: str = DEFAULT_MODEL, output_dir: Optional[str] = None,
+                quantize: bool = False, opset: int = 14) -> str:
+    """Export the sentence-transformers encoder to ONNX (optionally int8-quantized)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = output_dir or default_onnx_dir(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    pooling_mode = st_model[1].get_pooling_mode_str()
+    if pooling_mode not in SUPPORTED_POOLING:
+        raise ValueError(f"{model_name} uses '{pooling_mode}' pooling; the ONNX "
+                         f"backend supports {', '.join(SUPPORTED_POOLING)}")
+    transformer = st_model[0].auto_model
+    tokenizer = st_model.tokenizer
+    transformer.eval()
+
+    dummy = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, MODEL_FILE)
+    print(f"📦 Exporting {model_name} to {model_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    metadata = {
+        'model_name': model_name,
+        'dimension': st_model.get_sentence_embedding_dimension(),
+        'max_seq_length': st_model.max_seq_length,
+        'pooling_mode': pooling_mode,
+        'normalize': any(type(module).__name__ == 'Normalize' for module in st_model),
+        'input_names': input_names,
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+    with open(os.path.join(output_dir, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+        print(f"🗜️  Quantizing to {quantized_path} (dynamic int8)...")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+    print(f"✅ Export complete: {output_dir}")
+    return output_dir
+
+
+class OnnxEncoder:
+    """Sentence embeddings from an exported ONNX graph via ONNX Runtime."""
+
+    def __init__(self, model_dir: str, quantized: bool = False,
+                 num_threads: Optional[int] = None, max_seq_length: Optional[int] = None):
+        if not HAS_ONNXRUNTIME:
+            raise ImportError("onnxruntime is required for the ONNX embedding backend")
+        from transformers import AutoTokenizer
+
+        metadata_path = os.path.join(model_dir, METADATA_FILE)
+        if not os.path.exists(metadata_path):
+            raise FileNotFoundError(f"No ONNX export found in {model_dir}; run "
+                                    f"'python onnx_backend.py export' first")
+        with open(metadata_path) as f:
+            self.metadata = json.load(f)
+
+        self.model_name = self.metadata['model_name']
+        self.dimension = self.metadata['dimension']
+        self.normalize = self.metadata.get('normalize', False)
+        self.pooling_mode = self.metadata.get('pooling_mode', 'mean')
+        if self.pooling_mode not in SUPPORTED_POOLING:
+            raise ValueError(f"{self.model_name} uses '{self.pooling_mode}' pooling; the ONNX "
+                             f"backend supports {', '.join(SUPPORTED_POOLING)}")
+        self.max_seq_length = min(max_seq_length or self.metadata['max_seq_length'],
+                                  self.metadata['max_seq_length'])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+
+        model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+        self.session = ort.InferenceSession(os.path.join(model_dir, model_file), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.pooling_mode == 'cls':
+            return hidden[:, 0]
+        mask = mask[..., None].astype(hidden.dtype)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts to float32 embeddings, shape (len(texts), dimension)."""
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+        # Length-sorted batches keep padding (and wasted compute) small
+        order = np.argsort([-len(t) for t in texts], kind='stable')
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            tokens = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            output[idx] = self._pool(hidden, tokens['attention_mask'])
+
+        if self.normalize:
+            output /= np.clip(np.linalg.norm(output, axis=1, keepdims=True), 1e-12, None)
+        return output
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity of two equally shaped matrices."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def verify(model_name: str = DEFAULT_MODEL, model_dir: Optional[str] = None,
+           quantized: bool = False, texts: List[str] = None,
+           tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """Check ONNX embeddings against the PyTorch model on sample texts.
+
+    fp32 exports must agree to a cosine of 1 - 1e-4; dynamic int8 exports
+    are held to 1 - 1e-2, which keeps neighbour rankings stable.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    texts = texts or SAMPLE_TEXTS
+    tolerance = tolerance if tolerance is not None else (1e-2 if quantized else 1e-4)
+    model_dir = model_dir or default_onnx_dir(model_name)
+
+    reference = SentenceTransformer(model_name, device="cpu").encode(texts, convert_to_numpy=True)
+    candidate = OnnxEncoder(model_dir, quantized=quantized).encode(texts)
+
+    cosines = cosine_rows(reference, candidate)
+    result = {
+        'quantized': quantized,
+        'min_cosine': float(cosines.min()),
+        'mean_cosine': float(cosines.mean()),
+        'max_abs_diff': float(np.abs(reference - candidate).max()),
+        'tolerance': tolerance,
+        'passed': bool(cosines.min() >= 1.0 - tolerance)
+    }
+    status = "✅" if result['passed'] else "❌"
+    print(f"{status} ONNX {'int8' if quantized else 'fp32'} vs PyTorch: "
+          f"min cosine {result['min_cosine']:.6f}, max abs diff {result['max_abs_diff']:.2e}")
+    return result
+
+
+def _time_calls(fn, repeats: int) -> List[float]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def benchmark(model_name: str = DEFAULT_MODEL, model_dir: Optional[str] = None,
+              num_threads: Optional[int] = None, max_seq_length: Optional[int] = None,
+              repeats: int = 50, ingest_size: int = 256) -> Dict[str, Dict[str, float]]:
+    """Compare single-query latency and batch ingest throughput across backends."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = model_dir or default_onnx_dir(model_name)
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    torch_model = SentenceTransformer(model_name, device="cpu")
+    if max_seq_length:
+        torch_model.max_seq_length = max_seq_length
+    backends = {'torch': lambda texts: torch_model.encode(texts, batch_size=32, convert_to_numpy=True)}
+    backends['onnx_fp32'] = OnnxEncoder(model_dir, False, num_threads, max_seq_length).encode
+    if os.path.exists(os.path.join(model_dir, QUANTIZED_MODEL_FILE)):
+        backends['onnx_int8'] = OnnxEncoder(model_dir, True, num_threads, max_seq_length).encode
+
+    corpus = (SAMPLE_TEXTS * (ingest_size // len(SAMPLE_TEXTS) + 1))[:ingest_size]
+    results = {}
+    for name, encode in backends.items():
+        encode(SAMPLE_TEXTS)  # warm up
+        query_ms = _time_calls(lambda: encode([SAMPLE_TEXTS[0]]), repeats)
+        ingest_ms = _time_calls(lambda: encode(corpus), 3)
+        results[name] = {
+            'query_p50_ms': float(np.percentile(query_ms, 50)),
+            'query_p95_ms': float(np.percentile(query_ms, 95)),
+            'ingest_texts_per_sec': ingest_size / (min(ingest_ms) / 1000.0)
+        }
+        print(f"⏱️  {name:10s} query p50 {results[name]['query_p50_ms']:7.2f} ms | "
+              f"p95 {results[name]['query_p95_ms']:7.2f} ms | "
+              f"ingest {results[name]['ingest_texts_per_sec']:8.1f} texts/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX embedding backend tools")
+    parser.add_argument("command", choices=["export", "verify", "benchmark"])
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--quantize", action="store_true",
+                        help="export: also write a dynamic int8 model; verify: check the int8 model")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max-seq-length", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model, args.output_dir, quantize=args.quantize)
+    elif args.command == "verify":
+        result = verify(args.model, args.output_dir, quantized=args.quantize)
+        raise SystemExit(0 if result['passed'] else 1)
+    else:
+        benchmark(args.model, args.output_dir, args.threads, args.max_seq_length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Precomputed chat answers for the suggestion pills, categories and the most frequent queries.
+
+The same few requests (the suggestion pills, popular questions) are
+searched and generated over and over. PrecomputedAnswers runs them once
+through NextStepAssistant.chat, keeps the results in memory and on disk,
+and recomputes them when the resources change (a fingerprint of resource
+ids, status and update times) or when new queries enter the top N.
+Category buttons only set a filter in the frontend, so the per-category
+answers are not direct hits; they back the cached level of /chat load
+shedding.
+
+After an ingest, `python precompute.py` writes the answers file; running
+servers pick it up on their next check instead of regenerating.
+"""
+
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+from index_snapshot import source_checksum
+from metrics import record_cache
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "precomputed.json")
+
+
+def answer_key(query: str, category: Optional[str]) -> str:
+    """Requests that differ only in case, spacing or end punctuation share an answer."""
+    normalized = " ".join(query.lower().split()).rstrip("?!. ")
+    return f"{category or ''}|{normalized}"
+
+
+def resources_fingerprint(resources: List[Dict[str, Any]]) -> str:
+    return source_checksum(resources, [])
+
+
+class PrecomputedAnswers:
+    """In-memory answers for fixed and popular requests, refreshed in the background."""
+
+    def __init__(self, assistant, categories: List[Dict[str, str]],
+                 fixed_queries: Optional[List[str]] = None,
+                 top_queries: Optional[Callable[[int], List[Tuple[str, Optional[str]]]]] = None,
+                 top_n: int = 20, interval: float = 600.0, path: Optional[str] = None):
+        self.assistant = assistant
+        self.categories = categories
+        self.fixed_queries = fixed_queries or []
+        self.top_queries = top_queries
+        self.top_n = top_n
+        self.interval = interval
+        self.path = path or os.getenv('NEXTSTEP_PRECOMPUTE_PATH', DEFAULT_PATH)
+        self.answers: Dict[str, Dict[str, Any]] = {}
+        self.fingerprint = None
+        self.generated = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def targets(self) -> List[Tuple[str, Optional[str]]]:
+        """(query, category) pairs to precompute: one per category, the fixed queries, then the top queries."""
+        targets = [(category['name'], category['id']) for category in self.categories]
+        # Pills are sent with whatever category is selected; unfiltered is the common case
+        targets.extend((query, None) for query in self.fixed_queries)
+        if self.top_queries is not None:
+            targets.extend(self.top_queries(self.top_n))
+        return targets
+
+    def get(self, query: str, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The stored chat result for this request, if there is one."""
+        answer = self.answers.get(answer_key(query, category))
+        record_cache('precomputed', 'hit' if answer is not None else 'miss')
+        if answer is None:
+            return None
+        return {**answer, 'timestamp': datetime.utcnow().isoformat()}
+
+    def for_category(self, category: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The stored answer for a category's button, used when shedding load."""
+        for entry in self.categories:
+            if entry['id'] == category:
+                return self.get(entry['name'], entry['id'])
+        return None
+
+    def load(self, fingerprint: str) -> bool:
+        """Use the answers file if it was computed from the same resources."""
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if stored.get('fingerprint') != fingerprint:
+            return False
+        self.answers = stored.get('answers', {})
+        self.fingerprint = fingerprint
+        print(f"📦 Loaded {len(self.answers)} precomputed answers from {self.path}")
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'answers': self.answers}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def refresh(self, force: bool = False) -> int:
+        """Recompute what is missing or outdated; returns how many answers were generated."""
+        with self._lock:
+            resources = self.assistant.db.get_all_resources()
+            fingerprint = resources_fingerprint(resources)
+            changed = force or fingerprint != self.fingerprint
+            if changed:
+                # Answer from the current resources, not an index built before they changed
+                self.assistant.refresh_index(resources)
+            if changed and not force and self.load(fingerprint):
+                changed = False
+
+            answers = {} if changed else dict(self.answers)
+            generated = 0
+            for query, category in self.targets():
+                key = answer_key(query, category)
+                if key in answers or self._stop.is_set():
+                    continue
+                result = self.assistant.chat(query, category)
+                result['query'] = query
+                answers[key] = result
+                generated += 1
+
+            if changed or generated:
+                self.answers = answers
+                self.fingerprint = fingerprint
+                self.generated += generated
+                try:
+                    self.save()
+                except OSError as e:
+                    print(f"⚠️  Could not save precomputed answers: {e}")
+                print(f"🧊 Precomputed {generated} answers ({len(answers)} stored)")
+            return generated
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Precompute failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="precompute", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'answers': len(self.answers),
+            'generated': self.generated,
+            'fingerprint': self.fingerprint[:12] if self.fingerprint else None,
+            'interval_s': self.interval,
+        }
+
+
+def main():
+    from nextstep_assistant import NextStepAssistant
+    from categories import CATEGORIES, SUGGESTION_PILLS
+
+    parser = argparse.ArgumentParser(description="Precompute chat answers for categories and top queries")
+    parser.add_argument("--queries", help="File with one popular query per line (most frequent first)")
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("--path", help=f"Answers file (default NEXTSTEP_PRECOMPUTE_PATH or {DEFAULT_PATH})")
+    args = parser.parse_args()
+
+    popular = []
+    if args.queries:
+        with open(args.queries) as f:
+            popular = [(line.strip(), None) for line in f if line.strip()]
+
+    assistant = NextStepAssistant()
+    try:
+        job = PrecomputedAnswers(assistant, CATEGORIES, SUGGESTION_PILLS, top_queries=lambda n: popular[:n],
+                                 top_n=args.top_n, path=args.path)
+        job.refresh(force=True)
+        print(f"💾 {len(job.answers)} answers written to {job.path}")
+    finally:
+        assistant.close()
+
+
+if __name__ == "__main__":
+    main()
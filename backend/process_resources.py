@@ -1,10 +1,10 @@
 from embedding_pipeline import EmbeddingPipeline
-from db_interface import DatabaseInterface
+from db_interface import StorageBackend, create_database
 import uuid
 from datetime import datetime
 import json
 
-def process_and_store_resource(resource_data: dict, pipeline: EmbeddingPipeline, db: DatabaseInterface):
+def process_and_store_resource(resource_data: dict, pipeline: EmbeddingPipeline, db: StorageBackend):
     """Process a single resource and store it in the database."""
     # Insert resource into database (db.insert_resource generates its own UUID)
     resource_id = db.insert_resource(resource_data)
@@ -25,7 +25,7 @@ def main():
     pipeline = EmbeddingPipeline()
     
     print("Connecting to database...")
-    db = DatabaseInterface()
+    db = create_database()
     
     # Example resource
     sample_resource = {
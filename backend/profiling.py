@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+On-demand profiling of a running worker.
+
+A profile is either a time window or the next N /chat requests. While it
+runs, a sampler thread walks every thread's stack at a fixed interval
+(sys._current_frames, so no tracing overhead on the request path) and
+tracemalloc optionally records allocations. The result is a collapsed
+stack file, one `frame;frame;frame count` line per stack, that
+flamegraph.pl and speedscope read directly, plus the top allocation sites.
+
+State is per process, so only the worker that receives the request (or
+signal) is profiled:
+
+    curl -X POST -H "X-Admin-Token: $NEXTSTEP_ADMIN_TOKEN" \
+         -d '{"requests": 20}' localhost:8000/admin/profile
+    curl -H "X-Admin-Token: ..." localhost:8000/admin/profile/collapsed > chat.folded
+
+or, with NEXTSTEP_PROFILE_SIGNAL=1, from a shell on the host (the window
+is NEXTSTEP_PROFILE_SECONDS, files go to NEXTSTEP_PROFILE_DIR):
+
+    python profiling.py --pid 12345
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List, Dict, Any, Optional
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles")
+
+
+def collapse_stack(frame) -> str:
+    """Root-first `file:function:line` frames joined with ';'."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class Profiler:
+    """Sampling profiler with optional allocation tracking, one session at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stacks: Dict[str, int] = {}
+        self._samples = 0
+        self._started = None
+        self._deadline = None
+        self._remaining_requests = None
+        self._memory = False
+        self._interval = 0.005
+        self._top_allocations = 20
+        self.result: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: Optional[float] = None, requests: Optional[int] = None,
+              interval_ms: float = 5.0, memory: bool = True, top_allocations: int = 20):
+        """Profile for `seconds`, or until `requests` /chat calls have finished."""
+        if not seconds and not requests:
+            raise ValueError("Give a time window (seconds) or a request count")
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profile is already running in this worker")
+            self._stop.clear()
+            # Don't show the previous run's profile while this one is running
+            self.result = None
+            self._stacks = {}
+            self._samples = 0
+            self._started = time.perf_counter()
+            # A request-count profile still ends after 10 minutes if traffic stops
+            self._deadline = self._started + (seconds or 600.0)
+            self._remaining_requests = requests
+            self._interval = max(interval_ms, 1.0) / 1000.0
+            self._memory = memory
+            self._top_allocations = top_allocations
+            if memory and not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._thread.start()
+        print(f"🔬 Profiling pid {os.getpid()}: "
+              f"{f'{requests} requests' if requests else f'{seconds:g}s'}")
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.is_set() and time.perf_counter() < self._deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = collapse_stack(frame)
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+            self._samples += 1
+            self._stop.wait(self._interval)
+        self._finish()
+
+    def _finish(self):
+        allocations = []
+        if self._memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            for stat in snapshot.statistics('lineno')[:self._top_allocations]:
+                frame = stat.traceback[0]
+                allocations.append({
+                    'site': f"{frame.filename}:{frame.lineno}",
+                    'size_kb': stat.size / 1024.0,
+                    'count': stat.count,
+                })
+        self.result = {
+            'pid': os.getpid(),
+            'duration_s': time.perf_counter() - self._started,
+            'samples': self._samples,
+            'interval_ms': self._interval * 1000.0,
+            'stacks': len(self._stacks),
+            'collapsed': "\n".join(f"{stack} {count}" for stack, count
+                                   in sorted(self._stacks.items(), key=lambda item: -item[1])),
+            'top_allocations': allocations,
+            'finished_at': time.time(),
+        }
+        print(f"🔬 Profile done: {self._samples} samples, {len(self._stacks)} distinct stacks")
+
+    def request_finished(self):
+        """Count a finished /chat request against a request-count profile."""
+        if self._remaining_requests is None or not self.running:
+            return
+        with self._lock:
+            self._remaining_requests -= 1
+            if self._remaining_requests <= 0:
+                self._remaining_requests = None
+                self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the running profile ends."""
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def stop(self, timeout: float = 10.0) -> Optional[Dict[str, Any]]:
+        """End the running profile early and return its result."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        return self.result
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'running': self.running,
+            'samples': self._samples,
+            'remaining_requests': self._remaining_requests,
+            'has_result': self.result is not None,
+        }
+
+    def write(self, directory: str = DEFAULT_PROFILE_DIR) -> List[str]:
+        """Write the last result as <pid>-<time>.folded and .alloc.txt files."""
+        if self.result is None:
+            return []
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.result['pid']}-{int(self.result['finished_at'])}")
+        with open(base + ".folded", "w") as f:
+            f.write(self.result['collapsed'] + "\n")
+        paths = [base + ".folded"]
+        if self.result['top_allocations']:
+            with open(base + ".alloc.txt", "w") as f:
+                for alloc in self.result['top_allocations']:
+                    f.write(f"{alloc['size_kb']:10.1f} KiB {alloc['count']:8d}  {alloc['site']}\n")
+            paths.append(base + ".alloc.txt")
+        return paths
+
+
+# One profiler per worker process
+profiler = Profiler()
+
+
+def install_signal_handler(seconds: Optional[float] = None, directory: Optional[str] = None):
+    """Profile this worker for a window on SIGUSR1 and write the files to directory."""
+    seconds = seconds or float(os.getenv('NEXTSTEP_PROFILE_SECONDS', '30'))
+    directory = directory or os.getenv('NEXTSTEP_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+
+    def profile_window():
+        try:
+            profiler.start(seconds=seconds)
+        except RuntimeError as e:
+            print(f"⚠️  {e}")
+            return
+        profiler.wait()
+        for path in profiler.write(directory):
+            print(f"💾 Profile written to {path}")
+
+    def handle(signum, frame):
+        threading.Thread(target=profile_window, name="profile-window", daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile one running worker (needs NEXTSTEP_PROFILE_SIGNAL=1)")
+    parser.add_argument("--pid", type=int, required=True, help="Worker process ID")
+    args = parser.parse_args()
+
+    os.kill(args.pid, signal.SIGUSR1)
+    directory = os.getenv('NEXTSTEP_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+    print(f"🔬 Signalled worker {args.pid}; its profile will be written to {directory}")
+
+
+if __name__ == "__main__":
+    main()
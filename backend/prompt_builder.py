@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import math
+import os
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from language_detection import LANGUAGE_NAMES
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+SYSTEM_PROMPT = """You are a compassionate social worker in Houston, Texas helping people find healthcare and social services. Respond as if you're sitting across from the person: warm, understanding and encouraging, while giving clear, actionable guidance. They may be scared, overwhelmed or vulnerable - make them feel heard, supported and hopeful.
+
+In every answer:
+1. Start with empathy - acknowledge their situation.
+2. Provide hope - help is available and reaching out was a good step.
+3. Recommend the best of the listed resources with their contact details.
+4. Give practical next steps (call, visit, what documents to bring).
+5. End with reassurance.
+
+Only use the resources and details provided in the user's message."""
+
+# Resource fields in the order they are worth spending tokens on.
+# (field, label, max characters)
+FIELD_PRIORITY = [
+    ('phone', 'Phone', 40),
+    ('address', 'Address', 120),
+    ('cost', 'Cost', 60),
+    ('requirements', 'Bring', 120),
+    ('hours', 'Hours', 160),
+    ('services', 'Services', 160),
+    ('notes', 'Notes', 200),
+    ('website', 'Website', 80),
+]
+
+# Fields whose identical values are hoisted into one shared line
+SHAREABLE_FIELDS = {'cost', 'requirements', 'hours'}
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens with tiktoken when installed, otherwise ~4 chars per token."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate prompt tokens for a chat message list (incl. per-message overhead)."""
+    return sum(estimate_tokens(m['content']) + 4 for m in messages) + 2
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Truncate text on a word boundary."""
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1].rsplit(' ', 1)[0].rstrip(',;')
+    return cut + "…"
+
+
+class PromptBuilder:
+    """Builds LLM prompts that fit a token budget.
+
+    The fixed instructions live in the system message so they are sent once
+    and stay cacheable. Resource details are added field by field in
+    priority order across all resources, so every resource gets its phone
+    number before any resource gets its notes, and low-value fields are
+    the first to be dropped when the budget runs out.
+    """
+
+    def __init__(self, max_prompt_tokens: Optional[int] = None,
+                 max_completion_tokens: Optional[int] = None,
+                 format_hours: Callable[[Dict[str, str]], str] = None):
+        self.max_prompt_tokens = max_prompt_tokens or int(os.getenv('NEXTSTEP_MAX_PROMPT_TOKENS', '1200'))
+        self.max_completion_tokens = max_completion_tokens or int(os.getenv('NEXTSTEP_MAX_COMPLETION_TOKENS', '600'))
+        self.format_hours = format_hours or (lambda hours: "; ".join(f"{d.title()}: {t}" for d, t in hours.items()))
+
+    def field_text(self, resource: Any, field: str) -> str:
+        """Render a single resource field as compact text."""
+        value = getattr(resource, field, None)
+        if not value:
+            return ""
+        if field in ('services', 'requirements'):
+            return ", ".join(value)
+        if field == 'hours':
+            return self.format_hours(value)
+        return str(value)
+
+    def shared_fields(self, resources: List[Any]) -> Dict[str, str]:
+        """Find field values identical across every resource."""
+        if len(resources) < 2:
+            return {}
+        shared = {}
+        for field in SHAREABLE_FIELDS:
+            values = {self.field_text(r, field) for r in resources}
+            if len(values) == 1:
+                value = values.pop()
+                if value:
+                    shared[field] = value
+        return shared
+
+    def build(self, query: str, resources: List[Any], language: Optional[str] = None,
+              context: Optional[str] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """Build chat messages for a query; returns (messages, budget report).
+
+        context is a short summary of earlier turns in the conversation.
+        """
+        header = f'Earlier in this conversation they asked: {context}\n' if context else ""
+        header += f'The person asked: "{query}"\n'
+        if language and language != 'en' and language in LANGUAGE_NAMES:
+            header += f"Respond in {LANGUAGE_NAMES[language]}.\n"
+        header += '\nAvailable resources:\n'
+        budget = self.max_prompt_tokens - estimate_tokens(SYSTEM_PROMPT) - estimate_tokens(header) - 10
+
+        shared = self.shared_fields(resources)
+        shared_line = ""
+        if shared:
+            labels = {f: label for f, label, _ in FIELD_PRIORITY}
+            shared_line = "All listed resources - " + "; ".join(
+                f"{labels[f]}: {truncate(v, 160)}" for f, v in sorted(shared.items())) + "\n"
+            budget -= estimate_tokens(shared_line)
+
+        # Name and category are always included
+        lines = [[f"{i}. {r.name} ({r.category})"] for i, r in enumerate(resources, 1)]
+        budget -= sum(estimate_tokens(l[0]) + 1 for l in lines)
+
+        dropped = 0
+        for field, label, max_chars in FIELD_PRIORITY:
+            if field in shared:
+                continue
+            for resource, resource_lines in zip(resources, lines):
+                text = self.field_text(resource, field)
+                if not text:
+                    continue
+                line = f"   {label}: {truncate(text, max_chars)}"
+                cost = estimate_tokens(line) + 1
+                if cost > budget:
+                    dropped += 1
+                    continue
+                resource_lines.append(line)
+                budget -= cost
+
+        context = "\n".join("\n".join(l) for l in lines)
+        user_content = header + shared_line + context
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content}
+        ]
+        report = {
+            'prompt_tokens_estimate': estimate_message_tokens(messages),
+            'max_prompt_tokens': self.max_prompt_tokens,
+            'fields_dropped': dropped,
+            'shared_fields': sorted(shared)
+        }
+        return messages, report
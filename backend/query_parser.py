@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Rule-based extraction of structured filters from free-text queries.
+
+"free dental clinic open Saturday that takes Medicaid near 77035" becomes
+category=dental, free, medicaid, days=[saturday], zip_code=77035. The
+index applies the filters as a boolean mask before scoring, so only the
+remaining resources' chunks are multiplied against the query vector.
+
+Parsing is a handful of precompiled regexes and set lookups (tens of
+microseconds); `ParsedQuery.parse_time_us` records the measured time.
+"""
+
+import re
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from language_detection import detect_language
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# (category, keywords) - specific categories first, so "dental clinic" is dental
+CATEGORY_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ('dental', ['dental', 'dentist', 'teeth', 'tooth', 'dentista', 'diente', 'muela', 'nha khoa', 'răng']),
+    ('vision', ['vision', 'eye', 'eyes', 'glasses', 'optometrist', 'lentes', 'anteojos', 'mắt', 'kính']),
+    ('mental_health', ['mental health', 'counseling', 'therapy', 'therapist', 'depression', 'anxiety',
+                       'salud mental', 'ansiedad', 'depresión', 'tâm thần', 'tâm lý']),
+    ('substance_abuse', ['substance', 'addiction', 'rehab', 'sober', 'detox', 'alcohol', 'drug',
+                         'adicción', 'adiccion', 'cai nghiện']),
+    ('interpersonal_violence', ['domestic violence', 'abuse shelter', 'abusive', 'violencia', 'bạo hành']),
+    ('food', ['food', 'pantry', 'groceries', 'meal', 'meals', 'hungry', 'comida', 'despensa', 'alimentos',
+              'thức ăn', 'thực phẩm']),
+    ('housing', ['housing', 'shelter', 'rent', 'homeless', 'vivienda', 'refugio', 'albergue', 'nhà ở', 'chỗ ở']),
+    ('transportation', ['transportation', 'ride', 'rides', 'bus', 'transporte', 'đi lại']),
+    ('telecommunications', ['phone service', 'cell phone', 'internet', 'lifeline', 'teléfono']),
+    ('education', ['education', 'class', 'classes', 'ged', 'esl', 'tutoring', 'school', 'clases', 'học']),
+    ('healthcare', ['healthcare', 'health care', 'clinic', 'doctor', 'medical', 'clínica', 'clinica',
+                    'médico', 'medico', 'bác sĩ', 'phòng khám']),
+]
+
+FREE_KEYWORDS = ['free', 'no cost', 'gratis', 'gratuito', 'miễn phí', 'mien phi']
+LOW_COST_KEYWORDS = ['low cost', 'low-cost', 'cheap', 'affordable', 'sliding scale', 'bajo costo', 'giá rẻ']
+MEDICAID_KEYWORDS = ['medicaid', 'medicare', 'chip']
+
+# (eligibility group, query keywords, patterns for the stored eligibility code)
+ELIGIBILITY_GROUPS: List[Tuple[str, List[str], List[str]]] = [
+    ('veterans', ['veteran', 'veterans', 'veterano', 'cựu chiến binh'], [r'veteran']),
+    ('women', ['women', 'woman', 'mujer', 'mujeres', 'phụ nữ'], [r'women', r'female', r'mother']),
+    ('men', ['men', "men's", 'hombres'], [r'(?<!wo)men']),
+    ('youth', ['youth', 'teen', 'teens', 'kids', 'children', 'child', 'niños', 'jóvenes', 'trẻ em'],
+     [r'youth', r'teen', r'child', r'famil']),
+    ('seniors', ['senior', 'seniors', 'elderly', 'older adults', 'ancianos', 'người già'], [r'senior', r'6[05]_plus']),
+    ('lgbtq', ['lgbt', 'lgbtq', 'gay', 'lesbian', 'transgender', 'queer'], [r'lgbt']),
+    ('disabled', ['disabled', 'disability', 'disabilities', 'discapacidad'], [r'disab']),
+]
+
+# Eligibility codes that exclude nobody
+OPEN_ELIGIBILITY = ['general_public', 'all_ages', 'anyone', 'everyone', 'unknown', 'eligibility']
+
+SERVICE_LANGUAGE_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ('es', ['in spanish', 'spanish speaking', 'spanish-speaking', 'habla español', 'hablan español', 'en español']),
+    ('vi', ['in vietnamese', 'vietnamese speaking', 'vietnamese-speaking', 'tiếng việt', 'tieng viet']),
+    ('zh', ['in chinese', 'mandarin', 'cantonese', 'chinese speaking']),
+    ('ar', ['in arabic', 'arabic speaking']),
+]
+
+DAY_ALIASES = {
+    'mon': 'monday', 'tue': 'tuesday', 'tues': 'tuesday', 'wed': 'wednesday', 'thu': 'thursday',
+    'thur': 'thursday', 'thurs': 'thursday', 'fri': 'friday', 'sat': 'saturday', 'sun': 'sunday',
+    'lunes': 'monday', 'martes': 'tuesday', 'miércoles': 'wednesday', 'miercoles': 'wednesday',
+    'jueves': 'thursday', 'viernes': 'friday', 'sábado': 'saturday', 'sabado': 'saturday',
+    'domingo': 'sunday', 'thứ bảy': 'saturday', 'chủ nhật': 'sunday',
+}
+
+_ZIP = re.compile(r'(?<![\d$])(7[5-9]\d{3})(?![\d%])')
+_TIME = re.compile(r'\b(at|after|before|by|until)?\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)')
+_DAY_WORDS = sorted(WEEKDAYS + [d + 's' for d in WEEKDAYS] + list(DAY_ALIASES), key=len, reverse=True)
+_DAY = re.compile(r'\b(' + '|'.join(re.escape(d) for d in _DAY_WORDS) + r')\b')
+_WEEKEND = re.compile(r'\b(weekend|weekends|fin de semana|cuối tuần)\b')
+_EVENING = re.compile(r'\b(evening|evenings|night|tonight|after work|noche)\b')
+_MORNING = re.compile(r'\b(morning|mornings|mañana)\b')
+_RELATIVE_DAY = re.compile(r'\b(today|tonight|tomorrow|hoy|hôm nay)\b')
+
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    return re.compile(r'(?<!\w)(' + '|'.join(re.escape(k) for k in keywords) + r')(?!\w)')
+
+
+_CATEGORY_PATTERNS = [(category, _keyword_pattern(words)) for category, words in CATEGORY_KEYWORDS]
+_FREE = _keyword_pattern(FREE_KEYWORDS)
+_LOW_COST = _keyword_pattern(LOW_COST_KEYWORDS)
+_MEDICAID = _keyword_pattern(MEDICAID_KEYWORDS)
+_ELIGIBILITY_PATTERNS = [(group, _keyword_pattern(words), re.compile('|'.join(codes)))
+                         for group, words, codes in ELIGIBILITY_GROUPS]
+_LANGUAGE_PATTERNS = [(language, _keyword_pattern(words)) for language, words in SERVICE_LANGUAGE_KEYWORDS]
+
+
+@dataclass
+class QueryFilters:
+    """Structured constraints extracted from a query. Empty fields don't filter."""
+    category: Optional[str] = None
+    free: bool = False
+    low_cost: bool = False
+    medicaid: bool = False
+    eligibility: Optional[str] = None
+    zip_code: Optional[str] = None
+    days: List[str] = field(default_factory=list)
+    open_at: Optional[int] = None        # minutes after midnight
+    opens_before: Optional[int] = None
+    closes_after: Optional[int] = None
+    service_language: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return any(self.to_dict().values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if v not in (None, False, [])}
+
+
+@dataclass
+class ParsedQuery:
+    """A query, its detected language and extracted filters.
+
+    `relaxed` lists filters the search had to drop to find any match.
+    """
+    text: str
+    language: str
+    filters: QueryFilters
+    parse_time_us: float
+    relaxed: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'filters': self.filters.to_dict(), 'relaxed': self.relaxed,
+                'language': self.language, 'parse_time_us': self.parse_time_us}
+
+
+def parse_time(match: re.Match) -> int:
+    hour = int(match.group(2)) % 12
+    if match.group(4).startswith('p'):
+        hour += 12
+    return hour * 60 + int(match.group(3) or 0)
+
+
+def extract_filters(query: str, now: Optional[datetime] = None) -> QueryFilters:
+    """Extract filters from a query with keyword and regex rules."""
+    text = " ".join(query.lower().split())
+    filters = QueryFilters()
+
+    for category, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(text):
+            filters.category = category
+            break
+
+    filters.free = bool(_FREE.search(text))
+    filters.low_cost = not filters.free and bool(_LOW_COST.search(text))
+    filters.medicaid = bool(_MEDICAID.search(text))
+
+    for group, pattern, _ in _ELIGIBILITY_PATTERNS:
+        if pattern.search(text):
+            filters.eligibility = group
+            break
+
+    for language, pattern in _LANGUAGE_PATTERNS:
+        if pattern.search(text):
+            filters.service_language = language
+            break
+
+    zip_match = _ZIP.search(text)
+    if zip_match:
+        filters.zip_code = zip_match.group(1)
+
+    days = []
+    for match in _DAY.finditer(text):
+        word = match.group(1)
+        day = DAY_ALIASES.get(word) or DAY_ALIASES.get(word.rstrip('s')) or word.rstrip('s')
+        if day in WEEKDAYS and day not in days:
+            days.append(day)
+    if _WEEKEND.search(text):
+        days.extend(d for d in ('saturday', 'sunday') if d not in days)
+    relative = _RELATIVE_DAY.search(text)
+    if relative and not days:
+        now = now or datetime.now()
+        offset = 1 if relative.group(1) == 'tomorrow' else 0
+        days.append(WEEKDAYS[(now.weekday() + offset) % 7])
+    filters.days = days
+
+    time_match = _TIME.search(text)
+    if time_match:
+        minutes = parse_time(time_match)
+        qualifier = time_match.group(1)
+        if qualifier in ('after', 'until'):
+            filters.closes_after = minutes
+        elif qualifier in ('before', 'by'):
+            filters.opens_before = minutes
+        else:
+            filters.open_at = minutes
+    elif _EVENING.search(text):
+        filters.closes_after = 17 * 60
+    elif _MORNING.search(text):
+        filters.opens_before = 12 * 60
+
+    return filters
+
+
+def parse_query(query: str, now: Optional[datetime] = None) -> ParsedQuery:
+    """Detect language and extract filters, timing the parse."""
+    start = time.perf_counter()
+    language = detect_language(query)
+    filters = extract_filters(query, now)
+    elapsed = (time.perf_counter() - start) * 1e6
+    return ParsedQuery(text=query, language=language, filters=filters, parse_time_us=round(elapsed, 1))
+
+
+def parse_hours_range(value: str) -> Optional[Tuple[int, int]]:
+    """'10:00-14:00' -> (600, 840); unparseable values count as open all day."""
+    value = str(value).strip().lower()
+    if value in ('', 'closed'):
+        return None
+    try:
+        start, end = value.split('-', 1)
+        to_minutes = lambda t: int(t.split(':')[0]) * 60 + int((t.split(':') + ['0'])[1])
+        return to_minutes(start.strip()), to_minutes(end.strip())
+    except (ValueError, IndexError):
+        return 0, 24 * 60
+
+
+# Cost values that say nothing about the price
+UNKNOWN_COSTS = {'', 'unknown', 'varies'}
+
+
+class ResourceFacets:
+    """Per-resource filter columns, precomputed once per index.
+
+    Unknown values never exclude a resource: no hours data passes a day
+    filter, an unknown eligibility passes any group. Only data that
+    contradicts the query removes a candidate.
+    """
+
+    # Filters dropped first when nothing matches all of them
+    RELAX_ORDER = ['service_language', 'time', 'days', 'zip_code', 'eligibility',
+                   'medicaid', 'low_cost', 'free', 'category']
+
+    def __init__(self, resources: List[Dict[str, Any]]):
+        n = len(resources)
+        self.categories = np.array([r.get('category', '') for r in resources])
+        costs = [str(r.get('cost') or '').strip().lower() for r in resources]
+        # No cost data, or "varies", passes the cost filters
+        cost_unknown = np.array([c in UNKNOWN_COSTS for c in costs], dtype=bool)
+        self.free = cost_unknown | np.array(['free' in c for c in costs], dtype=bool)
+        self.low_cost = self.free | np.array(
+            [any(k in c for k in ('reduced', 'sliding', 'low_cost')) for c in costs], dtype=bool)
+        self.eligibility = [str(r.get('eligibility') or '').lower() for r in resources]
+        # Free resources serve Medicaid patients too; Medicaid can show up in cost or eligibility
+        self.medicaid = self.free | np.array(
+            [any(k in c or k in e for k in ('medicaid', 'medicare'))
+             for c, e in zip(costs, self.eligibility)], dtype=bool)
+        self.eligibility_open = np.array(
+            [not e or any(k in e for k in OPEN_ELIGIBILITY) for e in self.eligibility], dtype=bool)
+        self.zip_codes = np.array([(_ZIP.findall(str(r.get('address') or '')) or [''])[-1] for r in resources])
+        self.languages = [set(r.get('languages') or []) for r in resources]
+        # No list, or just the CSV loader's ["en"] default, says nothing about other languages
+        self.languages_known = np.array([bool(langs - {'en'}) for langs in self.languages], dtype=bool)
+
+        # Opening and closing minute per weekday; -1 means closed
+        self.has_hours = np.zeros(n, dtype=bool)
+        self.opens = np.full((n, 7), -1, dtype=np.int32)
+        self.closes = np.full((n, 7), -1, dtype=np.int32)
+        for i, resource in enumerate(resources):
+            hours = resource.get('hours_structured') or {}
+            self.has_hours[i] = bool(hours)
+            for day, value in hours.items():
+                if day in WEEKDAYS:
+                    span = parse_hours_range(value)
+                    if span:
+                        self.opens[i, WEEKDAYS.index(day)], self.closes[i, WEEKDAYS.index(day)] = span
+
+    def mask(self, filters: QueryFilters, skip: Tuple[str, ...] = ()) -> np.ndarray:
+        """Boolean mask of resources satisfying every filter not in `skip`."""
+        mask = np.ones(len(self.free), dtype=bool)
+        if filters.category and 'category' not in skip:
+            mask &= self.categories == filters.category
+        if filters.free and 'free' not in skip:
+            mask &= self.free
+        if filters.low_cost and 'low_cost' not in skip:
+            mask &= self.low_cost
+        if filters.medicaid and 'medicaid' not in skip:
+            mask &= self.medicaid
+        if filters.eligibility and 'eligibility' not in skip:
+            codes = next(c for g, _, c in _ELIGIBILITY_PATTERNS if g == filters.eligibility)
+            mask &= self.eligibility_open | np.array(
+                [bool(codes.search(e)) for e in self.eligibility], dtype=bool)
+        if filters.zip_code and 'zip_code' not in skip:
+            # Same 4-digit prefix approximates "nearby" without geocoding; no ZIP passes
+            mask &= (self.zip_codes == '') | np.char.startswith(self.zip_codes, filters.zip_code[:4])
+        if filters.service_language and 'service_language' not in skip:
+            mask &= ~self.languages_known | np.array(
+                [filters.service_language in langs for langs in self.languages], dtype=bool)
+
+        use_days = filters.days and 'days' not in skip
+        use_time = (filters.open_at is not None or filters.opens_before is not None
+                    or filters.closes_after is not None) and 'time' not in skip
+        if use_days or use_time:
+            day_ids = [WEEKDAYS.index(d) for d in filters.days] if use_days else list(range(7))
+            opens, closes = self.opens[:, day_ids], self.closes[:, day_ids]
+            ok = opens >= 0
+            if use_time:
+                if filters.open_at is not None:
+                    ok &= (opens <= filters.open_at) & (closes > filters.open_at)
+                if filters.opens_before is not None:
+                    ok &= opens < filters.opens_before
+                if filters.closes_after is not None:
+                    ok &= closes > filters.closes_after
+            mask &= ~self.has_hours | ok.any(axis=1)
+        return mask
+
+    def relaxed_mask(self, filters: QueryFilters, base: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        """Apply filters on top of `base`, dropping the weakest ones until something matches.
+
+        Returns the mask and the names of filters that were dropped.
+        """
+        skipped: List[str] = []
+        mask = base & self.mask(filters)
+        active = filters.to_dict()
+        if any(k in active for k in ('open_at', 'opens_before', 'closes_after')):
+            active['time'] = True
+        for name in self.RELAX_ORDER:
+            if mask.any() or not base.any():
+                break
+            if name not in active:
+                continue
+            skipped.append(name)
+            mask = base & self.mask(filters, tuple(skipped))
+        return mask, skipped
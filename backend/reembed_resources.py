@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Re-embed resources with a different embedding model.
+
+Zero-downtime model upgrade:
+
+    1. python reembed_resources.py --model minilm --keep-old
+       (servers keep answering from the old vectors meanwhile)
+    2. switch NEXTSTEP_EMBEDDING_MODEL=minilm and restart workers one by one;
+       each worker only scores vectors of its own model version
+    3. python reembed_resources.py --model minilm --cleanup
+
+Re-runs are resumable: resources that already have vectors for the
+target version are skipped.
+"""
+
+import argparse
+import threading
+from typing import Dict, Any, List, Set
+
+from db_interface import StorageBackend, create_database
+from embedding_pipeline import EmbeddingPipeline
+from embedding_models import doc_version
+
+
+def version_coverage(db: StorageBackend) -> Dict[str, Set[str]]:
+    """Map resource_id -> versions present, for every stored embedding."""
+    coverage: Dict[str, Set[str]] = {}
+    for doc in db.get_all_embeddings():
+        coverage.setdefault(doc.get('resource_id'), set()).add(doc_version(doc) or 'invalid')
+    return coverage
+
+
+def reembed_batch(pipeline: EmbeddingPipeline, db: StorageBackend,
+                  resources: List[Dict[str, Any]]) -> int:
+    """Embed a batch of resources in one encode call and insert the vectors."""
+    inserted = 0
+    for resource, records in zip(resources, pipeline.process_resources_batch(resources)):
+        for record in records:
+            record['resource_id'] = resource.get('_id')
+        db.insert_embeddings(records)
+        inserted += len(records)
+    return inserted
+
+
+def delete_other_versions(db: StorageBackend, resource_id: str, version: str) -> int:
+    """Delete a resource's vectors that do not belong to version."""
+    stale_ids = [doc['_id'] for doc in db.get_all_embeddings({'resource_id': resource_id})
+                 if doc_version(doc) != version]
+    if not stale_ids:
+        return 0
+    return db.delete_embeddings({'_id': {'$in': stale_ids}})
+
+
+def reembed_resources(pipeline: EmbeddingPipeline, db: StorageBackend,
+                      batch_size: int = 16, delete_old: bool = True,
+                      dry_run: bool = False) -> Dict[str, int]:
+    """Embed resources missing pipeline's version, optionally retiring other versions."""
+    resources = db.get_all_resources()
+    coverage = version_coverage(db)
+    missing = [r for r in resources if pipeline.version not in coverage.get(r.get('_id'), set())]
+    print(f"🔁 {len(missing)}/{len(resources)} resources need {pipeline.version} embeddings")
+
+    if dry_run:
+        return {'resources': len(resources), 'missing': len(missing), 'inserted': 0, 'deleted': 0}
+
+    inserted = 0
+    for start in range(0, len(missing), batch_size):
+        inserted += reembed_batch(pipeline, db, missing[start:start + batch_size])
+        print(f"   ✅ {min(start + batch_size, len(missing))}/{len(missing)} resources")
+
+    deleted = 0
+    if delete_old:
+        deleted = cleanup_old_versions(pipeline, db)
+
+    print(f"📈 Inserted {inserted} embeddings, deleted {deleted} old embeddings")
+    return {'resources': len(resources), 'missing': len(missing), 'inserted': inserted, 'deleted': deleted}
+
+
+def cleanup_old_versions(pipeline: EmbeddingPipeline, db: StorageBackend) -> int:
+    """Delete other versions' vectors, but only for resources fully migrated."""
+    deleted = 0
+    for resource_id, versions in version_coverage(db).items():
+        if pipeline.version in versions and len(versions) > 1:
+            deleted += delete_other_versions(db, resource_id, pipeline.version)
+    print(f"🧹 Deleted {deleted} embeddings from other versions")
+    return deleted
+
+
+class RollingReembedJob:
+    """Background job that keeps every resource embedded in the current version.
+
+    Every `interval` seconds it looks for active resources without vectors
+    of the pipeline's version and embeds them `batch_size` at a time, pausing
+    between batches so it never competes with live queries for long.
+    """
+
+    def __init__(self, pipeline: EmbeddingPipeline, db: StorageBackend,
+                 batch_size: int = 8, interval: float = 60.0, pause: float = 1.0):
+        self.pipeline = pipeline
+        self.db = db
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.embedded = 0
+        self.remaining = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def missing_resources(self) -> List[Dict[str, Any]]:
+        coverage = version_coverage(self.db)
+        return [r for r in self.db.get_all_resources()
+                if r.get('status') == 'active'
+                and self.pipeline.version not in coverage.get(r.get('_id'), set())]
+
+    def run_once(self) -> int:
+        """Embed every missing resource, batch by batch; returns how many."""
+        missing = self.missing_resources()
+        self.remaining = len(missing)
+        done = 0
+        for start in range(0, len(missing), self.batch_size):
+            if self._stop.is_set():
+                break
+            batch = missing[start:start + self.batch_size]
+            reembed_batch(self.pipeline, self.db, batch)
+            done += len(batch)
+            self.embedded += len(batch)
+            self.remaining = len(missing) - done
+            self._stop.wait(self.pause)
+        if done:
+            print(f"🔁 Rolling re-embed: {done} resources embedded with {self.pipeline.version}")
+        return done
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Rolling re-embed failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rolling-reembed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'version': self.pipeline.version, 'embedded': self.embedded, 'remaining': self.remaining}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed resources with another model")
+    parser.add_argument("--model", required=True,
+                        help="Model name or alias from embedding_models.EMBEDDING_MODELS")
+    parser.add_argument("--batch-size", type=int, default=16, help="Resources per encode call")
+    parser.add_argument("--keep-old", action="store_true", help="Do not delete other versions' embeddings")
+    parser.add_argument("--cleanup", action="store_true",
+                        help="Only delete other versions' embeddings of fully migrated resources")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    pipeline = EmbeddingPipeline(args.model)
+    db = create_database()
+    try:
+        if args.cleanup:
+            cleanup_old_versions(pipeline, db)
+        else:
+            reembed_resources(pipeline, db, batch_size=args.batch_size,
+                              delete_old=not args.keep_old, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Request log and traffic replay.
+
+The server appends one JSON line per /chat, /chat/stream and
+/search/batch request to NEXTSTEP_REQUEST_LOG (default
+backend/data/request_log.jsonl, 'off' disables):
+
+    {"ts": "2025-01-01T12:00:00", "endpoint": "/chat", "query": "free food",
+     "category": null, "client": "3f2a9c...", "status": 200, "total_ms": 412.3,
+     "stages": {"parse": 0.1, "embed": 8.2, "score": 1.9, "generate": 380.4}}
+
+At startup the server replays the recent log to warm the query embedding
+cache, the suggestion counts that feed the precomputed answers, and the
+OS page cache for the index snapshot. The same log drives a load test
+against a running server:
+
+    python request_log.py replay --url http://localhost:8000 --rate 5 --limit 500
+    python request_log.py top --n 20
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "request_log.jsonl")
+
+
+def log_path() -> Optional[str]:
+    path = os.getenv('NEXTSTEP_REQUEST_LOG', DEFAULT_LOG_PATH)
+    return None if path.lower() in ('', 'off', '0') else path
+
+
+class RequestLog:
+    """Appends request entries as JSON lines, rotating to <path>.1 past max_mb."""
+
+    def __init__(self, path: str, max_mb: float = 100.0):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        self.written = 0
+
+    def write(self, endpoint: str, query: str, category: Optional[str], status: int,
+              total_ms: float, stages: Dict[str, float], **extra):
+        entry = {
+            'ts': datetime.utcnow().isoformat(timespec='seconds'),
+            'endpoint': endpoint,
+            'query': query,
+            'category': category,
+            'status': status,
+            'total_ms': round(total_ms, 2),
+            'stages': {name: round(ms, 2) for name, ms in stages.items()},
+            **extra,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.written += 1
+            if self.written % 1000 == 0 and self._file.tell() > self.max_bytes:
+                self._file.close()
+                os.replace(self.path, self.path + ".1")
+                self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_log(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """The last `limit` entries (all when None), oldest first; bad lines are skipped."""
+    entries = deque(maxlen=limit)
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('query'):
+                    entries.append(entry)
+    except OSError:
+        return []
+    return list(entries)
+
+
+def popular_requests(entries: List[Dict[str, Any]], n: int) -> List[Tuple[Tuple[str, Optional[str]], int]]:
+    """Most frequent (query, category) pairs among successful requests."""
+    counts = Counter((" ".join(e['query'].split()), e.get('category'))
+                     for e in entries if e.get('status', 200) < 400)
+    return counts.most_common(n)
+
+
+def warm_page_cache(path: str, block_size: int = 4 * 1024 * 1024) -> int:
+    """Read a file through once so its pages are resident; returns bytes read."""
+    read = 0
+    with open(path, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            read += len(block)
+    return read
+
+
+def warm_up(assistant, entries: List[Dict[str, Any]], suggester=None) -> Dict[str, Any]:
+    """Warm caches from logged traffic before serving.
+
+    Replays query counts into the suggestion index (which also picks the
+    precomputed answers), embeds the most frequent queries into the
+    query embedding cache, and pages in the index snapshot matrix.
+    """
+    start = time.perf_counter()
+    report = {'entries': len(entries)}
+    if suggester is not None:
+        for entry in entries:
+            suggester.record_query(entry['query'], entry.get('client'))
+
+    cache = getattr(assistant, 'query_cache', None)
+    if cache is not None and entries:
+        queries = [query for (query, _), _ in popular_requests(entries, cache.max_size)]
+        report['embedded'] = assistant.warm_query_cache(queries)
+
+    index = getattr(assistant, 'index', None)
+    if index is not None and isinstance(index.matrix, np.memmap):
+        report['page_cache_mb'] = warm_page_cache(index.matrix.filename) / (1024 * 1024)
+
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def replay(url: str, entries: List[Dict[str, Any]], rate: float, concurrency: int,
+           stream: bool = False, timeout: float = 60.0) -> Dict[str, Any]:
+    """Send logged /chat requests to a server at `rate` per second and time them."""
+    endpoint = url.rstrip('/') + ('/chat/stream' if stream else '/chat')
+    latencies, errors = [], Counter()
+    lock = threading.Lock()
+
+    def send(entry):
+        body = json.dumps({'message': entry['query'], 'category': entry.get('category')}).encode()
+        request = urllib.request.Request(endpoint, data=body, headers={'Content-Type': 'application/json'})
+        sent = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+            with lock:
+                latencies.append((time.perf_counter() - sent) * 1000.0)
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, entry in enumerate(entries):
+            # Open-loop schedule: send times don't depend on response times
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, entry)
+    elapsed = time.perf_counter() - start
+
+    report = {'sent': len(entries), 'ok': len(latencies), 'errors': dict(errors),
+              'seconds': elapsed, 'achieved_rate': len(entries) / elapsed if elapsed else 0.0}
+    if latencies:
+        for p in (50, 95, 99):
+            report[f'p{p}_ms'] = float(np.percentile(latencies, p))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay the server request log")
+    parser.add_argument("--log", default=None, help=f"Log file (default NEXTSTEP_REQUEST_LOG or {DEFAULT_LOG_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    top = sub.add_parser("top", help="Most frequent requests and their latency per stage")
+    top.add_argument("--n", type=int, default=20)
+
+    load = sub.add_parser("replay", help="Replay logged /chat traffic against a running server")
+    load.add_argument("--url", default="http://localhost:8000")
+    load.add_argument("--rate", type=float, default=5.0, help="Requests per second")
+    load.add_argument("--limit", type=int, default=None, help="Replay only the last N requests")
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--stream", action="store_true", help="Use /chat/stream")
+    args = parser.parse_args()
+
+    path = args.log or log_path() or DEFAULT_LOG_PATH
+    entries = [e for e in read_log(path, args.limit if args.command == "replay" else None)
+               if e.get('endpoint', '/chat') in ('/chat', '/chat/stream')]
+    if not entries:
+        print(f"❌ No logged requests in {path}")
+        return
+
+    if args.command == "top":
+        stages: Dict[str, List[float]] = {}
+        for entry in entries:
+            for stage, ms in entry.get('stages', {}).items():
+                stages.setdefault(stage, []).append(ms)
+        print(f"📜 {len(entries)} requests in {path}")
+        for (query, category), count in popular_requests(entries, args.n):
+            print(f"   {count:5d}  {query}{f'  [{category}]' if category else ''}")
+        print("\n⏱️  Stage latency p50 / p95 (ms):")
+        for stage, values in sorted(stages.items()):
+            print(f"   {stage:10s} {np.percentile(values, 50):8.1f} {np.percentile(values, 95):8.1f}")
+        return
+
+    print(f"🚀 Replaying {len(entries)} requests to {args.url} at {args.rate}/s...")
+    report = replay(args.url, entries, args.rate, args.concurrency, stream=args.stream)
+    print(f"   ok {report['ok']}/{report['sent']} in {report['seconds']:.1f}s "
+          f"({report['achieved_rate']:.1f}/s), errors {report['errors'] or 'none'}")
+    if 'p50_ms' in report:
+        print(f"   latency p50 {report['p50_ms']:.0f} ms  p95 {report['p95_ms']:.0f} ms  p99 {report['p99_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import math
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from chunking import description_chunk, services_chunk, access_chunk
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def rerank_text(resource: Dict[str, Any]) -> str:
+    """Passage the cross-encoder reads for a resource."""
+    parts = [description_chunk(resource), services_chunk(resource), access_chunk(resource)]
+    return "\n".join(p for p in parts if p)
+
+
+class CrossEncoderReranker:
+    """Second-stage re-ranking of first-pass candidates with a cross-encoder.
+
+    All (query, resource) pairs go through one batched forward pass. Each
+    call gets a latency budget: the cost is predicted from a moving average
+    of past calls, the candidate list is trimmed to what fits, and the
+    stage is skipped entirely when it would not fit `min_candidates` or
+    when `max_concurrent` re-ranks are already running (server under load).
+    Skipped calls return the first-pass order unchanged.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, budget_ms: Optional[float] = None,
+                 max_concurrent: Optional[int] = None, batch_size: int = 32):
+        if CrossEncoder is None:
+            raise ImportError("sentence-transformers is required for re-ranking")
+        self.model_name = model_name or os.getenv('NEXTSTEP_RERANK_MODEL', DEFAULT_RERANK_MODEL)
+        self.budget_ms = budget_ms if budget_ms is not None else float(os.getenv('NEXTSTEP_RERANK_BUDGET_MS', '80'))
+        self.max_concurrent = max_concurrent or int(os.getenv('NEXTSTEP_RERANK_MAX_CONCURRENT', '2'))
+        self.batch_size = batch_size
+        self.model = CrossEncoder(self.model_name, max_length=256)
+
+        self._lock = threading.Lock()
+        self._active = 0
+        # Cost model: fixed overhead plus per-pair time, both moving averages
+        self._overhead_ms = 5.0
+        self._pair_ms = 2.0
+        self._calls = 0
+        self._pairs = 0
+        self._time_ms = 0.0
+        self._skipped = {'budget': 0, 'load': 0}
+
+        # First call pays for lazy initialization; keep it out of the cost model
+        self.model.predict([("warm up", "warm up")])
+
+    def predict_ms(self, pairs: int) -> float:
+        return self._overhead_ms + self._pair_ms * pairs
+
+    def score(self, query: str, resources: List[Dict[str, Any]]) -> List[float]:
+        """Cross-encoder relevance (0-1) of each resource, in one batched call.
+
+        ms-marco cross-encoders output logits; a sigmoid puts them on the
+        same 0-1 scale as the first-pass cosine scores.
+        """
+        pairs = [(query, rerank_text(r)) for r in resources]
+        logits = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        return [1.0 / (1.0 + math.exp(-float(s))) for s in logits]
+
+    def rerank(self, query: str, candidates: List[Tuple[Dict[str, Any], float]], top_k: int,
+               budget_ms: Optional[float] = None,
+               min_candidates: Optional[int] = None) -> Tuple[List[Tuple[Dict[str, Any], float]], Dict[str, Any]]:
+        """Re-rank (resource, score) candidates; returns (top_k results, report).
+
+        Re-ranked results carry the cross-encoder score. Candidates beyond
+        what the budget allows keep their first-pass order after the
+        re-ranked ones, with scores capped at the lowest re-ranked score so
+        the list stays sorted.
+        """
+        budget = self.budget_ms if budget_ms is None else budget_ms
+        min_candidates = min_candidates or top_k
+        report = {'reranked': False, 'candidates': len(candidates), 'budget_ms': round(budget, 1)}
+
+        fit = int((budget - self._overhead_ms) / self._pair_ms) if self._pair_ms > 0 else len(candidates)
+        count = min(len(candidates), fit)
+        if count < min(min_candidates, len(candidates)):
+            self._skip('budget')
+            report['skipped'] = 'budget'
+            return candidates[:top_k], report
+
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                self._skipped['load'] += 1
+                report['skipped'] = 'load'
+                return candidates[:top_k], report
+            self._active += 1
+
+        try:
+            start = time.perf_counter()
+            head = candidates[:count]
+            scores = self.score(query, [resource for resource, _ in head])
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        self._record(count, elapsed_ms)
+        reranked = sorted(zip([r for r, _ in head], scores), key=lambda item: -item[1])
+        report.update({'reranked': True, 'pairs': count, 'ms': round(elapsed_ms, 1)})
+        floor = reranked[-1][1] if reranked else 1.0
+        rest = [(resource, min(score, floor)) for resource, score in candidates[count:]]
+        return (reranked + rest)[:top_k], report
+
+    def _skip(self, reason: str):
+        with self._lock:
+            self._skipped[reason] += 1
+
+    def _record(self, pairs: int, elapsed_ms: float):
+        with self._lock:
+            self._calls += 1
+            self._pairs += pairs
+            self._time_ms += elapsed_ms
+            # Attribute the error between prediction and reality mostly to the per-pair cost
+            error = elapsed_ms - self.predict_ms(pairs)
+            self._pair_ms = max(0.01, self._pair_ms + 0.2 * error * 0.8 / max(pairs, 1))
+            self._overhead_ms = max(0.0, self._overhead_ms + 0.2 * error * 0.2)
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counts, skip reasons and the current cost model."""
+        with self._lock:
+            return {
+                'model': self.model_name,
+                'budget_ms': self.budget_ms,
+                'max_concurrent': self.max_concurrent,
+                'calls': self._calls,
+                'pairs': self._pairs,
+                'avg_ms': self._time_ms / self._calls if self._calls else 0.0,
+                'predicted_overhead_ms': self._overhead_ms,
+                'predicted_pair_ms': self._pair_ms,
+                'skipped': dict(self._skipped),
+            }
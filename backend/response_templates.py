@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Localized text for NextStepAssistant.generate_response_local."""
+
+from typing import Dict, Any
+
+TEMPLATES: Dict[str, Dict[str, Any]] = {
+    'en': {
+        'no_results': """I hear you asking about "{query}" and I want you to know that you're not alone in this. It takes courage to reach out for help, and I'm proud of you for taking this step.
+
+While I don't have specific resources that match exactly what you're looking for right now, there are still wonderful people ready to help you:
+
+**🤝 Immediate Support:**
+- **Call 211** - Just dial 2-1-1 and speak with a caring counselor who can connect you with resources in your area
+- **Harris Health System** - Call (713) 634-1110 for healthcare services with sliding scale fees
+- **United Way** - Visit 211texas.org for a comprehensive database of local resources
+
+Sometimes finding the right help takes a few tries, and that's completely normal. Don't give up - the right support is out there for you.
+
+Is there a more specific type of service you're looking for? I'd love to help you narrow down the search so we can find exactly what you need. You deserve support, and we're going to find it together. 💙""",
+        # (keywords, response) - first keyword found in the query wins
+        'empathy': [
+            (['mental health'], "I can see you're reaching out for mental health support, and that takes real strength. Mental health is just as important as physical health, and seeking help shows wisdom and self-care."),
+            (['food'], "I understand that food security is a basic need, and it's completely understandable to seek help when things are tight. There's no shame in needing assistance - we all need support sometimes."),
+            (['housing'], "Housing challenges can feel overwhelming, but you're taking the right step by looking for help. Safe, stable housing is a fundamental need, and there are people ready to support you."),
+            (['dental'], "Dental pain and oral health concerns can really impact your quality of life. I'm glad you're seeking care - your health matters, and you deserve to feel comfortable and pain-free."),
+            (['substance'], "Reaching out for help with substance use shows incredible courage and strength. Recovery is a journey, and there are compassionate professionals ready to walk alongside you."),
+            (['healthcare'], "Healthcare can feel complicated and expensive, but everyone deserves access to quality care. Let me help you find some options that might work for your situation."),
+        ],
+        'empathy_default': "I'm so glad you reached out for help today. That takes courage, and you should be proud of yourself for taking this important step.",
+        'intro': "**Here are some excellent resources I found for you:**",
+        'match': "match",
+        'location': "Location",
+        'phone': "Phone",
+        'bring': "What to bring",
+        'cost': "Cost",
+        'hours': "Hours",
+        'services': "Services",
+        'more_services': " and {count} more services",
+        'recommendations_title': "**💡 My recommendations:**",
+        'recommendations': [
+            "I'd suggest calling ahead to confirm they're accepting new clients and to ask about any requirements",
+            "Don't hesitate to mention if you have insurance, Medicaid, or need sliding scale fees",
+            "If the first place doesn't work out, try the next one - persistence often pays off",
+        ],
+        'closing': "You're taking all the right steps to get the help you need. Remember, asking for help is a sign of strength, not weakness. I'm here if you need to search for anything else - we're in this together! 🤗",
+    },
+    'es': {
+        'no_results': """Entiendo que está buscando ayuda con "{query}" y quiero que sepa que no está solo/a. Pedir ayuda requiere valor, y me alegra que haya dado este paso.
+
+Aunque ahora mismo no tengo recursos que coincidan exactamente con lo que busca, hay personas listas para ayudarle:
+
+**🤝 Apoyo inmediato:**
+- **Llame al 211** - Marque 2-1-1 y hable con un consejero que puede conectarle con recursos en su área (hay atención en español)
+- **Harris Health System** - Llame al (713) 634-1110 para servicios de salud con tarifas según sus ingresos
+- **United Way** - Visite 211texas.org para ver una lista completa de recursos locales
+
+A veces encontrar la ayuda adecuada toma varios intentos, y eso es completamente normal. No se rinda - el apoyo que necesita existe.
+
+¿Hay algún tipo de servicio más específico que esté buscando? Con gusto le ayudo a afinar la búsqueda. Usted merece apoyo, y lo vamos a encontrar juntos. 💙""",
+        'empathy': [
+            (['salud mental', 'mental', 'ansiedad', 'depresión', 'depresion'], "Veo que busca apoyo para su salud mental, y eso demuestra mucha fortaleza. La salud mental es tan importante como la salud física, y buscar ayuda es una forma de cuidarse."),
+            (['comida', 'alimento', 'despensa'], "Entiendo que la alimentación es una necesidad básica, y es completamente comprensible buscar ayuda cuando las cosas están difíciles. No hay ninguna vergüenza en necesitar apoyo."),
+            (['vivienda', 'refugio', 'albergue', 'casa'], "Los problemas de vivienda pueden ser abrumadores, pero está dando el paso correcto al buscar ayuda. Un lugar seguro y estable es una necesidad fundamental, y hay personas listas para apoyarle."),
+            (['dental', 'dentista', 'diente', 'muela'], "El dolor dental puede afectar mucho su calidad de vida. Me alegra que esté buscando atención - su salud importa y usted merece sentirse bien."),
+            (['droga', 'alcohol', 'adicción', 'adiccion', 'sustancia'], "Pedir ayuda con el consumo de sustancias demuestra un valor enorme. La recuperación es un camino, y hay profesionales compasivos listos para acompañarle."),
+            (['médico', 'medico', 'clínica', 'clinica', 'salud'], "La atención médica puede parecer complicada y costosa, pero todos merecemos acceso a buena atención. Permítame ayudarle a encontrar opciones para su situación."),
+        ],
+        'empathy_default': "Me alegra mucho que haya buscado ayuda hoy. Eso requiere valor, y debe sentirse orgulloso/a de dar este paso tan importante.",
+        'intro': "**Estos son algunos recursos excelentes que encontré para usted:**",
+        'match': "de coincidencia",
+        'location': "Dirección",
+        'phone': "Teléfono",
+        'bring': "Qué debe llevar",
+        'cost': "Costo",
+        'hours': "Horario",
+        'services': "Servicios",
+        'more_services': " y {count} servicios más",
+        'recommendations_title': "**💡 Mis recomendaciones:**",
+        'recommendations': [
+            "Le sugiero llamar antes para confirmar que aceptan nuevos clientes y preguntar por los requisitos (pregunte si atienden en español)",
+            "No dude en mencionar si tiene seguro, Medicaid o si necesita tarifas según sus ingresos",
+            "Si el primer lugar no funciona, intente con el siguiente - la perseverancia vale la pena",
+        ],
+        'closing': "Está haciendo todo lo correcto para conseguir la ayuda que necesita. Recuerde que pedir ayuda es una señal de fortaleza, no de debilidad. Aquí estoy si necesita buscar algo más - ¡estamos juntos en esto! 🤗",
+    },
+    'vi': {
+        'no_results': """Tôi hiểu bạn đang cần giúp đỡ về "{query}" và tôi muốn bạn biết rằng bạn không đơn độc. Tìm kiếm sự giúp đỡ cần có can đảm, và tôi rất vui vì bạn đã bước bước này.
+
+Hiện tại tôi chưa tìm thấy dịch vụ phù hợp chính xác với nhu cầu của bạn, nhưng vẫn có những người sẵn sàng giúp bạn:
+
+**🤝 Hỗ trợ ngay:**
+- **Gọi 211** - Bấm số 2-1-1 để nói chuyện với nhân viên tư vấn, họ có thể kết nối bạn với các dịch vụ trong khu vực (có thông dịch viên)
+- **Harris Health System** - Gọi (713) 634-1110 để được chăm sóc sức khỏe với chi phí theo thu nhập
+- **United Way** - Truy cập 211texas.org để xem danh sách đầy đủ các dịch vụ địa phương
+
+Đôi khi cần thử vài lần mới tìm được sự giúp đỡ phù hợp, và điều đó hoàn toàn bình thường. Đừng bỏ cuộc nhé.
+
+Bạn có đang tìm một loại dịch vụ cụ thể hơn không? Tôi rất muốn giúp bạn thu hẹp tìm kiếm. Bạn xứng đáng được hỗ trợ, và chúng ta sẽ cùng nhau tìm ra. 💙""",
+        'empathy': [
+            (['sức khỏe tâm thần', 'tâm lý', 'trầm cảm', 'lo âu'], "Tôi thấy bạn đang tìm hỗ trợ về sức khỏe tâm thần, và điều đó cho thấy bạn rất mạnh mẽ. Sức khỏe tâm thần cũng quan trọng như sức khỏe thể chất."),
+            (['thức ăn', 'thực phẩm', 'đồ ăn', 'lương thực'], "Tôi hiểu rằng cái ăn là nhu cầu cơ bản, và việc tìm sự giúp đỡ khi khó khăn là hoàn toàn dễ hiểu. Không có gì phải ngại khi cần hỗ trợ."),
+            (['nhà ở', 'chỗ ở', 'nơi trú ẩn', 'vô gia cư'], "Khó khăn về chỗ ở có thể khiến bạn choáng ngợp, nhưng bạn đang đi đúng hướng khi tìm sự giúp đỡ. Có những người sẵn sàng hỗ trợ bạn."),
+            (['nha khoa', 'răng', 'nha sĩ'], "Đau răng có thể ảnh hưởng nhiều đến cuộc sống. Tôi rất vui vì bạn đang tìm cách chăm sóc - sức khỏe của bạn rất quan trọng."),
+            (['ma túy', 'rượu', 'nghiện', 'cai nghiện'], "Tìm sự giúp đỡ về việc sử dụng chất gây nghiện cần rất nhiều can đảm. Hồi phục là một hành trình, và có những chuyên gia tận tâm sẵn sàng đồng hành cùng bạn."),
+            (['bác sĩ', 'phòng khám', 'y tế', 'sức khỏe'], "Việc khám chữa bệnh có thể phức tạp và tốn kém, nhưng ai cũng xứng đáng được chăm sóc tốt. Hãy để tôi giúp bạn tìm các lựa chọn phù hợp."),
+        ],
+        'empathy_default': "Tôi rất vui vì hôm nay bạn đã tìm đến sự giúp đỡ. Điều đó cần can đảm, và bạn nên tự hào vì đã bước bước quan trọng này.",
+        'intro': "**Đây là một số dịch vụ tốt mà tôi tìm được cho bạn:**",
+        'match': "phù hợp",
+        'location': "Địa chỉ",
+        'phone': "Điện thoại",
+        'bring': "Cần mang theo",
+        'cost': "Chi phí",
+        'hours': "Giờ mở cửa",
+        'services': "Dịch vụ",
+        'more_services': " và {count} dịch vụ khác",
+        'recommendations_title': "**💡 Lời khuyên của tôi:**",
+        'recommendations': [
+            "Bạn nên gọi trước để xác nhận họ đang nhận khách mới và hỏi về các yêu cầu (hỏi xem có thông dịch tiếng Việt không)",
+            "Đừng ngại cho họ biết nếu bạn có bảo hiểm, Medicaid, hoặc cần chi phí theo thu nhập",
+            "Nếu nơi đầu tiên không phù hợp, hãy thử nơi tiếp theo - kiên trì sẽ có kết quả",
+        ],
+        'closing': "Bạn đang làm đúng tất cả các bước để có được sự giúp đỡ cần thiết. Hãy nhớ rằng nhờ giúp đỡ là dấu hiệu của sức mạnh, không phải yếu đuối. Tôi luôn ở đây nếu bạn cần tìm thêm - chúng ta cùng nhau vượt qua! 🤗",
+    },
+}
+
+
+def get_templates(language: str) -> Dict[str, Any]:
+    """Templates for a language, falling back to English."""
+    return TEMPLATES.get(language, TEMPLATES['en'])
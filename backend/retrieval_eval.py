@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Offline retrieval evaluation for embedding models.
+
+Embeds resources.csv in memory with each model (no database needed),
+runs a labeled query set and reports recall@k and latency side by side:
+
+    python retrieval_eval.py --models mpnet minilm --k 1 3 5
+
+With --rerank the top --rerank-n results are also re-ranked by the
+cross-encoder, reporting the recall gain per millisecond it costs.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+# Labeled queries: (query, expected category). Every resource in the
+# expected category counts as relevant.
+LABELED_QUERIES: List[Tuple[str, str]] = [
+    ("Where can I get free food?", "food"),
+    ("food pantry near me", "food"),
+    ("I need groceries for my family this week", "food"),
+    ("¿Dónde puedo conseguir comida gratis?", "food"),
+    ("I need mental health counseling", "mental_health"),
+    ("therapy for depression and anxiety", "mental_health"),
+    ("counseling for veterans with PTSD", "mental_health"),
+    ("I need help with substance abuse treatment", "substance_abuse"),
+    ("alcohol rehab program", "substance_abuse"),
+    ("tratamiento para drogas y alcohol", "substance_abuse"),
+    ("Emergency shelter for tonight", "housing"),
+    ("I am homeless and need a place to sleep", "housing"),
+    ("Free dental clinic", "dental"),
+    ("Dental clinic that accepts Medicaid", "dental"),
+    ("my tooth hurts and I need a dentist", "dental"),
+    ("eye exam and glasses", "vision"),
+    ("free vision screening", "vision"),
+    ("I need to see a doctor but have no insurance", "healthcare"),
+    ("free medical clinic", "healthcare"),
+    ("ride to my medical appointment", "transportation"),
+    ("reduced bus fare for seniors", "transportation"),
+    ("English classes for adults", "education"),
+    ("lớp học tiếng Anh miễn phí", "education"),
+    ("GED and adult education", "education"),
+    ("free cell phone for low income", "telecommunications"),
+    ("Lifeline phone service", "telecommunications"),
+    ("escaping domestic violence", "interpersonal_violence"),
+    ("my partner hurts me and I need help", "interpersonal_violence"),
+]
+
+
+def recall_at_k(ranked_relevance: List[bool], total_relevant: int, k: int) -> float:
+    """Fraction of the achievable relevant results found in the top k."""
+    if total_relevant == 0:
+        return 0.0
+    return sum(ranked_relevance[:k]) / min(k, total_relevant)
+
+
+def rank_resources(query_vector: np.ndarray, chunk_matrix: np.ndarray,
+                   chunk_owner: np.ndarray, num_resources: int) -> np.ndarray:
+    """Rank resources by their best chunk cosine, like search_resources does."""
+    norms = np.linalg.norm(chunk_matrix, axis=1) * np.linalg.norm(query_vector)
+    scores = chunk_matrix @ query_vector / np.where(norms == 0, 1, norms)
+    best = np.full(num_resources, -np.inf)
+    np.maximum.at(best, chunk_owner, scores)
+    return np.argsort(-best, kind='stable')
+
+
+def reciprocal_rank(ranked_relevance: List[bool]) -> float:
+    return next((1.0 / (i + 1) for i, relevant in enumerate(ranked_relevance) if relevant), 0.0)
+
+
+def evaluate_model(model: str, resources: List[Dict[str, Any]],
+                   queries: List[Tuple[str, str]], ks: List[int],
+                   reranker=None, rerank_n: int = 20) -> Dict[str, Any]:
+    """Embed resources with one model and score the labeled queries."""
+    from embedding_pipeline import EmbeddingPipeline
+
+    pipeline = EmbeddingPipeline(model)
+
+    start = time.perf_counter()
+    records = pipeline.process_resources_batch(resources)
+    ingest_seconds = time.perf_counter() - start
+
+    chunk_matrix = np.array([r['embedding'] for recs in records for r in recs], dtype=np.float32)
+    chunk_owner = np.array([i for i, recs in enumerate(records) for _ in recs])
+    categories = [r['category'] for r in resources]
+
+    pipeline.generate_embeddings(queries[0][0])  # warm up
+    recalls = {k: [] for k in ks}
+    reranked_recalls = {k: [] for k in ks}
+    latencies = []
+    rerank_latencies = []
+    mrr, reranked_mrr = [], []
+    for query, expected in queries:
+        start = time.perf_counter()
+        ranking = rank_resources(pipeline.generate_embeddings(query), chunk_matrix,
+                                 chunk_owner, len(resources))
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+        relevance = [categories[i] == expected for i in ranking]
+        total = categories.count(expected)
+        for k in ks:
+            recalls[k].append(recall_at_k(relevance, total, k))
+        mrr.append(reciprocal_rank(relevance))
+
+        if reranker is not None:
+            head = list(ranking[:rerank_n])
+            start = time.perf_counter()
+            scores = reranker.score(query, [resources[i] for i in head])
+            rerank_latencies.append((time.perf_counter() - start) * 1000.0)
+            reordered = [head[j] for j in np.argsort(-np.array(scores), kind='stable')] + list(ranking[rerank_n:])
+            relevance = [categories[i] == expected for i in reordered]
+            for k in ks:
+                reranked_recalls[k].append(recall_at_k(relevance, total, k))
+            reranked_mrr.append(reciprocal_rank(relevance))
+
+    result = {
+        'model': pipeline.model_name,
+        'dimension': pipeline.dimension,
+        'chunks': len(chunk_matrix),
+        'ingest_seconds': ingest_seconds,
+        'query_p50_ms': float(np.percentile(latencies, 50)),
+        'query_p95_ms': float(np.percentile(latencies, 95)),
+        'recall': {f"@{k}": float(np.mean(v)) for k, v in recalls.items()},
+        'mrr': float(np.mean(mrr))
+    }
+    if reranker is not None:
+        extra_ms = float(np.mean(rerank_latencies))
+        reranked = {f"@{k}": float(np.mean(v)) for k, v in reranked_recalls.items()}
+        result['rerank'] = {
+            'model': reranker.model_name,
+            'candidates': rerank_n,
+            'extra_p50_ms': float(np.percentile(rerank_latencies, 50)),
+            'extra_p95_ms': float(np.percentile(rerank_latencies, 95)),
+            'recall': reranked,
+            'mrr': float(np.mean(reranked_mrr)),
+            # Quality bought per millisecond of added latency
+            'recall_gain_per_ms': {key: (reranked[key] - result['recall'][key]) / extra_ms
+                                   for key in reranked} if extra_ms > 0 else {},
+            'mrr_gain_per_ms': (float(np.mean(reranked_mrr)) - result['mrr']) / extra_ms if extra_ms > 0 else 0.0,
+        }
+    return result
+
+
+def main():
+    from load_csv_resources import ResourceCSVLoader
+
+    default_csv = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources.csv")
+    parser = argparse.ArgumentParser(description="Compare embedding models on a labeled query set")
+    parser.add_argument("--models", nargs="+", default=["mpnet", "minilm"])
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 3, 5])
+    parser.add_argument("--csv", default=default_csv)
+    parser.add_argument("--json", help="Also write results to this file")
+    parser.add_argument("--rerank", action="store_true", help="Also evaluate cross-encoder re-ranking")
+    parser.add_argument("--rerank-model", help="Cross-encoder model (default NEXTSTEP_RERANK_MODEL)")
+    parser.add_argument("--rerank-n", type=int, default=20, help="First-pass candidates to re-rank")
+    args = parser.parse_args()
+    
+    reranker = None
+    if args.rerank:
+        from reranker import CrossEncoderReranker
+        reranker = CrossEncoderReranker(args.rerank_model)
+
+    resources = ResourceCSVLoader(connect=False).read_resources(args.csv)
+    print(f"📚 {len(resources)} resources, {len(LABELED_QUERIES)} labeled queries")
+
+    results = []
+    for model in args.models:
+        print(f"\n🧪 Evaluating {model}...")
+        results.append(evaluate_model(model, resources, LABELED_QUERIES, args.k,
+                                      reranker=reranker, rerank_n=args.rerank_n))
+
+    print("\n" + "=" * 80)
+    header = f"{'model':45s} {'dim':>4s} " + " ".join(f"{'R@' + str(k):>6s}" for k in args.k)
+    print(header + f" {'MRR':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'ingest s':>9s}")
+    for r in results:
+        recall = " ".join(f"{r['recall'][f'@{k}']:6.3f}" for k in args.k)
+        print(f"{r['model'][:45]:45s} {r['dimension']:4d} {recall} {r['mrr']:6.3f} "
+              f"{r['query_p50_ms']:8.2f} {r['query_p95_ms']:8.2f} {r['ingest_seconds']:9.2f}")
+        if 'rerank' in r:
+            rr = r['rerank']
+            recall = " ".join(f"{rr['recall'][f'@{k}']:6.3f}" for k in args.k)
+            print(f"{'  + rerank top ' + str(rr['candidates']):45s} {'':4s} {recall} {rr['mrr']:6.3f} "
+                  f"{'+' + format(rr['extra_p50_ms'], '.2f'):>8s} {'+' + format(rr['extra_p95_ms'], '.2f'):>8s}")
+            gains = ", ".join(f"R{key} {gain:+.4f}" for key, gain in rr['recall_gain_per_ms'].items())
+            print(f"    gain per ms of re-ranking: {gains}, MRR {rr['mrr_gain_per_ms']:+.4f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Search benchmark over synthetic catalogs built from resources.csv.
+
+Each scale replicates the real resources (new ids, suffixed names,
+jittered coordinates) and perturbs their chunk vectors with seeded noise,
+so results are reproducible run to run. Reports index build time,
+p50/p95/p99 latency, QPS, memory and recall@k against brute force:
+
+    python search_benchmark.py --scales 1000 10000 100000
+    python search_benchmark.py --random-vectors --dim 384      # no model needed
+    python search_benchmark.py --scales 1000 --end-to-end       # + search_resources
+
+--random-vectors replaces model embeddings with random base vectors, so
+the benchmark runs with no model, database or network. --end-to-end also
+times NextStepAssistant.search_resources and
+ImprovedSearch.search_resources_semantic against an in-memory
+LocalDatabase (query embedding included).
+"""
+
+import argparse
+import json
+import os
+import resource as rusage
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+
+from chunking import configured_chunk_types, configured_chunk_weights, build_chunks
+from retrieval_eval import LABELED_QUERIES
+from local_db import LocalDatabase
+from search_index import SearchIndex
+
+
+def percentile_ms(latencies: List[float]) -> Dict[str, float]:
+    return {f"p{p}_ms": float(np.percentile(latencies, p)) for p in (50, 95, 99)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return rusage.getrusage(rusage.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class BaseCatalog:
+    """Real resources with one vector per chunk, the seed for every scale."""
+
+    def __init__(self, resources: List[Dict[str, Any]], records: List[List[Dict[str, Any]]],
+                 version: str):
+        self.resources = resources
+        self.records = records
+        self.version = version
+        self.counts = np.array([len(r) for r in records], dtype=np.int64)
+        self.matrix = np.array([rec['embedding'] for recs in records for rec in recs], dtype=np.float32)
+        self.matrix /= np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.content_types = np.array([rec['content_type'] for recs in records for rec in recs])
+        self.languages = np.array([rec['language'] for recs in records for rec in recs])
+
+    @classmethod
+    def from_model(cls, resources: List[Dict[str, Any]], pipeline) -> "BaseCatalog":
+        return cls(resources, pipeline.process_resources_batch(resources), pipeline.version)
+
+    @classmethod
+    def from_random(cls, resources: List[Dict[str, Any]], dim: int, seed: int) -> "BaseCatalog":
+        """Random unit vectors, with resources in one category sharing a direction."""
+        rng = np.random.default_rng(seed)
+        chunk_types = configured_chunk_types()
+        centers = {c: rng.normal(size=dim) for c in sorted({r['category'] for r in resources})}
+        records = []
+        for resource in resources:
+            records.append([{
+                'content_type': chunk['content_type'],
+                'language': 'en',
+                'embedding': (centers[resource['category']] + rng.normal(size=dim)).tolist(),
+            } for chunk in build_chunks(resource, chunk_types)])
+        return cls(resources, records, f"random@{dim}")
+
+
+def synthesize(base: BaseCatalog, size: int, noise: float,
+               seed: int) -> Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray, np.ndarray]:
+    """Build `size` synthetic resources.
+
+    Returns (resources, chunk matrix, chunk offsets, base row of each chunk).
+    """
+    rng = np.random.default_rng(seed)
+    owners = np.arange(size) % len(base.resources)
+
+    resources = []
+    for i, b in enumerate(owners):
+        source = base.resources[b]
+        coords = dict(source.get('coordinates') or {})
+        if coords:
+            coords = {'latitude': coords['latitude'] + rng.normal() * 0.05,
+                      'longitude': coords['longitude'] + rng.normal() * 0.05}
+        resources.append({**source, '_id': f"syn-{i}", 'name': f"{source['name']} #{i}",
+                          'coordinates': coords, 'status': 'active'})
+
+    counts = base.counts[owners]
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    # Row of the base matrix for every synthetic chunk
+    rows = np.repeat(base.offsets[owners] - offsets, counts) + np.arange(counts.sum())
+
+    dim = base.matrix.shape[1]
+    matrix = np.empty((len(rows), dim), dtype=np.float32)
+    for start in range(0, len(rows), 65536):
+        block = base.matrix[rows[start:start + 65536]]
+        block = block + rng.normal(scale=noise / np.sqrt(dim), size=block.shape).astype(np.float32)
+        matrix[start:start + 65536] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return resources, matrix, offsets, rows
+
+
+def brute_force_top_k(matrix: np.ndarray, offsets: np.ndarray, num_resources: int,
+                      weights: Optional[np.ndarray], query: np.ndarray, k: int) -> np.ndarray:
+    """Exact top-k resources by weighted max chunk cosine, without the index code."""
+    query = query / np.linalg.norm(query)
+    scores = matrix @ query
+    if weights is not None:
+        scores = scores * weights
+    owner = np.repeat(np.arange(num_resources), np.diff(np.append(offsets, len(matrix))))
+    best = np.full(num_resources, -np.inf, dtype=np.float32)
+    np.maximum.at(best, owner, scores)
+    return np.argsort(-best, kind='stable')[:k]
+
+
+def time_queries(search, queries: np.ndarray, threads: int) -> Dict[str, Any]:
+    """Latency percentiles sequentially and QPS with `threads` workers."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(search, queries))
+    else:
+        for query in queries:
+            search(query)
+    elapsed = time.perf_counter() - start
+    return {**percentile_ms(latencies), 'qps': len(queries) / elapsed if elapsed else 0.0, 'threads': threads}
+
+
+def bench_scale(base: BaseCatalog, size: int, query_vectors: np.ndarray, args,
+                pipeline=None) -> Dict[str, Any]:
+    resources, matrix, offsets, rows = synthesize(base, size, args.noise, args.seed + size)
+    weights = configured_chunk_weights()
+
+    start = time.perf_counter()
+    index = SearchIndex(
+        version=base.version,
+        matrix=matrix,
+        chunk_offsets=offsets,
+        resources=resources,
+        chunk_content_types=base.content_types[rows],
+        chunk_languages=base.languages[rows],
+        chunk_weights=weights
+    )
+    build_seconds = time.perf_counter() - start
+
+    k = args.k
+    recalls = []
+    for query in query_vectors:
+        found = {r['_id'] for r, _ in index.search(query, k)}
+        exact = brute_force_top_k(matrix, offsets, len(resources), index.chunk_weight_values, query, k)
+        recalls.append(len(found & {resources[i]['_id'] for i in exact}) / k)
+
+    result = {
+        'resources': size,
+        'chunks': len(matrix),
+        'dimension': matrix.shape[1],
+        'index_build_seconds': build_seconds,
+        'index_mb': (matrix.nbytes + offsets.nbytes) / 1e6,
+        f'recall@{k}_vs_brute_force': float(np.mean(recalls)),
+        'index_search': time_queries(lambda q: index.search(q, k), query_vectors, args.threads),
+    }
+
+    if args.end_to_end and pipeline is not None:
+        result.update(bench_end_to_end(base, resources, matrix, offsets, rows, pipeline, args))
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def bench_end_to_end(base: BaseCatalog, resources: List[Dict[str, Any]], matrix: np.ndarray,
+                     offsets: np.ndarray, rows: np.ndarray, pipeline, args) -> Dict[str, Any]:
+    """Time the full search paths, which rebuild the index from the database per query."""
+    from nextstep_assistant import NextStepAssistant
+    from improved_search import ImprovedSearch
+
+    templates = [rec for recs in base.records for rec in recs]
+    db = LocalDatabase(':memory:')
+    ids = [db.insert_resource(resource) for resource in resources]
+    owner = np.repeat(np.arange(len(resources)), np.diff(np.append(offsets, len(matrix))))
+    db.insert_embeddings([{**templates[base_row], 'resource_id': ids[o], 'embedding': vector}
+                          for base_row, o, vector in zip(rows, owner, matrix)])
+
+    queries = [q for q, _ in LABELED_QUERIES][:args.queries]
+    assistant = NextStepAssistant(use_openai=False, db=db, pipeline=pipeline)
+    improved = ImprovedSearch(db=db, pipeline=pipeline)
+    try:
+        return {
+            'search_resources': time_queries(lambda q: assistant.search_resources(q, top_k=args.k),
+                                             queries, args.threads),
+            'search_resources_semantic': time_queries(lambda q: improved.search_resources_semantic(q, top_k=args.k),
+                                                      queries, args.threads),
+        }
+    finally:
+        assistant.close()
+
+
+def main():
+    from load_csv_resources import ResourceCSVLoader
+
+    default_csv = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources.csv")
+    parser = argparse.ArgumentParser(description="Benchmark search latency, throughput and recall")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--csv", default=default_csv)
+    parser.add_argument("--model", help="Embedding model (default NEXTSTEP_EMBEDDING_MODEL)")
+    parser.add_argument("--random-vectors", action="store_true", help="Skip the model; use seeded random vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension with --random-vectors")
+    parser.add_argument("--noise", type=float, default=0.3, help="Perturbation of synthetic chunk vectors")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=len(LABELED_QUERIES))
+    parser.add_argument("--threads", type=int, default=4, help="Workers for the QPS measurement")
+    parser.add_argument("--end-to-end", action="store_true", help="Also time search_resources on a local database")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    base_resources = ResourceCSVLoader(connect=False).read_resources(args.csv)
+    queries = LABELED_QUERIES[:args.queries]
+    pipeline = None
+
+    if args.random_vectors:
+        if args.end_to_end:
+            print("⚠️  --end-to-end needs a model; ignored with --random-vectors")
+        base = BaseCatalog.from_random(base_resources, args.dim, args.seed)
+        rng = np.random.default_rng(args.seed)
+        # Query near the centroid of its expected category
+        query_vectors = []
+        for _, category in queries:
+            members = [i for i, r in enumerate(base_resources) if r['category'] == category]
+            rows = base.matrix[[base.offsets[i] for i in members]] if members else base.matrix[:1]
+            query_vectors.append(rows.mean(axis=0) + rng.normal(scale=0.5 / np.sqrt(args.dim), size=args.dim))
+        query_vectors = np.array(query_vectors, dtype=np.float32)
+    else:
+        from embedding_pipeline import EmbeddingPipeline
+        pipeline = EmbeddingPipeline(args.model)
+        print(f"🧠 Embedding {len(base_resources)} base resources with {pipeline.model_name}...")
+        base = BaseCatalog.from_model(base_resources, pipeline)
+        query_vectors = pipeline.generate_embeddings_batch([q for q, _ in queries])
+
+    print(f"📚 {len(base_resources)} base resources, {len(base.matrix)} chunks, "
+          f"{len(query_vectors)} queries, version {base.version}")
+
+    results = []
+    for size in args.scales:
+        print(f"\n⏱️  Benchmarking {size:,} resources...")
+        result = bench_scale(base, size, query_vectors, args, pipeline)
+        results.append(result)
+        s = result['index_search']
+        print(f"   index build {result['index_build_seconds']:.2f}s, {result['index_mb']:.0f} MB, "
+              f"recall@{args.k} {result[f'recall@{args.k}_vs_brute_force']:.3f}")
+        print(f"   index.search   p50 {s['p50_ms']:.2f} ms  p95 {s['p95_ms']:.2f} ms  "
+              f"p99 {s['p99_ms']:.2f} ms  {s['qps']:.0f} QPS ({s['threads']} threads)")
+        for name in ('search_resources', 'search_resources_semantic'):
+            if name in result:
+                s = result[name]
+                print(f"   {name:14s} p50 {s['p50_ms']:.2f} ms  p95 {s['p95_ms']:.2f} ms  "
+                      f"p99 {s['p99_ms']:.2f} ms  {s['qps']:.1f} QPS")
+        print(f"   peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'version': base.version, 'results': results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
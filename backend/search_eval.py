@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Quality and latency evaluation of the full search stack, with regression gates.
+
+Runs the labeled queries in eval_queries.json through
+NextStepAssistant.search_resources, with whatever query filters,
+re-ranking, MMR, chunking and model settings the environment selects,
+and reports recall@k, MRR and nDCG@k with latency percentiles:
+
+    python search_eval.py --json before.json
+    NEXTSTEP_ONNX_QUANTIZED=1 python search_eval.py --baseline before.json
+
+A labeled query has an expected category and optionally expected
+resource names. Graded relevance: 2 for a named resource, 1 for any
+other resource in the category. Without --use-db, resources.csv is
+embedded into an in-memory LocalDatabase so runs need no network and
+are comparable. With --baseline the exit code is 1 when a quality
+metric drops by more than --max-drop or p95 latency grows by more than
+--max-latency-increase.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Any
+
+import numpy as np
+
+from retrieval_eval import recall_at_k, reciprocal_rank
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_queries.json")
+
+# Settings that change retrieval, recorded with every run
+CONFIG_ENV = ['NEXTSTEP_EMBEDDING_MODEL', 'NEXTSTEP_EMBEDDING_BACKEND', 'NEXTSTEP_ONNX_QUANTIZED',
+              'NEXTSTEP_MAX_SEQ_LENGTH', 'NEXTSTEP_CHUNK_TYPES', 'NEXTSTEP_CHUNK_WEIGHTS',
+              'NEXTSTEP_TRANSLATION_LANGUAGES', 'NEXTSTEP_LANGUAGE_BOOST', 'NEXTSTEP_QUERY_FILTERS',
+              'NEXTSTEP_RERANK', 'NEXTSTEP_RERANK_MODEL', 'NEXTSTEP_MMR_LAMBDA', 'NEXTSTEP_DB_BACKEND']
+
+
+def load_labeled_queries(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def relevance(result: Any, labeled: Dict[str, Any]) -> int:
+    if result.name in labeled.get('names', []):
+        return 2
+    return 1 if result.category == labeled['category'] else 0
+
+
+def ndcg_at_k(gains: List[int], ideal_gains: List[int], k: int) -> float:
+    dcg = sum(g / math.log2(i + 2) for i, g in enumerate(gains[:k]))
+    ideal = sum(g / math.log2(i + 2) for i, g in enumerate(sorted(ideal_gains, reverse=True)[:k]))
+    return dcg / ideal if ideal else 0.0
+
+
+def evaluate(assistant, queries: List[Dict[str, Any]], ks: List[int]) -> Dict[str, Any]:
+    """Run every labeled query and aggregate quality and latency metrics."""
+    resources = [SimpleNamespace(name=r.get('name'), category=r.get('category'))
+                 for r in assistant.db.get_all_resources() if r.get('status') == 'active']
+    category_sizes: Dict[str, int] = {}
+    for r in resources:
+        category_sizes[r.category] = category_sizes.get(r.category, 0) + 1
+
+    top_k = max(ks)
+    assistant.search_resources(queries[0]['query'], top_k=top_k)  # warm up
+
+    per_query = []
+    for labeled in queries:
+        start = time.perf_counter()
+        results = assistant.search_resources(labeled['query'], top_k=top_k)
+        latency_ms = (time.perf_counter() - start) * 1000.0
+
+        gains = [relevance(r, labeled) for r in results]
+        names = labeled.get('names', [])
+        category_total = category_sizes.get(labeled['category'], 0)
+        # Gains of the resources that actually exist, so a named resource outside
+        # the labeled category doesn't take a category resource's place
+        ideal = [g for g in (relevance(r, labeled) for r in resources) if g > 0]
+        entry = {
+            'query': labeled['query'],
+            'latency_ms': latency_ms,
+            'results': [r.name for r in results],
+            'mrr': reciprocal_rank([g > 0 for g in gains]),
+        }
+        for k in ks:
+            if names:
+                entry[f'recall@{k}'] = len(set(names) & {r.name for r in results[:k]}) / min(k, len(names))
+            else:
+                entry[f'recall@{k}'] = recall_at_k([g > 0 for g in gains], category_total, k)
+            entry[f'ndcg@{k}'] = ndcg_at_k(gains, ideal, k)
+        per_query.append(entry)
+
+    latencies = [q['latency_ms'] for q in per_query]
+    metrics = {'mrr': float(np.mean([q['mrr'] for q in per_query]))}
+    for k in ks:
+        metrics[f'recall@{k}'] = float(np.mean([q[f'recall@{k}'] for q in per_query]))
+        metrics[f'ndcg@{k}'] = float(np.mean([q[f'ndcg@{k}'] for q in per_query]))
+    for p in (50, 95, 99):
+        metrics[f'p{p}_ms'] = float(np.percentile(latencies, p))
+    return {'metrics': metrics, 'queries': per_query}
+
+
+def regression_failures(current: Dict[str, float], baseline: Dict[str, float],
+                        max_drop: float, max_latency_increase: float) -> List[str]:
+    """Metrics that regressed beyond the allowed tolerance."""
+    failures = []
+    for name, value in baseline.items():
+        if name not in current:
+            continue
+        if name.endswith('_ms'):
+            if name == 'p95_ms' and value > 0 and current[name] > value * (1 + max_latency_increase):
+                failures.append(f"{name} {value:.2f} -> {current[name]:.2f} (+{current[name] / value - 1:.0%})")
+        elif current[name] < value - max_drop:
+            failures.append(f"{name} {value:.3f} -> {current[name]:.3f} ({current[name] - value:+.3f})")
+    return failures
+
+
+def build_local_db(csv_path: str, pipeline):
+    """Embed resources.csv into an in-memory LocalDatabase."""
+    from load_csv_resources import ResourceCSVLoader
+    from local_db import LocalDatabase
+
+    resources = ResourceCSVLoader(connect=False).read_resources(csv_path)
+    db = LocalDatabase(':memory:')
+    for resource, records in zip(resources, pipeline.process_resources_batch(resources)):
+        resource_id = db.insert_resource(resource)
+        for record in records:
+            record['resource_id'] = resource_id
+        db.insert_embeddings(records)
+    return db
+
+
+def main():
+    from db_interface import create_database
+    from embedding_pipeline import EmbeddingPipeline
+    from nextstep_assistant import NextStepAssistant
+
+    default_csv = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources.csv")
+    parser = argparse.ArgumentParser(description="Evaluate search quality and latency on labeled queries")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="Labeled query file")
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 3, 5])
+    parser.add_argument("--csv", default=default_csv)
+    parser.add_argument("--use-db", action="store_true", help="Search the configured database instead of the CSV")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--max-drop", type=float, default=0.02, help="Allowed absolute drop of quality metrics")
+    parser.add_argument("--max-latency-increase", type=float, default=0.25,
+                        help="Allowed relative p95 latency increase")
+    args = parser.parse_args()
+
+    queries = load_labeled_queries(args.queries)
+    pipeline = EmbeddingPipeline()
+    if args.use_db:
+        db = create_database()
+    else:
+        print(f"📚 Embedding {args.csv} with {pipeline.model_name}...")
+        db = build_local_db(args.csv, pipeline)
+
+    assistant = NextStepAssistant(use_openai=False, db=db, pipeline=pipeline)
+    try:
+        print(f"🧪 Running {len(queries)} labeled queries...")
+        result = evaluate(assistant, queries, args.k)
+    finally:
+        assistant.close()
+
+    result['config'] = {
+        'embedding_version': pipeline.version,
+        'source': 'database' if args.use_db else os.path.basename(args.csv),
+        'env': {name: os.getenv(name) for name in CONFIG_ENV if os.getenv(name) is not None},
+    }
+
+    metrics = result['metrics']
+    print("\n" + "=" * 60)
+    print(f"   {pipeline.version}")
+    for k in args.k:
+        print(f"   recall@{k} {metrics[f'recall@{k}']:.3f}   nDCG@{k} {metrics[f'ndcg@{k}']:.3f}")
+    print(f"   MRR {metrics['mrr']:.3f}")
+    print(f"   latency p50 {metrics['p50_ms']:.1f} ms  p95 {metrics['p95_ms']:.1f} ms  p99 {metrics['p99_ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = regression_failures(metrics, baseline['metrics'], args.max_drop, args.max_latency_increase)
+        if failures:
+            print(f"\n❌ Regression against {args.baseline}:")
+            for failure in failures:
+                print(f"   {failure}")
+            sys.exit(1)
+        print(f"\n✅ No regression against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+from collections import Counter
+from dataclasses import replace
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from embedding_models import doc_version
+from query_parser import QueryFilters, ResourceFacets
+
+
+class SearchIndex:
+    """In-memory vector index over one embedding version.
+
+    Chunk vectors are stored unit-normalized in a single float32 matrix,
+    grouped contiguously by resource, so a query is one matrix-vector
+    product followed by a per-resource max via `np.maximum.reduceat`.
+    Vectors from any other model or dimension are never scored; they are
+    counted in `rejected` so mixed-model data is visible instead of
+    silently mis-ranked.
+    """
+
+    def __init__(self, version: str, matrix: np.ndarray, chunk_offsets: np.ndarray,
+                 resources: List[Dict[str, Any]], chunk_content_types: np.ndarray,
+                 chunk_languages: np.ndarray, rejected: Dict[str, int] = None,
+                 uncovered: int = 0, chunk_weights: Optional[Dict[str, float]] = None,
+                 categories: Optional[np.ndarray] = None):
+        self.version = version
+        self.matrix = matrix
+        self.chunk_offsets = chunk_offsets
+        self.resources = resources
+        self.chunk_content_types = chunk_content_types
+        self.chunk_languages = chunk_languages
+        self.rejected = rejected or {}
+        self.uncovered = uncovered
+        self.categories = categories if categories is not None else \
+            np.array([r.get('category', '') for r in resources])
+        # Source checksum and build time (epoch seconds) of an on-disk snapshot
+        self.source_checksum = None
+        self.built_at = None
+        # Integer language ids make the per-query language boost a cheap compare
+        self.languages = sorted(set(chunk_languages.tolist()))
+        self.chunk_language_ids = np.searchsorted(self.languages, chunk_languages).astype(np.int32) \
+            if len(chunk_languages) else np.zeros(0, dtype=np.int32)
+        self.chunk_counts = np.diff(np.append(chunk_offsets, len(matrix))).astype(np.int64)
+        self.chunk_resource = np.repeat(np.arange(len(resources)), self.chunk_counts)
+        self._facets = None
+        self._resource_vectors = None
+        self._coordinates = None
+        self.positions = {r.get('_id'): i for i, r in enumerate(resources)}
+        self.set_chunk_weights(chunk_weights)
+
+    def set_chunk_weights(self, chunk_weights: Optional[Dict[str, float]]):
+        """Weight each chunk's score by its content type (missing types weigh 1.0)."""
+        self.chunk_weights = dict(chunk_weights or {})
+        if not self.chunk_weights or all(w == 1.0 for w in self.chunk_weights.values()):
+            self.chunk_weight_values = None
+            return
+        self.chunk_weight_values = np.array(
+            [self.chunk_weights.get(t, 1.0) for t in self.chunk_content_types.tolist()],
+            dtype=np.float32)
+
+    @classmethod
+    def build(cls, resources: List[Dict[str, Any]], embedding_docs: List[Dict[str, Any]],
+              version: str, chunk_weights: Optional[Dict[str, float]] = None) -> "SearchIndex":
+        """Build an index of active resources from stored documents."""
+        active = {r.get('_id'): r for r in resources if r.get('status') == 'active'}
+
+        by_resource: Dict[str, List[Dict[str, Any]]] = {}
+        rejected = Counter()
+        for doc in embedding_docs:
+            resource_id = doc.get('resource_id')
+            if resource_id not in active:
+                continue
+            doc_ver = doc_version(doc)
+            if doc_ver != version:
+                rejected[doc_ver or 'invalid'] += 1
+                continue
+            by_resource.setdefault(resource_id, []).append(doc)
+
+        indexed = [active[rid] for rid in by_resource]
+        docs = [doc for rid in by_resource for doc in by_resource[rid]]
+        counts = [len(by_resource[rid]) for rid in by_resource]
+
+        dimension = int(version.rsplit('@', 1)[1])
+        matrix = np.array([doc['embedding'] for doc in docs], dtype=np.float32).reshape(-1, dimension)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64) if counts else np.zeros(0, np.int64)
+        index = cls(
+            version=version,
+            matrix=matrix,
+            chunk_offsets=offsets,
+            resources=indexed,
+            chunk_content_types=np.array([doc.get('content_type', '') for doc in docs]),
+            chunk_languages=np.array([doc.get('language', '') for doc in docs]),
+            rejected=dict(rejected),
+            uncovered=len(active) - len(indexed),
+            chunk_weights=chunk_weights
+        )
+        if index.rejected or index.uncovered:
+            print(f"⚠️  Index {version}: skipped {sum(index.rejected.values())} vectors from other "
+                  f"versions {index.rejected}; {index.uncovered} active resources have no "
+                  f"{version} vectors")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of active resources searchable in this version."""
+        total = len(self.resources) + self.uncovered
+        return len(self.resources) / total if total else 1.0
+
+    @property
+    def facets(self) -> ResourceFacets:
+        """Filter columns, built on first use."""
+        if self._facets is None:
+            self._facets = ResourceFacets(self.resources)
+        return self._facets
+
+    def candidate_mask(self, filters: Optional[QueryFilters] = None,
+                       category_filter: Optional[str] = None) -> Tuple[np.ndarray, List[str]]:
+        """Resources passing an explicit category and parsed query filters.
+
+        Parsed filters are relaxed if nothing matches them all; returns the
+        mask and the names of the dropped filters.
+        """
+        base = np.ones(len(self.resources), dtype=bool)
+        if category_filter:
+            base &= self.categories == category_filter
+        if not filters:
+            return base, []
+        if category_filter and filters.category:
+            # The explicit filter from the UI wins over the parsed one
+            filters = replace(filters, category=None)
+        return self.facets.relaxed_mask(filters, base)
+
+    @property
+    def resource_vectors(self) -> np.ndarray:
+        """Unit mean of each resource's chunk vectors, built on first use."""
+        if self._resource_vectors is None:
+            if len(self.resources) == 0:
+                self._resource_vectors = np.zeros((0, self.matrix.shape[1]), dtype=np.float32)
+            else:
+                sums = np.add.reduceat(self.matrix, self.chunk_offsets, axis=0)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                self._resource_vectors = sums / np.where(norms == 0, 1.0, norms)
+        return self._resource_vectors
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        """(latitude, longitude) in radians per resource; NaN when unknown."""
+        if self._coordinates is None:
+            coords = [(r.get('coordinates') or {}) for r in self.resources]
+            self._coordinates = np.radians(np.array(
+                [(c.get('latitude', np.nan), c.get('longitude', np.nan)) for c in coords],
+                dtype=np.float64).reshape(-1, 2))
+        return self._coordinates
+
+    def diversify(self, results: List[Tuple[Dict[str, Any], float]], top_k: int,
+                  mmr_lambda: float = 0.7, radius_km: float = 3.0,
+                  use_location: bool = True) -> List[Tuple[Dict[str, Any], float]]:
+        """Pick top_k of `results` by maximal marginal relevance.
+
+        Redundancy between two resources mixes their embedding cosine, same
+        category, and closeness (exp(-distance / radius_km)), all from data
+        already in the index. Only the similarity rows of picked resources
+        are computed, so selection costs top_k vector operations over the
+        candidates. Relevance is min-max scaled over the candidates so
+        mmr_lambda trades off the same [0, 1] range whatever produced the
+        scores (cosine or cross-encoder). Scores returned are the original
+        relevance.
+        """
+        if len(results) <= 1 or mmr_lambda >= 1.0:
+            return results[:top_k]
+        ids = np.array([self.positions[r.get('_id')] for r, _ in results])
+        relevance = np.array([score for _, score in results], dtype=np.float32)
+        spread = float(relevance.max() - relevance.min())
+        relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+
+        vectors = self.resource_vectors[ids]
+        categories = self.categories[ids]
+        lat, lng = self.coordinates[ids, 0], self.coordinates[ids, 1]
+
+        def similarity(i: int) -> np.ndarray:
+            """Redundancy of every candidate with candidate i."""
+            row = 0.6 * (vectors @ vectors[i]) + 0.2 * (categories == categories[i])
+            if use_location:
+                # Haversine distance in km; unknown coordinates are never "close"
+                a = (np.sin((lat - lat[i]) / 2) ** 2 +
+                     np.cos(lat) * np.cos(lat[i]) * np.sin((lng - lng[i]) / 2) ** 2)
+                distance = 2 * 6371.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+                row += 0.2 * np.nan_to_num(np.exp(-distance / radius_km), nan=0.0)
+            return row
+
+        selected = [int(np.argmax(relevance))]
+        redundancy = similarity(selected[0])
+        available = np.ones(len(results), dtype=bool)
+        available[selected[0]] = False
+        for _ in range(min(top_k, len(results)) - 1):
+            mmr = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+            pick = int(np.argmax(mmr))
+            selected.append(pick)
+            available[pick] = False
+            np.maximum(redundancy, similarity(pick), out=redundancy)
+        return [results[i] for i in selected]
+
+    def normalize_query(self, query_vector: np.ndarray) -> np.ndarray:
+        """Check the query matches the index dimension and unit-normalize it."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape[-1] != self.matrix.shape[1]:
+            raise ValueError(f"Query embedding has dimension {query.shape[-1]}, "
+                             f"index {self.version} expects {self.matrix.shape[1]}")
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def resource_scores(self, query_vector: np.ndarray, language: Optional[str] = None,
+                        language_boost: float = 0.0,
+                        candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Best weighted chunk cosine per indexed resource.
+
+        Chunks in `language` get `language_boost` added before the max, so
+        same-language chunks win close calls against translated ones.
+        With a `candidates` mask only those resources' chunks are scored;
+        the rest get -inf.
+        """
+        if len(self.resources) == 0:
+            return np.zeros(0, dtype=np.float32)
+        query = self.normalize_query(query_vector)
+
+        subset = candidates is not None and candidates.sum() < len(self.resources) // 2
+        if subset:
+            resource_ids = np.flatnonzero(candidates)
+            if len(resource_ids) == 0:
+                return np.full(len(self.resources), -np.inf, dtype=np.float32)
+            rows = np.flatnonzero(candidates[self.chunk_resource])
+            counts = self.chunk_counts[resource_ids]
+            offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        else:
+            rows = slice(None)
+            offsets = self.chunk_offsets
+
+        chunk_scores = self.matrix[rows] @ query
+        if self.chunk_weight_values is not None:
+            chunk_scores = chunk_scores * self.chunk_weight_values[rows]
+        if language_boost and language in self.languages:
+            language_id = self.languages.index(language)
+            chunk_scores = np.minimum(chunk_scores + language_boost * (self.chunk_language_ids[rows] == language_id), 1.0)
+        scores = np.maximum.reduceat(chunk_scores, offsets)
+
+        if subset:
+            full = np.full(len(self.resources), -np.inf, dtype=np.float32)
+            full[resource_ids] = scores
+            return full
+        if candidates is not None:
+            scores = np.where(candidates, scores, -np.inf)
+        return scores
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5,
+               category_filter: Optional[str] = None, language: Optional[str] = None,
+               language_boost: float = 0.0,
+               candidates: Optional[np.ndarray] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Return (resource, score) pairs for the top_k resources.
+
+        `candidates` is a mask from candidate_mask; it already includes the
+        category filter.
+        """
+        if candidates is None and category_filter:
+            candidates = self.categories == category_filter
+        scores = self.resource_scores(query_vector, language, language_boost, candidates)
+        return self.top_k(scores, top_k)
+
+    def resource_scores_batch(self, query_vectors: np.ndarray, languages: Optional[List[Optional[str]]] = None,
+                              language_boost: float = 0.0) -> np.ndarray:
+        """Best weighted chunk cosine per resource for many queries: (resources, queries).
+
+        One matrix-matrix product replaces a matrix-vector product per
+        query; scores match resource_scores without candidates.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        if queries.shape[1] != self.matrix.shape[1]:
+            raise ValueError(f"Query embeddings have dimension {queries.shape[1]}, "
+                             f"index {self.version} expects {self.matrix.shape[1]}")
+        if len(self.resources) == 0:
+            return np.zeros((0, len(queries)), dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+
+        chunk_scores = self.matrix @ queries.T
+        if self.chunk_weight_values is not None:
+            chunk_scores *= self.chunk_weight_values[:, None]
+        if language_boost and languages:
+            language_ids = np.array([self.languages.index(l) if l in self.languages else -1
+                                     for l in languages], dtype=np.int32)
+            chunk_scores += language_boost * (self.chunk_language_ids[:, None] == language_ids[None, :])
+            np.minimum(chunk_scores, 1.0, out=chunk_scores)
+        return np.maximum.reduceat(chunk_scores, self.chunk_offsets, axis=0)
+
+    def top_k(self, scores: np.ndarray, top_k: int,
+              candidates: Optional[np.ndarray] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """(resource, score) pairs for the top_k finite scores among candidates."""
+        if candidates is not None:
+            scores = np.where(candidates, scores, -np.inf)
+        k = min(top_k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.resources[i], float(scores[i])) for i in top]
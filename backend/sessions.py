@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Server-side conversation sessions for multi-turn chat.
+
+A session remembers what the previous turns found: the (blended) query
+embedding, the ids of the first-pass candidate resources and a short
+summary of each turn. A follow-up such as "what about one closer to
+downtown" then re-scores only the cached candidates, with the new query
+blended into the previous one, instead of scanning the whole index, and
+the LLM gets a compact summary of the last few turns rather than the
+whole transcript.
+
+A turn is treated as a follow-up when the session has candidates, the
+query names no category other than the session's, and it either starts like a
+refinement ("what about", "cheaper", "another one") or is close to the
+previous query in embedding space, and at least one cached candidate
+passes its filters. Anything else starts a fresh search in the same
+session.
+
+Sessions live in memory, bounded by NEXTSTEP_SESSION_MAX (least recently
+used are evicted) and NEXTSTEP_SESSION_TTL seconds of inactivity.
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+
+SESSION_TURNS = REGISTRY.counter('nextstep_session_turns_total', 'Chat turns in a session by how they were searched',
+                                 ('kind',))
+
+# Openings and words that mark a turn as refining the previous answer
+FOLLOW_UP_CUES = re.compile(
+    r"^(what about|how about|and |or |any |another|other|instead|also|only|but )|"
+    r"\b(closer|nearer|nearby|cheaper|free one|that one|those|them|open (now|today|late|on)|"
+    r"y (qué|que)|otro|otra|más cerca|mas cerca)\b",
+    re.IGNORECASE
+)
+
+
+class Session:
+    """State carried between the turns of one conversation."""
+
+    def __init__(self, session_id: str, max_turns: int = 3):
+        self.id = session_id
+        self.created = self.last_seen = time.time()
+        self.max_turns = max_turns
+        self.query_vector: Optional[np.ndarray] = None
+        self.candidate_ids: List[Any] = []
+        self.category: Optional[str] = None
+        self.turns: List[Dict[str, Any]] = []
+        self.turn_count = 0
+        self.follow_up = False  # whether the last turn re-scored cached candidates
+        # Serializes turns of the same conversation (double submits, retries)
+        self.lock = threading.Lock()
+
+    def is_follow_up(self, query: str, query_vector: np.ndarray, category: Optional[str],
+                     min_similarity: float = 0.5) -> bool:
+        """Whether this turn refines the previous search rather than starting a new one."""
+        if not self.candidate_ids or self.query_vector is None:
+            return False
+        if category and category != self.category:
+            # Includes narrowing an unfiltered conversation to a category
+            return False
+        if FOLLOW_UP_CUES.search(query.strip()):
+            return True
+        norms = np.linalg.norm(query_vector) * np.linalg.norm(self.query_vector)
+        return norms > 0 and float(np.dot(query_vector, self.query_vector) / norms) >= min_similarity
+
+    def add_turn(self, query: str, resource_names: List[str]):
+        """Record a turn; only the last max_turns are kept for the summary."""
+        self.turn_count += 1
+        self.turns.append({'query': " ".join(query.split()), 'resources': resource_names[:3]})
+        del self.turns[:-self.max_turns]
+
+    def summary(self, max_chars: int = 400) -> str:
+        """Compact description of the recent turns for the LLM prompt."""
+        if not self.turns:
+            return ""
+        parts = []
+        for turn in self.turns:
+            part = f'"{turn["query"]}"'
+            if turn['resources']:
+                part += f" (suggested: {', '.join(turn['resources'])})"
+            parts.append(part)
+        text = "; then ".join(parts)
+        if self.turn_count > len(self.turns):
+            text = "... " + text
+        # Oldest turns go first when over budget
+        return text if len(text) <= max_chars else "…" + text[-(max_chars - 1):]
+
+
+class SessionStore:
+    """LRU of sessions with idle expiry."""
+
+    def __init__(self, max_sessions: int = 2000, ttl: float = 1800.0, max_turns: int = 3):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, session_id: Optional[str]) -> Optional[Session]:
+        """The live session with this id, refreshed as most recently used."""
+        if not session_id:
+            return None
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+                self.expired += 1
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Session:
+        """The existing session, or a new one (unknown and expired ids get a fresh id)."""
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        session = Session(uuid.uuid4().hex, self.max_turns)
+        with self._lock:
+            self._sessions[session.id] = session
+            self.created += 1
+            self._sweep(session.created)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return session
+
+    def _sweep(self, now: float):
+        # Idle sessions sit at the front of the LRU order
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def gauges(self) -> Dict[str, float]:
+        """Collector for /metrics."""
+        return {
+            'nextstep_sessions_active': len(self._sessions),
+            'nextstep_sessions_created': self.created,
+            'nextstep_sessions_expired': self.expired,
+            'nextstep_sessions_evicted': self.evicted,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'ttl_s': self.ttl,
+            'created': self.created,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Typeahead suggestions from a sorted-array prefix index.
+
+Every resource name, service and category is indexed under each of its
+word starts ("Jefferson Dental Clinics" is found by "jef", "den" and
+"cli"), accent- and case-folded so "clinica" finds "Clínica". A lookup is
+a bisect into the sorted keys plus a short forward scan, well under a
+millisecond for the whole catalog. Past queries become suggestions once
+NEXTSTEP_SUGGEST_MIN_COUNT different clients have asked them, so one
+person's wording (even when retried) is never echoed to others.
+"""
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+# Ranking among suggestions with the same match quality
+KIND_WEIGHTS = {'category': 3.0, 'query': 2.0, 'resource': 1.5, 'service': 1.0}
+MAX_QUERY_LENGTH = 80
+_WORD = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.replace('đ', 'd').split())
+
+
+def word_starts(folded: str) -> List[str]:
+    """The text from each word onwards: 'a b c' -> ['a b c', 'b c', 'c']."""
+    return [folded[m.start():] for m in _WORD.finditer(folded)]
+
+
+class SuggestIndex:
+    """Prefix index over resource names, services, categories and popular queries.
+
+    Categories and popular queries live in their own small sorted array
+    that is always scanned in full, so they are never crowded out of the
+    bounded scan by hundreds of similarly named resources.
+    """
+
+    def __init__(self, min_query_count: int = 3, max_queries: int = 5000, max_clients: int = 100):
+        self.min_query_count = min_query_count
+        self.max_queries = max_queries
+        self.max_clients = max_clients
+        # Resource names and services; (text, kind, category, key is the start of the text)
+        self._keys: List[str] = []
+        self._entries: List[Tuple[str, str, Optional[str], bool]] = []
+        # Categories and popular queries, same layout
+        self._head_keys: List[str] = []
+        self._head_entries: List[Tuple[str, str, Optional[str], bool]] = []
+        self._weights: Dict[Tuple[str, str], float] = {}
+        # Distinct (hashed) clients per query, capped at max_clients; least recently asked first
+        self._query_clients: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.built_at = None
+
+    def build(self, resources: List[Dict[str, Any]], categories: List[Dict[str, str]]):
+        """Replace the catalog entries; popular queries are kept."""
+        items: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+        for category in categories:
+            items[(category['name'], 'category')] = (category['id'], KIND_WEIGHTS['category'])
+        for resource in resources:
+            if resource.get('status', 'active') != 'active' or not resource.get('name'):
+                continue
+            items[(resource['name'], 'resource')] = (resource.get('category'), KIND_WEIGHTS['resource'])
+            for service in resource.get('services') or []:
+                key = (service.strip(), 'service')
+                if key[0] and key not in items:
+                    items[key] = (resource.get('category'), KIND_WEIGHTS['service'])
+        with self._lock:
+            counts = {query: len(clients) for query, clients in self._query_clients.items()}
+        for query, count in counts.items():
+            if count >= self.min_query_count:
+                items[(query, 'query')] = (None, KIND_WEIGHTS['query'] + min(count, 100) / 100.0)
+
+        catalog, head = [], []
+        weights = {}
+        for (text, kind), (category, weight) in items.items():
+            weights[(text, kind)] = weight
+            pairs = head if kind in ('category', 'query') else catalog
+            for i, key in enumerate(word_starts(fold(text))):
+                pairs.append((key, (text, kind, category, i == 0)))
+        catalog.sort(key=lambda pair: pair[0])
+        head.sort(key=lambda pair: pair[0])
+        with self._lock:
+            self._keys = [key for key, _ in catalog]
+            self._entries = [entry for _, entry in catalog]
+            self._head_keys = [key for key, _ in head]
+            self._head_entries = [entry for _, entry in head]
+            self._weights = weights
+            self.built_at = time.time()
+
+    def _insert(self, text: str, kind: str, category: Optional[str], weight: float):
+        with self._lock:
+            self._weights[(text, kind)] = weight
+            for i, key in enumerate(word_starts(fold(text))):
+                position = bisect.bisect_left(self._head_keys, key)
+                self._head_keys.insert(position, key)
+                self._head_entries.insert(position, (text, kind, category, i == 0))
+
+    def record_query(self, query: str, client: Optional[str]):
+        """Count a submitted query once per client; it becomes a suggestion at min_query_count.
+
+        `client` is an opaque (hashed) id of the sender. Without one the
+        query isn't counted, since one person's retries would look like
+        several people asking. At max_queries the least recently asked
+        query below min_query_count is forgotten (the least recently asked
+        one overall if every nearby entry is popular), so new queries can
+        still become popular on a long-running server.
+        """
+        query = " ".join(query.split())
+        if not query or len(query) > MAX_QUERY_LENGTH or not client:
+            return
+        with self._lock:
+            clients = self._query_clients.get(query)
+            if clients is None:
+                if len(self._query_clients) >= self.max_queries:
+                    self._evict_query()
+                clients = self._query_clients[query] = set()
+            else:
+                self._query_clients.move_to_end(query)
+            if client in clients or len(clients) >= self.max_clients:
+                return
+            clients.add(client)
+            count = len(clients)
+        weight = KIND_WEIGHTS['query'] + min(count, 100) / 100.0
+        if count == self.min_query_count:
+            self._insert(query, 'query', None, weight)
+        elif count > self.min_query_count:
+            with self._lock:
+                self._weights[(query, 'query')] = weight
+
+    def _evict_query(self, scan: int = 64):
+        # Caller holds the lock. An evicted popular query stays suggested until the next build()
+        victim = None
+        for i, (query, clients) in enumerate(self._query_clients.items()):
+            if i >= scan:
+                break
+            if len(clients) < self.min_query_count:
+                victim = query
+                break
+        if victim is None:
+            victim = next(iter(self._query_clients))
+        del self._query_clients[victim]
+
+    def popular_queries(self, n: int) -> List[str]:
+        """The n queries asked by the most clients, at least min_query_count each."""
+        with self._lock:
+            counts = [(len(clients), query) for query, clients in self._query_clients.items()
+                      if len(clients) >= self.min_query_count]
+        return [query for _, query in sorted(counts, key=lambda item: -item[0])[:n]]
+
+    def _scan(self, keys: List[str], entries: List[tuple], folded: str, limit: int,
+              matches: Dict[Tuple[str, str], tuple]):
+        start = bisect.bisect_left(keys, folded)
+        for i in range(start, min(start + limit, len(keys))):
+            if not keys[i].startswith(folded):
+                break
+            text, kind, category, leading = entries[i]
+            score = (leading, self._weights.get((text, kind), 1.0))
+            if (text, kind) not in matches or score > matches[(text, kind)][0]:
+                matches[(text, kind)] = (score, category)
+
+    def suggest(self, prefix: str, limit: int = 8, scan: int = 200) -> List[Dict[str, Any]]:
+        """Best `limit` completions of prefix.
+
+        Matches at the start of the text rank above matches at a later
+        word; ties go by kind weight (popular queries by their count).
+        Categories and popular queries are always all considered; resource
+        names and services only within the first `scan` keys.
+        """
+        folded = fold(prefix)
+        if not folded:
+            return []
+        matches = {}
+        with self._lock:
+            self._scan(self._head_keys, self._head_entries, folded, len(self._head_keys), matches)
+            self._scan(self._keys, self._entries, folded, scan, matches)
+        ranked = sorted(matches.items(), key=lambda item: (item[1][0][0], item[1][0][1], -len(item[0][0])),
+                        reverse=True)
+        suggestions, seen = [], set()
+        for (text, kind), (_, category) in ranked:
+            if text.lower() in seen:
+                continue
+            seen.add(text.lower())
+            suggestions.append({'text': text, 'kind': kind, 'category': category})
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._head_keys)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Translated chunk variants for non-English search.
+
+Service and requirement codes (food_pantry, photo_id, ...) are translated
+with a glossary: whole-code phrases first, then word by word. Free text
+such as notes goes through a local MarianMT model when `transformers` is
+installed, and is left out of translated chunks otherwise.
+
+Backfill translated chunks for resources already in the database:
+
+    python translation.py --languages es vi
+"""
+
+import argparse
+import os
+import re
+import threading
+from typing import List, Dict, Any, Optional
+
+# Whole-code translations; 'en' entries fix up awkward English humanization
+PHRASES: Dict[str, Dict[str, str]] = {
+    'none': {'en': 'no requirements', 'es': 'sin requisitos', 'vi': 'không yêu cầu'},
+    'food_pantry': {'en': 'food pantry', 'es': 'despensa de alimentos', 'vi': 'kho thực phẩm miễn phí'},
+    'photo_id': {'en': 'photo ID', 'es': 'identificación con foto', 'vi': 'giấy tờ tùy thân có ảnh'},
+    'photo_id_required': {'en': 'photo ID required', 'es': 'se requiere identificación con foto', 'vi': 'cần giấy tờ tùy thân có ảnh'},
+    '2_forms_id': {'en': 'two forms of ID', 'es': 'dos identificaciones', 'vi': 'hai loại giấy tờ tùy thân'},
+    'outpatient_treatment': {'en': 'outpatient treatment', 'es': 'tratamiento ambulatorio', 'vi': 'điều trị ngoại trú'},
+    'residential_treatment': {'en': 'residential treatment', 'es': 'tratamiento residencial', 'vi': 'điều trị nội trú'},
+    'support_groups': {'en': 'support groups', 'es': 'grupos de apoyo', 'vi': 'nhóm hỗ trợ'},
+    'individual_counseling': {'en': 'individual counseling', 'es': 'consejería individual', 'vi': 'tư vấn cá nhân'},
+    'group_counseling': {'en': 'group counseling', 'es': 'consejería en grupo', 'vi': 'tư vấn nhóm'},
+    'medical_care': {'en': 'medical care', 'es': 'atención médica', 'vi': 'chăm sóc y tế'},
+    'esl_classes': {'en': 'ESL English classes', 'es': 'clases de inglés', 'vi': 'lớp học tiếng Anh'},
+    'hot_meals': {'en': 'hot meals', 'es': 'comidas calientes', 'vi': 'bữa ăn nóng'},
+    'general_dentistry': {'en': 'general dentistry', 'es': 'odontología general', 'vi': 'nha khoa tổng quát'},
+    'oral_surgery': {'en': 'oral surgery', 'es': 'cirugía oral', 'vi': 'phẫu thuật răng miệng'},
+    'vision_screenings': {'en': 'vision screenings', 'es': 'exámenes de la vista', 'vi': 'kiểm tra thị lực'},
+    'eye_examinations': {'en': 'eye examinations', 'es': 'exámenes de la vista', 'vi': 'khám mắt'},
+    'temporary_shelter': {'en': 'temporary shelter', 'es': 'refugio temporal', 'vi': 'nơi trú ẩn tạm thời'},
+    'emergency_shelter_14_days': {'en': 'emergency shelter up to 14 days', 'es': 'refugio de emergencia hasta 14 días', 'vi': 'nơi trú ẩn khẩn cấp đến 14 ngày'},
+    'low_income': {'en': 'low income', 'es': 'bajos ingresos', 'vi': 'thu nhập thấp'},
+    'income_135_percent_poverty_guidelines': {'en': 'income under 135% of poverty guidelines', 'es': 'ingresos menores al 135% del nivel de pobreza', 'vi': 'thu nhập dưới 135% mức nghèo'},
+    'medicaid_medicare': {'en': 'Medicaid or Medicare', 'es': 'Medicaid o Medicare', 'vi': 'Medicaid hoặc Medicare'},
+    'most_insurance_accepted': {'en': 'most insurance accepted', 'es': 'aceptan la mayoría de seguros', 'vi': 'nhận hầu hết bảo hiểm'},
+    'free_smartphone': {'en': 'free smartphone', 'es': 'teléfono inteligente gratis', 'vi': 'điện thoại thông minh miễn phí'},
+    'reduced_fare_transit': {'en': 'reduced fare transit', 'es': 'transporte con tarifa reducida', 'vi': 'giảm giá vé xe buýt'},
+    'medical_transportation': {'en': 'medical transportation', 'es': 'transporte a citas médicas', 'vi': 'đưa đón đi khám bệnh'},
+    'food_stamps': {'en': 'food stamps', 'es': 'cupones de alimentos', 'vi': 'phiếu thực phẩm'},
+    'snap_benefits_matching': {'en': 'SNAP benefits matching', 'es': 'beneficios SNAP duplicados', 'vi': 'nhân đôi trợ cấp SNAP'},
+    'lgbtq_plus_or_ally': {'en': 'LGBTQ+ or ally', 'es': 'LGBTQ+ o aliado', 'vi': 'LGBTQ+ hoặc người ủng hộ'},
+    'veterans_only': {'en': 'veterans only', 'es': 'solo veteranos', 'vi': 'chỉ dành cho cựu chiến binh'},
+    'men_only': {'en': 'men only', 'es': 'solo hombres', 'vi': 'chỉ dành cho nam'},
+    'male_only': {'en': 'men only', 'es': 'solo hombres', 'vi': 'chỉ dành cho nam'},
+    'women_only': {'en': 'women only', 'es': 'solo mujeres', 'vi': 'chỉ dành cho nữ'},
+    'age_17_plus': {'en': 'age 17+', 'es': 'mayores de 17 años', 'vi': 'từ 17 tuổi trở lên'},
+    'age_18_plus': {'en': 'age 18+', 'es': 'mayores de 18 años', 'vi': 'từ 18 tuổi trở lên'},
+    'ged_classes': {'en': 'GED classes', 'es': 'clases de GED', 'vi': 'lớp GED'},
+    'citizenship_classes': {'en': 'citizenship classes', 'es': 'clases de ciudadanía', 'vi': 'lớp quốc tịch'},
+    '24_hour_hotline': {'en': '24-hour hotline', 'es': 'línea de ayuda 24 horas', 'vi': 'đường dây nóng 24 giờ'},
+    'protective_orders': {'en': 'protective orders', 'es': 'órdenes de protección', 'vi': 'lệnh bảo vệ'},
+    'safety_planning': {'en': 'safety planning', 'es': 'plan de seguridad', 'vi': 'lập kế hoạch an toàn'},
+    'walk_in_clinic': {'en': 'walk-in clinic', 'es': 'clínica sin cita', 'vi': 'phòng khám không cần hẹn'},
+    '12_step_recovery': {'en': '12-step recovery', 'es': 'recuperación de 12 pasos', 'vi': 'phục hồi 12 bước'},
+}
+
+# Word-level fallback for codes without a phrase entry
+WORDS: Dict[str, Dict[str, str]] = {
+    'food': {'es': 'comida', 'vi': 'thực phẩm'},
+    'meals': {'es': 'comidas', 'vi': 'bữa ăn'},
+    'groceries': {'es': 'despensa', 'vi': 'thực phẩm'},
+    'lunch': {'es': 'almuerzo', 'vi': 'bữa trưa'},
+    'pantry': {'es': 'despensa', 'vi': 'kho thực phẩm'},
+    'counseling': {'es': 'consejería', 'vi': 'tư vấn'},
+    'therapy': {'es': 'terapia', 'vi': 'trị liệu'},
+    'treatment': {'es': 'tratamiento', 'vi': 'điều trị'},
+    'recovery': {'es': 'recuperación', 'vi': 'phục hồi'},
+    'rehabilitation': {'es': 'rehabilitación', 'vi': 'phục hồi chức năng'},
+    'residential': {'es': 'residencial', 'vi': 'nội trú'},
+    'outpatient': {'es': 'ambulatorio', 'vi': 'ngoại trú'},
+    'inpatient': {'es': 'hospitalizado', 'vi': 'nội trú'},
+    'medical': {'es': 'médico', 'vi': 'y tế'},
+    'health': {'es': 'salud', 'vi': 'sức khỏe'},
+    'mental': {'es': 'mental', 'vi': 'tâm thần'},
+    'care': {'es': 'atención', 'vi': 'chăm sóc'},
+    'clinic': {'es': 'clínica', 'vi': 'phòng khám'},
+    'dental': {'es': 'dental', 'vi': 'nha khoa'},
+    'dentistry': {'es': 'odontología', 'vi': 'nha khoa'},
+    'teeth': {'es': 'dientes', 'vi': 'răng'},
+    'cleaning': {'es': 'limpieza', 'vi': 'làm sạch'},
+    'cleanings': {'es': 'limpiezas', 'vi': 'làm sạch'},
+    'fillings': {'es': 'empastes', 'vi': 'trám răng'},
+    'extractions': {'es': 'extracciones', 'vi': 'nhổ răng'},
+    'dentures': {'es': 'dentaduras', 'vi': 'răng giả'},
+    'eye': {'es': 'ojos', 'vi': 'mắt'},
+    'vision': {'es': 'visión', 'vi': 'thị lực'},
+    'glasses': {'es': 'lentes', 'vi': 'kính'},
+    'exams': {'es': 'exámenes', 'vi': 'khám'},
+    'screenings': {'es': 'pruebas', 'vi': 'sàng lọc'},
+    'testing': {'es': 'pruebas', 'vi': 'xét nghiệm'},
+    'emergency': {'es': 'emergencia', 'vi': 'khẩn cấp'},
+    'shelter': {'es': 'refugio', 'vi': 'nơi trú ẩn'},
+    'housing': {'es': 'vivienda', 'vi': 'nhà ở'},
+    'transitional': {'es': 'transitoria', 'vi': 'chuyển tiếp'},
+    'homeless': {'es': 'sin hogar', 'vi': 'vô gia cư'},
+    'transportation': {'es': 'transporte', 'vi': 'đưa đón'},
+    'transit': {'es': 'transporte público', 'vi': 'giao thông công cộng'},
+    'free': {'es': 'gratis', 'vi': 'miễn phí'},
+    'legal': {'es': 'legal', 'vi': 'pháp lý'},
+    'assistance': {'es': 'asistencia', 'vi': 'hỗ trợ'},
+    'support': {'es': 'apoyo', 'vi': 'hỗ trợ'},
+    'services': {'es': 'servicios', 'vi': 'dịch vụ'},
+    'classes': {'es': 'clases', 'vi': 'lớp học'},
+    'education': {'es': 'educación', 'vi': 'giáo dục'},
+    'employment': {'es': 'empleo', 'vi': 'việc làm'},
+    'english': {'es': 'inglés', 'vi': 'tiếng Anh'},
+    'children': {'es': 'niños', 'vi': 'trẻ em'},
+    'women': {'es': 'mujeres', 'vi': 'phụ nữ'},
+    'men': {'es': 'hombres', 'vi': 'nam giới'},
+    'families': {'es': 'familias', 'vi': 'gia đình'},
+    'veterans': {'es': 'veteranos', 'vi': 'cựu chiến binh'},
+    'disabled': {'es': 'discapacitados', 'vi': 'người khuyết tật'},
+    'disability': {'es': 'discapacidad', 'vi': 'khuyết tật'},
+    'seniors': {'es': 'personas mayores', 'vi': 'người cao tuổi'},
+    'elderly': {'es': 'personas mayores', 'vi': 'người cao tuổi'},
+    'pregnant': {'es': 'embarazadas', 'vi': 'mang thai'},
+    'income': {'es': 'ingresos', 'vi': 'thu nhập'},
+    'abuse': {'es': 'abuso', 'vi': 'bạo hành'},
+    'violence': {'es': 'violencia', 'vi': 'bạo lực'},
+    'domestic': {'es': 'doméstica', 'vi': 'gia đình'},
+    'survivors': {'es': 'sobrevivientes', 'vi': 'người sống sót'},
+    'victim': {'es': 'víctima', 'vi': 'nạn nhân'},
+    'crisis': {'es': 'crisis', 'vi': 'khủng hoảng'},
+    'hotline': {'es': 'línea de ayuda', 'vi': 'đường dây nóng'},
+    'phone': {'es': 'teléfono', 'vi': 'điện thoại'},
+    'calls': {'es': 'llamadas', 'vi': 'cuộc gọi'},
+    'texts': {'es': 'mensajes', 'vi': 'tin nhắn'},
+    'data': {'es': 'datos', 'vi': 'dữ liệu'},
+    'wireless': {'es': 'celular', 'vi': 'di động'},
+    'required': {'es': 'requerido', 'vi': 'bắt buộc'},
+    'only': {'es': 'solamente', 'vi': 'chỉ'},
+    'age': {'es': 'edad', 'vi': 'tuổi'},
+    'plus': {'es': 'o más', 'vi': 'trở lên'},
+    'days': {'es': 'días', 'vi': 'ngày'},
+    'monthly': {'es': 'mensual', 'vi': 'hàng tháng'},
+    'weekly': {'es': 'semanal', 'vi': 'hàng tuần'},
+    'requirements': {'es': 'requisitos', 'vi': 'yêu cầu'},
+    'sexual': {'es': 'sexual', 'vi': 'tình dục'},
+    'assault': {'es': 'agresión', 'vi': 'tấn công'},
+    'walkin': {'en': 'walk-in', 'es': 'sin cita', 'vi': 'không cần hẹn'},
+    'and': {'es': 'y', 'vi': 'và'},
+    'or': {'es': 'o', 'vi': 'hoặc'},
+}
+
+CATEGORY_NAMES: Dict[str, Dict[str, str]] = {
+    'food': {'en': 'food assistance', 'es': 'ayuda con comida', 'vi': 'hỗ trợ thực phẩm'},
+    'mental_health': {'en': 'mental health', 'es': 'salud mental', 'vi': 'sức khỏe tâm thần'},
+    'healthcare': {'en': 'healthcare', 'es': 'atención médica', 'vi': 'chăm sóc sức khỏe'},
+    'housing': {'en': 'housing and shelter', 'es': 'vivienda y refugio', 'vi': 'nhà ở và nơi trú ẩn'},
+    'substance_abuse': {'en': 'substance abuse treatment', 'es': 'tratamiento de adicciones', 'vi': 'cai nghiện'},
+    'dental': {'en': 'dental care', 'es': 'atención dental', 'vi': 'nha khoa'},
+    'vision': {'en': 'vision care', 'es': 'cuidado de la vista', 'vi': 'chăm sóc mắt'},
+    'transportation': {'en': 'transportation', 'es': 'transporte', 'vi': 'đưa đón'},
+    'education': {'en': 'education', 'es': 'educación', 'vi': 'giáo dục'},
+    'telecommunications': {'en': 'phone service', 'es': 'servicio telefónico', 'vi': 'dịch vụ điện thoại'},
+    'interpersonal_violence': {'en': 'domestic violence help', 'es': 'ayuda por violencia doméstica', 'vi': 'hỗ trợ bạo lực gia đình'},
+}
+
+LABELS: Dict[str, Dict[str, str]] = {
+    'es': {'name': 'Nombre', 'category': 'Categoría', 'notes': 'Notas',
+           'requirements': 'Requisitos', 'services': 'Servicios'},
+    'vi': {'name': 'Tên', 'category': 'Loại dịch vụ', 'notes': 'Ghi chú',
+           'requirements': 'Yêu cầu', 'services': 'Dịch vụ'},
+}
+
+MARIAN_MODELS = {
+    'es': 'Helsinki-NLP/opus-mt-en-es',
+    'vi': 'Helsinki-NLP/opus-mt-en-vi',
+}
+
+_NUMBER_PLUS = re.compile(r'\b(\d+) plus\b')
+
+
+def translate_code(code: str, language: str = 'en') -> str:
+    """Translate (or, for 'en', humanize) a coded value such as food_pantry."""
+    code = code.strip()
+    phrase = PHRASES.get(code, {}).get(language)
+    if phrase:
+        return phrase
+    words = code.replace('walk_in', 'walkin').split('_')
+    words = [WORDS.get(w, {}).get(language, w) for w in words]
+    return _NUMBER_PLUS.sub(r'\1+', " ".join(words))
+
+
+def translate_category(category: str, language: str = 'en') -> str:
+    """Human-readable category name in a language."""
+    return CATEGORY_NAMES.get(category, {}).get(language) or category.replace('_', ' ')
+
+
+class MarianTranslator:
+    """Batch English->X translation of free text with local MarianMT models.
+
+    Models load lazily, once per language. Unavailable if transformers
+    (or the model weights) cannot be loaded.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        try:
+            import transformers  # noqa: F401
+            self.available = True
+        except ImportError:
+            self.available = False
+
+    def _load(self, language: str):
+        with self._lock:
+            if language not in self._models:
+                from transformers import MarianMTModel, MarianTokenizer
+                name = MARIAN_MODELS[language]
+                print(f"🌐 Loading translation model {name}...")
+                self._models[language] = (MarianTokenizer.from_pretrained(name),
+                                          MarianMTModel.from_pretrained(name))
+        return self._models[language]
+
+    def translate(self, texts: List[str], language: str, batch_size: int = 16) -> List[Optional[str]]:
+        """Translate texts; returns None entries when translation is unavailable."""
+        if not self.available or language not in MARIAN_MODELS or not texts:
+            return [None] * len(texts)
+        try:
+            tokenizer, model = self._load(language)
+        except Exception as e:
+            print(f"⚠️  Translation model for '{language}' unavailable: {e}")
+            self.available = False
+            return [None] * len(texts)
+
+        output = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            tokens = tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=256)
+            generated = model.generate(**tokens, max_new_tokens=256)
+            output.extend(tokenizer.batch_decode(generated, skip_special_tokens=True))
+        return output
+
+
+def translation_languages() -> List[str]:
+    """Languages to pre-translate chunks into (NEXTSTEP_TRANSLATION_LANGUAGES)."""
+    value = os.getenv('NEXTSTEP_TRANSLATION_LANGUAGES', 'es,vi')
+    return [lang.strip() for lang in value.split(',') if lang.strip() and lang.strip() != 'en']
+
+
+def translated_chunks(resources: List[Dict[str, Any]], languages: List[str],
+                      translator: Optional[MarianTranslator] = None) -> List[List[Dict[str, Any]]]:
+    """Build translated description/services/requirements chunks per resource.
+
+    Notes are machine-translated in one batch per language when a
+    translator is available; everything else uses the glossary.
+    """
+    results = [[] for _ in resources]
+    for language in languages:
+        labels = LABELS.get(language)
+        if not labels:
+            continue
+
+        notes = [r.get('notes') or '' for r in resources]
+        with_notes = [i for i, n in enumerate(notes) if n]
+        translated_notes = {}
+        if translator is not None and with_notes:
+            for i, text in zip(with_notes, translator.translate([notes[i] for i in with_notes], language)):
+                if text:
+                    translated_notes[i] = text
+
+        for i, resource in enumerate(resources):
+            description = (f"{labels['name']}: {resource['name']}\n"
+                           f"{labels['category']}: {translate_category(resource['category'], language)}\n")
+            if i in translated_notes:
+                description += f"{labels['notes']}: {translated_notes[i]}"
+            results[i].append({'content_type': 'description', 'text': description,
+                               'language': language, 'translated': True})
+
+            for field in ('requirements', 'services'):
+                if resource.get(field):
+                    values = ", ".join(translate_code(code, language) for code in resource[field])
+                    results[i].append({'content_type': field, 'text': f"{labels[field]}: {values}",
+                                       'language': language, 'translated': True})
+    return results
+
+
+def main():
+    from db_interface import create_database
+    from embedding_models import doc_version
+    from embedding_pipeline import EmbeddingPipeline
+
+    parser = argparse.ArgumentParser(description="Add translated chunk embeddings for stored resources")
+    parser.add_argument("--languages", nargs="+", default=translation_languages())
+    parser.add_argument("--batch-size", type=int, default=16, help="Resources per encode call")
+    parser.add_argument("--no-mt", action="store_true", help="Glossary only, skip machine translation of notes")
+    args = parser.parse_args()
+
+    pipeline = EmbeddingPipeline()
+    db = create_database()
+    translator = None if args.no_mt else MarianTranslator()
+    try:
+        existing = {}
+        for doc in db.get_all_embeddings():
+            if doc.get('translated') and doc_version(doc) == pipeline.version:
+                existing.setdefault(doc.get('resource_id'), set()).add(doc.get('language'))
+        resources = [r for r in db.get_all_resources()
+                     if not set(args.languages) <= existing.get(r.get('_id'), set())]
+        print(f"🌐 Translating {len(resources)} resources into {', '.join(args.languages)}")
+
+        inserted = 0
+        for start in range(0, len(resources), args.batch_size):
+            batch = resources[start:start + args.batch_size]
+            chunks = translated_chunks(batch, args.languages, translator)
+            records = pipeline.embed_chunks(chunks)
+            for resource, resource_records in zip(batch, records):
+                for record in resource_records:
+                    if record['language'] in existing.get(resource.get('_id'), set()):
+                        continue
+                    record['resource_id'] = resource.get('_id')
+                    db.insert_embedding(record)
+                    inserted += 1
+        print(f"✅ Inserted {inserted} translated embeddings")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
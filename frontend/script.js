@@ -3,6 +3,7 @@ class NextStepApp {
     constructor() {
         this.apiBase = '';
         this.currentCategory = null;
+        this.sessionId = null;
         this.isLoading = false;
         
         // Voice functionality
@@ -128,6 +129,13 @@ class NextStepApp {
             });
         });
         
+        // Typeahead suggestions while typing
+        this.suggestList = document.getElementById('suggest-list');
+        this.messageInput.addEventListener('input', () => {
+            clearTimeout(this.suggestTimeout);
+            this.suggestTimeout = setTimeout(() => this.loadSuggestions(this.messageInput.value), 120);
+        });
+        
         // Input focus effects
         this.messageInput.addEventListener('focus', () => {
             document.querySelector('.input-wrapper').classList.add('focused');
@@ -138,6 +146,29 @@ class NextStepApp {
         });
     }
     
+    async loadSuggestions(text) {
+        const query = text.trim();
+        if (query.length < 2) {
+            this.suggestList.innerHTML = '';
+            return;
+        }
+        try {
+            const response = await fetch(`/suggest?q=${encodeURIComponent(query)}&limit=6`);
+            if (!response.ok) return;
+            const data = await response.json();
+            // Ignore answers for text the user has already changed
+            if (this.messageInput.value.trim() !== query) return;
+            this.suggestList.innerHTML = '';
+            data.suggestions.forEach(suggestion => {
+                const option = document.createElement('option');
+                option.value = suggestion.text;
+                this.suggestList.appendChild(option);
+            });
+        } catch (error) {
+            console.error('Suggestion error:', error);
+        }
+    }
+    
     setupVoiceRecognition() {
         // Check for speech recognition support
         if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
@@ -373,7 +404,8 @@ class NextStepApp {
                 },
                 body: JSON.stringify({
                     message: message,
-                    category: this.currentCategory
+                    category: this.currentCategory,
+                    session_id: this.sessionId
                 })
             });
             
@@ -382,6 +414,8 @@ class NextStepApp {
             }
             
             const data = await response.json();
+            // Follow-up questions refine this conversation's results
+            this.sessionId = data.session_id || null;
             this.addAssistantVoiceMessage(data);
             
         } catch (error) {
@@ -844,7 +878,8 @@ class NextStepApp {
                 },
                 body: JSON.stringify({
                     message: message,
-                    category: this.currentCategory
+                    category: this.currentCategory,
+                    session_id: this.sessionId
                 })
             });
             
@@ -853,6 +888,8 @@ class NextStepApp {
             }
             
             const data = await response.json();
+            // Follow-up questions refine this conversation's results
+            this.sessionId = data.session_id || null;
             this.addAssistantMessage(data);
             
         } catch (error) {
@@ -957,6 +994,12 @@ class NextStepApp {
         const messages = this.chatContainer.querySelectorAll('.user-message, .assistant-message:not(.welcome-message .assistant-message), .voice-error');
         messages.forEach(message => message.remove());
         
+        // Start a new conversation
+        if (this.sessionId) {
+            fetch(`/chat/session/${encodeURIComponent(this.sessionId)}`, { method: 'DELETE' }).catch(() => {});
+            this.sessionId = null;
+        }
+        
         // Reset category selection
         this.currentCategory = null;
         this.categoriesList.querySelectorAll('.category-item').forEach(item => {